@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+from whatsapp_filter import accounts
+from whatsapp_filter.accounts import Account, AccountPool, parse_accounts
+from whatsapp_filter.whatsapp import INVALID, UNKNOWN
+
+
+class Clock:
+    """Whole seconds, and ahead of the real clock that new account states start from."""
+
+    def __init__(self):
+        self.now = float(int(time.monotonic()) + 1000)
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(accounts.time, "monotonic", clock)
+    monkeypatch.setattr(accounts.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_parse_accounts():
+    assert parse_accounts(None, default_threads=3) == [Account(threads=3)]
+    parsed = parse_accounts(["a", {"name": "b", "checks_per_hour": 120, "threads": 1}], default_threads=2)
+    assert [(a.name, a.checks_per_hour, a.threads) for a in parsed] == [("a", 0, 2), ("b", 120, 1)]
+    assert parsed[1].worker_suffix(1) == "b_worker_1" and Account().worker_suffix(1) == "worker_1"
+    with pytest.raises(ValueError):
+        parse_accounts(["a", "a"], default_threads=1)
+    with pytest.raises(ValueError):
+        parse_accounts([{"checks_per_hour": 5}], default_threads=1)
+
+
+def test_bucket_holds_one_minute_of_budget_and_refills(clock):
+    acct = Account("a", checks_per_hour=3600, threads=1)  # 60 per minute, one a second
+    pool = AccountPool([acct])
+    assert pool.take_budget(acct, 100) == 60
+    assert pool.take_budget(acct, 1) == 0
+    clock.now += 2.0
+    assert pool.take_budget(acct, 5) == 2
+    clock.now += 3600.0  # a long idle spell refills only up to the burst
+    assert pool.take_budget(acct, 100) == 60
+
+
+def test_wait_for_budget_sleeps_until_a_token_is_back(clock):
+    acct = Account("a", checks_per_hour=3600, threads=1)
+    pool = AccountPool([acct])
+    pool.take_budget(acct, 60)
+    started = clock.now
+    assert pool.wait_for_budget(acct)
+    assert clock.now - started == 1.0
+
+    unlimited = Account("u", threads=1)
+    pool = AccountPool([unlimited])
+    assert pool.take_budget(unlimited, 500) == 500
+    assert pool.wait_for_budget(unlimited) and clock.now - started == 1.0
+
+
+def test_acquire_prefers_the_account_with_the_most_budget_left(clock):
+    a = Account("a", checks_per_hour=3600, threads=2)
+    b = Account("b", checks_per_hour=3600, threads=2)
+    pool = AccountPool([a, b])
+    pool.take_budget(a, 30)
+    assert pool.acquire() == (b, 1)
+    assert pool.acquire() == (b, 2)
+    assert pool.acquire() == (a, 1)
+    pool.release(b, 2)
+    assert pool.acquire() == (b, 2)
+
+
+def test_throttled_account_is_benched_for_the_cooldown(clock):
+    a = Account("a", threads=1)
+    b = Account("b", threads=1)
+    pool = AccountPool([a, b], throttle_after=3, cooldown=60.0)
+    for verdict in (UNKNOWN, UNKNOWN, INVALID, UNKNOWN, UNKNOWN):
+        pool.report(a, verdict)
+    assert pool.is_usable(a)  # the streak was broken
+    pool.report(a, UNKNOWN)
+    assert not pool.is_usable(a)
+    assert pool.take_budget(a, 1) == 0 and not pool.wait_for_budget(a)
+    assert pool.acquire() == (b, 1)
+    assert pool.acquire() is None
+    clock.now += 60.0
+    assert pool.is_usable(a)
+    assert pool.acquire() == (a, 1)
+
+
+def test_single_account_is_never_benched(clock):
+    a = Account("a", threads=1)
+    pool = AccountPool([a], throttle_after=2)
+    for _ in range(5):
+        pool.report(a, UNKNOWN)
+    assert pool.is_usable(a)
+
+
+def test_account_is_retired_once_every_slot_is_logged_out(clock):
+    a = Account("a", threads=2)
+    b = Account("b", threads=1)
+    pool = AccountPool([a, b])
+    leases = [pool.acquire() for _ in range(3)]
+    assert sorted((acct.name, slot) for acct, slot in leases) == [("a", 1), ("a", 2), ("b", 1)]
+    pool.release(a, 1, retire=True)
+    assert pool.is_usable(a) and not pool.exhausted()
+    pool.release(a, 2, retire=True)
+    assert not pool.is_usable(a)
+    assert pool.acquire() is None  # a's slots are gone, b's is leased
+    pool.release(b, 1, retire=True)
+    assert pool.exhausted()
@@ -0,0 +1,177 @@
+import itertools
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from whatsapp_filter import api
+from whatsapp_filter.config import AppConfig
+from whatsapp_filter.supervisor import SessionExpired, WorkerFailed
+from whatsapp_filter.whatsapp import INVALID, UNKNOWN, VALID
+
+
+class FakeSupervisor:
+    """Stands in for DriverSupervisor: odd numbers are valid, no browser involved."""
+
+    instances = []
+    fail_once = set()
+    expire = False
+
+    def __init__(self, profile_suffix, label="", **kwargs):
+        self.profile_suffix = profile_suffix
+        self.label = label
+        self.checked = []
+        self.quit_calls = 0
+        FakeSupervisor.instances.append(self)
+
+    def start(self):
+        pass
+
+    def quit(self):
+        self.quit_calls += 1
+
+    def check(self, number):
+        if FakeSupervisor.expire:
+            raise SessionExpired(f"{self.label} profile is not logged in")
+        if number in FakeSupervisor.fail_once:
+            FakeSupervisor.fail_once.discard(number)
+            raise WorkerFailed(f"{self.label} browser crashed")
+        time.sleep(0.001)
+        self.checked.append(number)
+        return (VALID if int(number) % 2 else INVALID), "fake"
+
+
+@pytest.fixture
+def checker(monkeypatch):
+    FakeSupervisor.instances = []
+    FakeSupervisor.fail_once = set()
+    FakeSupervisor.expire = False
+    monkeypatch.setattr(api, "DriverSupervisor", FakeSupervisor)
+    monkeypatch.setattr(api, "prepare_worker_profiles", lambda **kwargs: None)
+    monkeypatch.setattr(api, "_POLL_INTERVAL", 0.05)
+    c = api.Checker(AppConfig(input="-", mode="threaded", threads=3, delay=0))
+    yield c
+    c.close()
+
+
+class CountingSource:
+    def __init__(self, n):
+        self.taken = 0
+        self._numbers = (str(i) for i in range(n))
+
+    def __iter__(self):
+        for number in self._numbers:
+            self.taken += 1
+            yield number
+
+
+def test_check_many_bounds_numbers_in_flight(checker):
+    source = CountingSource(500)
+    consumed = 0
+    verdicts = {}
+    for result in checker.check_many(source, max_in_flight=4):
+        consumed += 1
+        assert source.taken - consumed < 4
+        verdicts[result.number] = result.verdict
+    assert consumed == 500
+    assert verdicts == {str(i): VALID if i % 2 else INVALID for i in range(500)}
+
+
+def test_default_limit_is_twice_the_workers(checker):
+    source = CountingSource(100)
+    results = checker.check_many(source)
+    next(results)
+    assert checker.workers == 3
+    assert source.taken <= 2 * checker.workers
+    results.close()
+
+
+def test_slow_consumer_stops_the_source(checker):
+    source = CountingSource(1000)
+    results = checker.check_many(source, max_in_flight=5)
+    for _ in itertools.islice(results, 3):
+        pass
+    time.sleep(0.2)  # workers finish everything they were given
+    assert source.taken <= 3 + 5
+    results.close()
+
+
+def test_failed_check_is_retried_on_another_attempt(checker):
+    FakeSupervisor.fail_once = {"7"}
+    results = {r.number: r.verdict for r in checker.check_many((str(i) for i in range(20)), max_in_flight=3)}
+    assert len(results) == 20
+    assert results["7"] == VALID
+
+
+def test_abandoned_stream_does_not_leak_into_the_next(checker):
+    first = checker.check_many((str(i) for i in range(100)), max_in_flight=6)
+    next(first)
+    first.close()
+    second = [r.number for r in checker.check_many(["1001", "1003"])]
+    assert sorted(second) == ["1001", "1003"]
+
+
+def test_one_stream_at_a_time(checker):
+    running = checker.check_many(["1", "2"])
+    next(running)
+    with pytest.raises(RuntimeError):
+        next(checker.check_many(["3"]))
+    running.close()
+
+
+def test_dead_workers_answer_unknown(checker):
+    FakeSupervisor.expire = True
+    results = list(checker.check_many((str(i) for i in range(30)), max_in_flight=4))
+    assert len(results) == 30
+    assert {r.verdict for r in results} == {UNKNOWN}
+    assert checker.live_workers == 0
+
+
+def test_submit_from_many_threads(checker):
+    futures = []
+    lock = threading.Lock()
+
+    def submit(start):
+        for i in range(start, start + 10):
+            future = checker.submit(str(i))
+            with lock:
+                futures.append(future)
+
+    threads = [threading.Thread(target=submit, args=(k * 10,)) for k in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results = [f.result(timeout=5) for f in futures]
+    assert sorted(int(r.number) for r in results) == list(range(40))
+
+
+def test_workers_hand_back_the_slots_they_leased(checker):
+    checker.start()
+    pool = checker._pool
+    assert pool.acquire() is None  # every slot is held by a worker
+    assert sorted(s.profile_suffix for s in FakeSupervisor.instances) == ["worker_1", "worker_2", "worker_3"]
+    checker.close()
+    assert sorted(pool._states[""].free_slots) == [1, 2, 3]
+    assert not pool.exhausted()
+
+
+def test_logged_out_workers_retire_their_own_slots(checker):
+    FakeSupervisor.expire = True
+    list(checker.check_many((str(i) for i in range(10)), max_in_flight=4))
+    pool = checker._pool
+    assert pool._states[""].retired_slots == 3
+    assert pool.exhausted()
+    assert pool._states[""].free_slots == []
+
+
+def test_package_import_does_not_load_selenium():
+    code = (
+        "import sys, whatsapp_filter, whatsapp_filter.ranges; "
+        "assert 'selenium' not in sys.modules; "
+        "from whatsapp_filter import Checker; "
+        "assert 'selenium' in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import yaml
+
+from whatsapp_filter import autotune, cli
+from whatsapp_filter.autotune import Trial, _best
+from whatsapp_filter.config import AppConfig
+
+
+def _trial(mode="threaded", threads=2, delay=2.0, throughput=1.0, rejected=""):
+    conclusive = int(throughput * 100)
+    return Trial(mode, threads, delay, numbers=100, conclusive=conclusive, check_seconds=100.0, rejected=rejected)
+
+
+def test_best_prefers_the_cheapest_setting_within_the_gain_margin():
+    cheap = _trial(threads=2, throughput=1.0)
+    busy = _trial(threads=8, throughput=1.04)  # under 5% faster: not worth 6 more browsers
+    assert _best([busy, cheap]) is cheap
+    faster = _trial(threads=8, throughput=1.2)
+    assert _best([cheap, faster]) is faster
+    slow = _trial(threads=2, delay=2.0, throughput=1.0)
+    quick = _trial(threads=2, delay=1.0, throughput=1.01)
+    assert _best([quick, slow]) is slow  # same browsers: the longer delay wins
+
+
+def test_best_ignores_rejected_and_empty_trials():
+    ok = _trial(threads=4, throughput=1.0)
+    assert _best([_trial(threads=2, throughput=5.0, rejected="20% unknown"), ok]) is ok
+    assert _best([_trial(threads=2, throughput=0.0), ok]) is ok
+    assert _best([_trial(rejected="failed"), _trial(throughput=0.0)]) is None
+    assert _best([]) is None
+
+
+def _tune(monkeypatch, speed, rejected=(), numbers=1000):
+    """Run autotune with trials whose throughput is `speed[delay]`; only the single mode is accepted."""
+    delays = []
+
+    def run_trial(trial, cfg, sample, *paths):
+        if trial.mode != "single":
+            trial.rejected = "test"
+            return trial
+        delays.append(trial.delay)
+        trial.numbers = len(sample)
+        trial.conclusive = len(sample)
+        trial.check_seconds = len(sample) / speed[trial.delay]
+        if trial.delay in rejected:
+            trial.rejected = "test"
+        return trial
+
+    monkeypatch.setattr(autotune, "_run_trial", run_trial)
+    monkeypatch.setattr(autotune, "_max_threads_for_memory", lambda cfg: 1)
+    monkeypatch.setattr(autotune, "_print_trials", lambda *args: None)
+    cfg = AppConfig(input="numbers.txt", delay=4.0)
+    numbers = [str(i) for i in range(numbers)]
+    return autotune.autotune(cfg, numbers, Path("v"), Path("i"), Path("u"), trial_size=10), delays
+
+
+def test_delay_is_halved_while_it_pays_off(monkeypatch):
+    tuned, delays = _tune(monkeypatch, {4.0: 1.0, 2.0: 1.5, 1.0: 2.0, 0.5: 2.05, 0.25: 9.0})
+    # 0.5 is under 5% faster than 1.0, so 0.25 is never tried.
+    assert delays == [4.0, 2.0, 1.0, 0.5]
+    assert tuned.mode == "single" and tuned.delay == 1.0
+
+
+def test_delay_halving_stops_at_a_rejected_trial(monkeypatch):
+    tuned, delays = _tune(monkeypatch, {4.0: 1.0, 2.0: 1.5, 1.0: 3.0, 0.5: 9.0}, rejected={1.0})
+    assert delays == [4.0, 2.0, 1.0]
+    assert tuned.delay == 2.0
+
+
+def test_delay_halving_stops_at_the_floor(monkeypatch):
+    tuned, delays = _tune(monkeypatch, {4.0: 1.0, 2.0: 2.0, 1.0: 4.0, 0.5: 8.0, 0.25: 16.0})
+    assert delays == [4.0, 2.0, 1.0, 0.5, 0.25]
+    assert tuned.delay == 0.25
+
+
+def test_delay_halving_stops_when_the_input_runs_out(monkeypatch):
+    # Three mode trials and one halving fit in 40 numbers.
+    tuned, delays = _tune(monkeypatch, {4.0: 1.0, 2.0: 2.0, 1.0: 4.0}, numbers=40)
+    assert delays == [4.0, 2.0]
+    assert tuned.delay == 2.0
+
+
+def test_only_tuned_settings_are_written_back(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "override.txt").write_text("923001\n923002\n")
+    config_path = tmp_path / "config.yaml"
+    cli.write_config_file(config_path, AppConfig(input="numbers.txt", headless=True, log_file="run.log"))
+
+    tuned_by = []
+
+    def tune(cfg, numbers, *paths, trial_size):
+        tuned_by.append(cfg)
+        return AppConfig(input=cfg.input, mode="threaded", threads=6, delay=0.5, chunk_size=40, headless=False)
+
+    monkeypatch.setattr(cli, "autotune", tune)
+    cfg = AppConfig(input="override.txt", threads=8, headless=False, log_file="run.log")
+    cli.autotune_from_config(cfg, config_path)
+
+    assert tuned_by[0].input == "override.txt"
+    saved = yaml.safe_load(config_path.read_text())
+    assert (saved["mode"], saved["threads"], saved["delay"], saved["chunk_size"]) == ("threaded", 6, 0.5, 40)
+    assert saved["input"] == "numbers.txt"
+    assert saved["headless"] is True
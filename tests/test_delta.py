@@ -0,0 +1,70 @@
+from array import array
+
+import pytest
+
+from whatsapp_filter import delta
+from whatsapp_filter.delta import KnownNumbers, number_key, repeated_keys
+
+
+def _write(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def test_membership_ignores_formatting(tmp_path):
+    src = _write(tmp_path / "valid.txt", ["# earlier run", "+92 300 1234567", "", "15551234"])
+    known = KnownNumbers.from_files([src])
+    assert len(known) == 2
+    assert "923001234567" in known
+    assert "+92-300-123-4567" in known
+    assert "15551234" in known
+    assert "1555123" not in known
+    assert "155512345" not in known
+    assert 15551234 not in known
+
+
+def test_leading_zeros_are_significant(tmp_path):
+    known = KnownNumbers.from_files([_write(tmp_path / "a.txt", ["0123"])])
+    assert "0123" in known
+    assert "123" not in known
+    assert "00123" not in known
+
+
+def test_unusable_numbers_are_skipped(tmp_path):
+    too_long = "1" * 19
+    known = KnownNumbers.from_files([_write(tmp_path / "a.txt", ["n/a", too_long, "42"])])
+    assert len(known) == 1
+    assert number_key(too_long) is None
+    assert too_long not in known
+    assert "n/a" not in known
+
+
+def test_missing_source_is_skipped(tmp_path):
+    known = KnownNumbers.from_files([tmp_path / "missing.txt", _write(tmp_path / "a.txt", ["42"])])
+    assert "42" in known
+
+
+def test_duplicates_across_sources_collapse(tmp_path):
+    a = _write(tmp_path / "valid.txt", ["111", "222", "333"])
+    b = _write(tmp_path / "invalid.txt", ["333", "111", "444"])
+    known = KnownNumbers.from_files([a, b])
+    assert len(known) == 4
+    assert list(known.filter(["555", "222", "444", "666"])) == ["555", "666"]
+    assert known.skipped == 2
+
+
+@pytest.mark.parametrize("run", [1, 3, 64])
+def test_sorted_unique_merges_runs(monkeypatch, run):
+    monkeypatch.setattr(delta, "_SORT_RUN", run)
+    keys = [5, 3, 9, 3, 1, 5, 7, 2, 9, 9, 0, 8]
+    out = delta._sorted_unique(array("Q", keys))
+    assert list(out) == sorted(set(keys))
+
+
+@pytest.mark.parametrize("run", [1, 3, 64])
+def test_repeated_keys(monkeypatch, run):
+    monkeypatch.setattr(delta, "_SORT_RUN", run)
+    keys = array("Q", [5, 3, 9, 3, 1, 5, 7, 2, 9, 9, 0, 8])
+    assert list(repeated_keys(keys)) == [3, 5, 9]
+    assert list(keys) == [5, 3, 9, 3, 1, 5, 7, 2, 9, 9, 0, 8]
+    assert list(repeated_keys(array("Q"))) == []
@@ -0,0 +1,76 @@
+import platform
+from dataclasses import replace
+
+import pytest
+
+from whatsapp_filter.config import AppConfig
+from whatsapp_filter.history import append_run, build_run_record, is_regression, load_runs, run_key
+from whatsapp_filter.stats import RunStats
+from whatsapp_filter.whatsapp import INVALID, VALID
+
+CFG = AppConfig(input="numbers.txt", mode="threaded", threads=4)
+
+
+def _record(cfg=CFG, checks_per_sec=10.0, **fields):
+    stats = RunStats()
+    for verdict in (VALID, INVALID, VALID):
+        stats.record(verdict, 1.5)
+    record = build_run_record(cfg, input_size=3, duration=2.0, valid=2, invalid=1, unknown=0, stats=stats)
+    record["checks_per_sec"] = checks_per_sec
+    record.update(fields)
+    return record
+
+
+def test_build_run_record():
+    fresh = _record()
+    assert fresh["host"] == platform.node()
+    assert fresh["mode"] == "threaded" and fresh["threads"] == 4
+    assert fresh["checks"] == 3
+    assert fresh["valid"] == 2 and fresh["invalid"] == 1 and fresh["unknown"] == 0
+    assert fresh["recording"] is False
+    assert fresh["config"]["input"] == "numbers.txt"
+    assert fresh["latency"]["p50"] == pytest.approx(1.5, abs=0.1)
+    measured = build_run_record(CFG, input_size=3, duration=2.0, valid=2, invalid=1, unknown=0, stats=RunStats())
+    assert measured["checks_per_sec"] == 0.0
+
+
+def test_records_roundtrip(tmp_path):
+    path = tmp_path / "h" / "runs.jsonl"
+    append_run(path, _record())
+    with path.open("a") as f:
+        f.write("{not json\n\n")
+    append_run(path, _record(checks_per_sec=5.0))
+    runs = load_runs(path)
+    assert [r["checks_per_sec"] for r in runs] == [10.0, 5.0]
+
+
+def test_regression_against_median_of_comparable_runs():
+    previous = [_record(checks_per_sec=r) for r in (9.0, 10.0, 11.0, 100.0, 10.0)]
+    assert is_regression(_record(checks_per_sec=6.0), previous, 0.7) == 10.0
+    assert is_regression(_record(checks_per_sec=7.5), previous, 0.7) is None
+    assert is_regression(_record(checks_per_sec=1.0), [], 0.7) is None
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"host": "other-machine"},
+        {"batch_size": 20},
+        {"verdict_detector": "network"},
+        {"recording": True},
+        {"adaptive_timeout": True},
+        {"threads": 8},
+    ],
+)
+def test_runs_with_other_settings_are_not_a_baseline(changes):
+    previous = [_record(checks_per_sec=10.0) for _ in range(3)]
+    record = _record(checks_per_sec=1.0, **changes)
+    assert run_key(record) != run_key(previous[0])
+    assert is_regression(record, previous, 0.7) is None
+
+
+def test_key_of_older_records_falls_back_to_their_config():
+    old = _record(cfg=replace(CFG, batch_size=20, record_dir="corpus"))
+    for field in ("batch_size", "verdict_detector", "recording", "adaptive_timeout"):
+        del old[field]
+    assert run_key(old) == run_key(_record(cfg=replace(CFG, batch_size=20, record_dir="other")))
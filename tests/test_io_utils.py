@@ -0,0 +1,82 @@
+import bz2
+import gzip
+
+import pytest
+
+from whatsapp_filter import delta
+from whatsapp_filter.io_utils import detect_input_format, iter_numbers, read_numbers_from_file, unique_numbers
+
+
+@pytest.mark.parametrize(
+    "name, column, expected",
+    [
+        ("numbers.txt", None, "lines"),
+        ("numbers.csv", None, "csv"),
+        ("numbers.CSV.gz", None, "csv"),
+        ("numbers.tsv.zst", None, "tsv"),
+        ("numbers.tab", None, "tsv"),
+        ("numbers.txt", "phone", "csv"),
+    ],
+)
+def test_detect_input_format(tmp_path, name, column, expected):
+    assert detect_input_format(tmp_path / name, "auto", column) == expected
+
+
+@pytest.mark.parametrize(
+    "content, column, expected",
+    [
+        # A known phone header is found wherever it is.
+        ("name,Mobile,city\nAli,923001,LHR\nBo,923002,KHI\n", None, ["923001", "923002"]),
+        # Unknown headers: the first column, header row skipped.
+        ("id,notes\n923001,x\n923002,y\n", None, ["923001", "923002"]),
+        # No header: the first row is data.
+        ("923001,x\n923002,y\n", None, ["923001", "923002"]),
+        # Named column, case-insensitive.
+        ("a,Tel,b\n1,923001,2\n3,923002,4\n", "tel", ["923001", "923002"]),
+        # Column by index, with and without a header row.
+        ("name,num\nAli,923001\n", "1", ["923001"]),
+        ("Ali,923001\nBo,923002\n", "1", ["923001", "923002"]),
+        # Short rows, blanks and comments are skipped; quoting is honored.
+        ('phone,name\n923001,"Ali, A."\n\n#923009,x\n,y\n"923002",z\n', None, ["923001", "923002"]),
+    ],
+)
+def test_csv_column_sniffing(tmp_path, content, column, expected):
+    path = tmp_path / "in.csv"
+    path.write_text(content, encoding="utf-8")
+    assert list(iter_numbers(path, "auto", column)) == expected
+
+
+def test_tsv_with_bom_and_crlf(tmp_path):
+    path = tmp_path / "in.tsv"
+    path.write_bytes("\ufeffname\tphone\r\nAli\t923001\r\nBo\t923002\r\n".encode("utf-8"))
+    assert list(iter_numbers(path)) == ["923001", "923002"]
+
+
+def test_unknown_column_is_an_error(tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_text("a,b\n1,2\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_numbers(path, column="phone"))
+
+
+@pytest.mark.parametrize("opener, suffix", [(gzip.open, ".gz"), (bz2.open, ".bz2")])
+def test_compressed_input(tmp_path, opener, suffix):
+    path = tmp_path / f"in.csv{suffix}"
+    with opener(path, "wt", encoding="utf-8") as f:
+        f.write("phone\n923001\n923002\n")
+    assert list(iter_numbers(path)) == ["923001", "923002"]
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_read_dedups_in_first_seen_order(tmp_path, newline):
+    path = tmp_path / "in.txt"
+    lines = ["923001", "923002", "# comment", "", "923001", " 923003 ", "923002"]
+    path.write_bytes(newline.join(lines).encode("utf-8"))
+    assert read_numbers_from_file(path) == ["923001", "923002", "923003"]
+
+
+def test_unique_numbers_keys_on_digits(monkeypatch):
+    monkeypatch.setattr(delta, "_SORT_RUN", 2)
+    numbers = ["+92 300 1234567", "15551234", "923001234567", "n/a", "0155", "155", "n/a", "15551234", "0155"]
+    assert unique_numbers(iter(numbers)) == ["+92 300 1234567", "15551234", "n/a", "0155", "155"]
+    assert unique_numbers(["1", "2", "3"]) == ["1", "2", "3"]
@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from whatsapp_filter import logger
+
+
+@pytest.fixture(autouse=True)
+def reset_logging():
+    yield
+    logger.shutdown_logging()
+    logger.configure_logging(async_mode=False)
+
+
+def test_rotation_counts_bytes_not_characters(tmp_path):
+    path = tmp_path / "run.log"
+    f = logger._RotatingFile(path, max_bytes=100, backups=2)
+    line = "é" * 30  # 60 bytes + newline
+    for _ in range(5):
+        f.write(line)
+        f.flush()
+        assert path.stat().st_size <= 100
+    f.close()
+    assert path.with_name("run.log.1").exists()
+    assert path.with_name("run.log.2").exists()
+    assert not path.with_name("run.log.3").exists()
+
+
+def test_arguments_below_the_level_are_never_formatted(capsys):
+    class Loud:
+        formatted = 0
+
+        def __str__(self):
+            Loud.formatted += 1
+            return "loud"
+
+    logger.configure_logging(level="INFO", async_mode=False)
+    logger.debug("checked %s", Loud())
+    assert Loud.formatted == 0
+    logger.info("checked %s", Loud())
+    assert Loud.formatted == 1
+    assert "checked loud" in capsys.readouterr().out
+
+
+def test_flush_writes_queued_lines_before_returning(capsys):
+    logger.configure_logging(level="INFO")
+    for i in range(200):
+        logger.info("line %d", i)
+    logger.flush_logging()
+    print("REPORT")
+    out = capsys.readouterr().out.splitlines()
+    assert out[-1] == "REPORT"
+    assert sum("] [INFO] line " in line for line in out) == 200
+
+
+def test_nothing_is_lost_when_logging_races_shutdown(capsys):
+    logger.configure_logging(level="INFO")
+    per_thread, threads = 300, 4
+    start = threading.Barrier(threads + 1)
+
+    def spam(k):
+        start.wait()
+        for i in range(per_thread):
+            logger.info("t%d %d", k, i)
+
+    workers = [threading.Thread(target=spam, args=(k,)) for k in range(threads)]
+    for w in workers:
+        w.start()
+    start.wait()
+    logger.shutdown_logging()
+    for w in workers:
+        w.join()
+    out = capsys.readouterr().out
+    assert sum("] [INFO] t" in line for line in out.splitlines()) == per_thread * threads
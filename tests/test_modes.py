@@ -0,0 +1,286 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from whatsapp_filter import modes
+from whatsapp_filter.supervisor import WorkerFailed
+from whatsapp_filter.whatsapp import INVALID, UNKNOWN, VALID
+
+
+class FakeSupervisor:
+    """Stands in for DriverSupervisor: odd numbers are valid, numbers in `broken` always crash the browser."""
+
+    def __init__(self, label="", broken=(), pause=0.0):
+        self.label = label
+        self.broken = set(broken)
+        self.pause = pause
+        self.driver = None
+        self.batch_size = 0
+        self.checked = []
+
+    def start(self):
+        self.driver = object()
+
+    def quit(self):
+        self.driver = None
+
+    def prepaid(self, number):
+        return False
+
+    def lookup_ahead(self, numbers, start, budget=None):
+        return None
+
+    def check(self, number):
+        self.checked.append(number)
+        if number in self.broken:
+            raise WorkerFailed(f"{self.label} browser crashed")
+        time.sleep(self.pause)
+        return (VALID if int(number) % 2 else INVALID), "fake"
+
+
+class FakeSupervisorPool:
+    def __init__(self, supervisor_cls=FakeSupervisor, **kwargs):
+        self.supervisor_cls = supervisor_cls
+        self.kwargs = kwargs
+        self.supervisors = {}
+
+    def get(self, profile_suffix, label="", expect_session=True):
+        if profile_suffix not in self.supervisors:
+            self.supervisors[profile_suffix] = self.supervisor_cls(label, **self.kwargs)
+        return self.supervisors[profile_suffix]
+
+    def park(self, profile_suffix):
+        pass
+
+    def close(self):
+        pass
+
+    def checked(self):
+        return [n for s in self.supervisors.values() for n in s.checked]
+
+
+@pytest.fixture(autouse=True)
+def no_session_cache(monkeypatch):
+    monkeypatch.setattr(modes, "is_known_expired", lambda *args: False)
+    monkeypatch.setattr(modes, "_SCHEDULER_TICK", 0.01)
+
+
+def _outputs(tmp_path):
+    return tmp_path / "valid.txt", tmp_path / "invalid.txt"
+
+
+def _threaded(tmp_path, numbers, supervisors, **kwargs):
+    valid_path, invalid_path = _outputs(tmp_path)
+    return modes.filter_numbers_threaded(
+        numbers, 0, valid_path, invalid_path, "chrome", True, None, supervisors=supervisors, **kwargs
+    )
+
+
+NUMBERS = [str(i) for i in range(40)]
+
+
+def test_one_driver_submission_window_is_bounded(tmp_path, monkeypatch):
+    lock = threading.Lock()
+    outstanding = [0]
+    peak = [0]
+
+    class CountingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            with lock:
+                outstanding[0] += 1
+                peak[0] = max(peak[0], outstanding[0])
+            future = super().submit(fn, *args, **kwargs)
+            future.add_done_callback(lambda _: self._finished())
+            return future
+
+        def _finished(self):
+            with lock:
+                outstanding[0] -= 1
+
+    monkeypatch.setattr(modes, "ThreadPoolExecutor", CountingExecutor)
+    supervisor = FakeSupervisor(pause=0.002)
+    valid, invalid, unknown, _ = modes.filter_numbers_one_driver_threaded(
+        supervisor, NUMBERS, 0, *_outputs(tmp_path), max_workers=3
+    )
+    assert peak[0] == 3 * modes._SUBMIT_WINDOW_PER_WORKER
+    assert sorted(valid + invalid, key=int) == NUMBERS
+    assert unknown == []
+
+
+def test_threaded_cuts_a_chunk_only_when_a_slot_can_take_it(tmp_path, monkeypatch):
+    lock = threading.Lock()
+    alive = [0]
+    peak = [0]
+    chunk_list = modes._chunk_list
+    process_chunk = modes._process_numbers_chunk
+
+    def counting_chunks(lst, n):
+        for item in chunk_list(lst, n):
+            with lock:
+                alive[0] += 1
+                peak[0] = max(peak[0], alive[0])
+            yield item
+
+    def counting_process(chunk, *args):
+        try:
+            return process_chunk(chunk, *args)
+        finally:
+            with lock:
+                alive[0] -= 1
+
+    monkeypatch.setattr(modes, "_chunk_list", counting_chunks)
+    monkeypatch.setattr(modes, "_process_numbers_chunk", counting_process)
+    valid, invalid, unknown, _ = _threaded(
+        tmp_path, NUMBERS, FakeSupervisorPool(pause=0.002), max_workers=2, chunk_size=3
+    )
+    # One chunk per worker plus the next one waiting in `pending`.
+    assert peak[0] <= 2 + 1
+    assert sorted(valid + invalid, key=int) == NUMBERS
+    assert unknown == []
+
+
+def test_chunk_retries_stop_after_max_attempts(tmp_path):
+    supervisors = FakeSupervisorPool(broken={"7"})
+    valid, invalid, unknown, _ = _threaded(
+        tmp_path, [str(i) for i in range(10)], supervisors, max_workers=2, chunk_size=5, unknown_retries=0
+    )
+    assert supervisors.checked().count("7") == modes._MAX_CHUNK_ATTEMPTS
+    # The rest of the failing chunk is given up on together with it.
+    assert sorted(unknown, key=int) == ["7", "8", "9"]
+    assert sorted(valid + invalid, key=int) == ["0", "1", "2", "3", "4", "5", "6"]
+
+
+def test_requeued_rest_is_checked_by_another_attempt(tmp_path):
+    crashed = []
+
+    class FlakySupervisor(FakeSupervisor):
+        def check(self, number):
+            if number == "3" and not crashed:
+                crashed.append(number)
+                self.checked.append(number)
+                raise WorkerFailed("crashed once")
+            return super().check(number)
+
+    supervisors = FakeSupervisorPool(FlakySupervisor)
+    valid, invalid, unknown, _ = _threaded(
+        tmp_path, [str(i) for i in range(6)], supervisors, max_workers=1, chunk_size=6, unknown_retries=0
+    )
+    assert unknown == []
+    assert supervisors.checked().count("3") == 2
+    assert sorted(valid + invalid, key=int) == [str(i) for i in range(6)]
+
+
+class UnsureSupervisor(FakeSupervisor):
+    """Numbers in `first_unknown` answer UNKNOWN on their first check; `always_unknown` ones always do."""
+
+    def __init__(self, label="", first_unknown=(), always_unknown=()):
+        super().__init__(label)
+        self.first_unknown = set(first_unknown)
+        self.always_unknown = set(always_unknown)
+
+    def check(self, number):
+        if number in self.always_unknown or number in self.first_unknown:
+            self.first_unknown.discard(number)
+            self.checked.append(number)
+            return UNKNOWN, "fake"
+        return super().check(number)
+
+
+def _single(tmp_path, supervisor, numbers, **kwargs):
+    return modes.filter_numbers_single(supervisor, numbers, 0, *_outputs(tmp_path), **kwargs)
+
+
+@pytest.mark.parametrize("reorder_buffer", [None, 100])
+def test_run_stops_at_target_valid(tmp_path, reorder_buffer):
+    supervisor = FakeSupervisor()
+    valid, invalid, unknown, unchecked = _single(
+        tmp_path, supervisor, NUMBERS, target_valid=3, reorder_buffer=reorder_buffer
+    )
+    assert valid == ["1", "3", "5"]
+    assert invalid == ["0", "2", "4"]
+    assert supervisor.checked == [str(i) for i in range(6)]
+    assert unchecked == [str(i) for i in range(6, 40)]
+    assert unknown == []
+    assert (tmp_path / "valid.txt").read_text().split() == ["1", "3", "5"]
+
+
+@pytest.mark.parametrize("reorder_buffer", [None, 100])
+def test_unchecked_numbers_are_not_unknown(tmp_path, reorder_buffer):
+    # "0" is inconclusive; the target is reached before its retry pass.
+    supervisor = UnsureSupervisor(always_unknown={"0"})
+    valid, invalid, unknown, unchecked = _single(
+        tmp_path, supervisor, NUMBERS, target_valid=2, unknown_retries=1, reorder_buffer=reorder_buffer
+    )
+    assert valid == ["1", "3"]
+    assert unknown == ["0"]
+    assert unchecked == [str(i) for i in range(4, 40)]
+    assert supervisor.checked.count("0") == 1  # no retry pass once the target is in
+
+
+@pytest.mark.parametrize("reorder_buffer", [None, 100])
+def test_target_reached_during_retry_pass(tmp_path, reorder_buffer):
+    numbers = [str(i) for i in range(10)]
+    supervisor = UnsureSupervisor(first_unknown={"1", "3", "5", "7", "9"})
+    valid, invalid, unknown, unchecked = _single(
+        tmp_path, supervisor, numbers, target_valid=2, unknown_retries=2, reorder_buffer=reorder_buffer
+    )
+    assert invalid == ["0", "2", "4", "6", "8"]
+    assert valid == ["1", "3"]
+    # Checked once and inconclusive, then the run stopped: still unknown, not unchecked.
+    assert sorted(unknown, key=int) == ["5", "7", "9"]
+    assert unchecked == []
+
+
+def test_threaded_run_stops_at_target_valid(tmp_path):
+    supervisors = FakeSupervisorPool()
+    valid, invalid, unknown, unchecked = _threaded(
+        tmp_path, NUMBERS, supervisors, max_workers=1, chunk_size=4, target_valid=3
+    )
+    assert valid == ["1", "3", "5"]
+    assert sorted(supervisors.checked(), key=int) == [str(i) for i in range(6)]
+    assert sorted(unchecked, key=int) == [str(i) for i in range(6, 40)]
+    assert unknown == []
+
+
+@pytest.mark.parametrize("reorder_buffer", [None, 100])
+def test_unknown_numbers_are_rechecked_at_the_end(tmp_path, reorder_buffer):
+    numbers = [str(i) for i in range(6)]
+    supervisor = UnsureSupervisor(first_unknown={"1", "2"})
+    valid, invalid, unknown, unchecked = _single(
+        tmp_path, supervisor, numbers, unknown_retries=1, reorder_buffer=reorder_buffer
+    )
+    # The retry pass comes after the main pass, not right after the failure.
+    assert supervisor.checked == numbers + ["1", "2"]
+    assert sorted(valid, key=int) == ["1", "3", "5"]
+    assert sorted(invalid, key=int) == ["0", "2", "4"]
+    assert unknown == [] and unchecked == []
+
+
+def test_numbers_unknown_after_every_pass_stay_unknown(tmp_path):
+    supervisor = UnsureSupervisor(always_unknown={"4"})
+    numbers = [str(i) for i in range(6)]
+    valid, invalid, unknown, unchecked = _single(tmp_path, supervisor, numbers, unknown_retries=2)
+    assert supervisor.checked.count("4") == 3
+    assert unknown == ["4"]
+    assert "4" not in valid + invalid
+    written = (tmp_path / "valid.txt").read_text().split() + (tmp_path / "invalid.txt").read_text().split()
+    assert "4" not in written
+
+
+def test_threaded_retry_pass_rechecks_unknown_numbers(tmp_path):
+    first_unknown = {"3", "8"}  # shared: the retry may land on either worker
+
+    class SharedUnsure(UnsureSupervisor):
+        def __init__(self, label=""):
+            super().__init__(label)
+            self.first_unknown = first_unknown
+
+    supervisors = FakeSupervisorPool(SharedUnsure)
+    valid, invalid, unknown, _ = _threaded(
+        tmp_path, [str(i) for i in range(10)], supervisors, max_workers=2, chunk_size=5, unknown_retries=1
+    )
+    assert unknown == []
+    assert sorted(valid + invalid, key=int) == [str(i) for i in range(10)]
+    assert supervisors.checked().count("3") == supervisors.checked().count("8") == 2
@@ -0,0 +1,182 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from urllib.request import urlopen
+
+import pytest
+
+from whatsapp_filter.netdetect import NetworkDetector, classify_lookup_payload
+from whatsapp_filter.supervisor import DriverSupervisor, HealthSettings
+from whatsapp_filter.whatsapp import INVALID, VALID, WHATSAPP_WEB_URL
+
+# What the mock lookup endpoint answers, by requested phone number.
+LOOKUPS = {
+    "923001234567": {"status": 200, "jid": "923001234567@c.us"},
+    "923007654321": {"status": 404, "jid": "923007654321@c.us"},
+    "15551234": {"status": 404, "jid": "15551234@c.us"},
+    "4470000000": {"numberExists": True, "wid": "4470000000:12@s.whatsapp.net"},
+}
+
+
+class _LookupHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        phone = parse_qs(urlparse(self.path).query).get("phone", [""])[0]
+        body = json.dumps(LOOKUPS.get(phone, {})).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+@pytest.fixture
+def lookup_server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _LookupHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    host, port = httpd.server_address[:2]
+    yield f"http://{host}:{port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _perf_entry(method, params):
+    return {"level": "INFO", "message": json.dumps({"message": {"method": method, "params": params}})}
+
+
+class DevToolsDriver:
+    """
+    Stands in for Chrome with performance logging on: get() really fetches
+    the URL and records the DevTools events Chrome would log for it.
+    """
+
+    def __init__(self):
+        self._log = []
+        self._bodies = {}
+        self.body_fetches = []
+
+    def get(self, url):
+        with urlopen(url) as response:
+            body = response.read().decode("utf-8")
+        request_id = str(len(self._bodies) + 1)
+        self._bodies[request_id] = body
+        self._log.append(
+            _perf_entry("Network.responseReceived", {"requestId": request_id, "response": {"url": url}})
+        )
+        self._log.append(
+            _perf_entry("Network.loadingFinished", {"requestId": request_id, "encodedDataLength": len(body)})
+        )
+
+    def push_ws_text(self, payload):
+        self._log.append(
+            _perf_entry("Network.webSocketFrameReceived", {"response": {"opcode": 1, "payloadData": payload}})
+        )
+
+    def get_log(self, kind):
+        assert kind == "performance"
+        entries, self._log = self._log, []
+        return entries
+
+    def execute_cdp_cmd(self, cmd, params):
+        assert cmd == "Network.getResponseBody"
+        self.body_fetches.append(params["requestId"])
+        return {"body": self._bodies[params["requestId"]], "base64Encoded": False}
+
+
+def _lookup(driver, detector, base_url, phone, number=None):
+    detector.reset()
+    driver.get(f"{base_url}/lookup?phone={phone}")
+    return detector.poll(number or phone)
+
+
+def test_poll_classifies_lookup_responses_from_mock_server(lookup_server):
+    driver = DevToolsDriver()
+    detector = NetworkDetector(driver)
+
+    assert _lookup(driver, detector, lookup_server, "923001234567")[0] == VALID
+    assert _lookup(driver, detector, lookup_server, "923007654321")[0] == INVALID
+    assert _lookup(driver, detector, lookup_server, "4470000000")[0] == VALID
+    assert _lookup(driver, detector, lookup_server, "923000000000") is None
+
+
+def test_poll_ignores_response_for_longer_number(lookup_server):
+    driver = DevToolsDriver()
+    detector = NetworkDetector(driver)
+
+    # The response is for 15551234; 1555 is only a prefix of it.
+    assert _lookup(driver, detector, lookup_server, "15551234", number="1555") is None
+    assert _lookup(driver, detector, lookup_server, "15551234")[0] == INVALID
+
+
+def test_poll_reads_text_websocket_frames():
+    driver = DevToolsDriver()
+    detector = NetworkDetector(driver)
+    driver.push_ws_text(json.dumps({"id": "923001234567", "exists": False}))
+    assert detector.poll("+92 300 1234567")[0] == INVALID
+
+
+def test_reset_discards_earlier_events(lookup_server):
+    driver = DevToolsDriver()
+    detector = NetworkDetector(driver)
+    driver.get(f"{lookup_server}/lookup?phone=923001234567")
+    detector.reset()
+    assert detector.poll("923001234567") is None
+
+
+def test_bodies_are_fetched_for_lookup_urls_only(lookup_server):
+    driver = DevToolsDriver()
+    detector = NetworkDetector(driver)
+    detector.reset()
+    driver.get(f"{lookup_server}/send?phone=923001234567")
+    driver.get(f"{lookup_server}/static/app.js?v=923001234567")
+    assert detector.poll("923001234567") is None
+    assert driver.body_fetches == []
+
+    assert _lookup(driver, detector, lookup_server, "923001234567")[0] == VALID
+    assert driver.body_fetches == ["3"]
+
+
+@pytest.mark.parametrize(
+    "web_url, proxy, browser, enabled",
+    [
+        (WHATSAPP_WEB_URL, None, "chrome", False),
+        ("http://127.0.0.1:8000", None, "chrome", True),
+        (WHATSAPP_WEB_URL, "127.0.0.1:8080", "edge", True),
+        ("http://127.0.0.1:8000", None, "firefox", False),
+    ],
+)
+def test_network_detection_only_where_traffic_is_plaintext(web_url, proxy, browser, enabled):
+    settings = HealthSettings(web_url=web_url, proxy=proxy, verdict_detector="network")
+    supervisor = DriverSupervisor(browser, True, None, "worker_1", settings=settings)
+    assert supervisor.network_detection is enabled
+
+
+def test_detector_disables_itself_without_performance_log():
+    class NoLogDriver:
+        def get_log(self, kind):
+            raise ValueError("log type 'performance' not found")
+
+    detector = NetworkDetector(NoLogDriver())
+    assert detector.poll("923001234567") is None
+    assert not detector.available
+
+
+@pytest.mark.parametrize(
+    "payload, number, expected",
+    [
+        ('{"status": 404, "jid": "15551234@c.us"}', "1555", None),
+        ('{"status": 404, "jid": "15551234@c.us"}', "15551234", INVALID),
+        ('{"status": 200, "jid": "15551234@c.us"}', "155512345", None),
+        ('{"exists": true, "wid": "15551234:3@s.whatsapp.net"}', "15551234", VALID),
+        ('{"results": [{"phone": "+1 555 1234", "isRegistered": false}]}', "15551234", INVALID),
+        ('{"status": 200, "jid": "15551234@c.us", "exists": "yes"}', "15551234", VALID),
+        ('<html></html>', "15551234", None),
+        ('{not json', "15551234", None),
+    ],
+)
+def test_classify_lookup_payload(payload, number, expected):
+    assert classify_lookup_payload(payload, number) == expected
@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import Counter
+
+from whatsapp_filter.profiler import SamplingProfiler, format_summary, profile_run
+
+
+def _blocked_on(event):
+    event.wait()
+
+
+def test_collapsed_stacks_of_a_blocked_thread(tmp_path):
+    release = threading.Event()
+    workers = [
+        threading.Thread(target=_blocked_on, args=(release,), name=f"ThreadPoolExecutor-0_{i}") for i in range(2)
+    ]
+    for w in workers:
+        w.start()
+    profiler = SamplingProfiler(interval=0.005).start()
+    time.sleep(0.2)
+    profiler.stop()
+    release.set()
+    for w in workers:
+        w.join()
+
+    path = tmp_path / "out" / "run.collapsed"
+    profiler.write_collapsed(path)
+    lines = path.read_text().splitlines()
+    stacks = {}
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        stacks[stack] = int(count)
+        assert " " not in stack
+    # Both workers land under one root, without the profiler's own thread.
+    pool = [s for s in stacks if s.startswith("thread:ThreadPoolExecutor;")]
+    assert pool and all(";test_profiler.py:_blocked_on;" in s for s in pool)
+    assert not any(s.startswith("thread:profiler;") for s in stacks)
+    assert sum(stacks[s] for s in pool) >= 2 * profiler.ticks - 2
+    assert [int(line.rsplit(" ", 1)[1]) for line in lines] == sorted(stacks.values(), reverse=True)
+
+
+def test_summary_counts_self_and_inclusive_samples():
+    samples = Counter(
+        {
+            ("thread:main", "cli.py:run", "modes.py:check", "whatsapp.py:wait"): 6,
+            ("thread:main", "cli.py:run", "modes.py:check"): 2,
+            ("thread:worker", "api.py:loop", "modes.py:check", "modes.py:check"): 2,
+            ("thread:idle",): 5,
+        }
+    )
+    summary = format_summary(samples, duration=1.5, interval=0.01, top=3)
+    self_part, inclusive_part = summary.split("inclusive samples")
+    assert summary.startswith("Profile: 1.5s, 15 samples every 10ms across all threads")
+    assert "  40.0%         6  whatsapp.py:wait" in self_part
+    assert "  26.7%         4  modes.py:check" in self_part
+    # A recursive frame counts once per sample.
+    assert "  66.7%        10  modes.py:check" in inclusive_part
+    assert "  53.3%         8  cli.py:run" in inclusive_part
+
+
+def test_profile_run_writes_both_files(tmp_path):
+    with profile_run(tmp_path, interval=0.005):
+        time.sleep(0.05)
+    assert len(list(tmp_path.glob("profile_*.collapsed"))) == 1
+    summary = next(tmp_path.glob("profile_*.txt")).read_text()
+    assert summary.startswith("Profile: ")
@@ -0,0 +1,120 @@
+import io
+import time
+
+import pytest
+
+from whatsapp_filter import progress
+from whatsapp_filter.progress import ProgressDisplay, _fmt_duration
+from whatsapp_filter.stats import RunStats
+from whatsapp_filter.whatsapp import INVALID, UNKNOWN, VALID
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Terminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(progress.time, "monotonic", clock)
+    return clock
+
+
+def _stats(total=100):
+    stats = RunStats()
+    stats.add_total(total)
+    return stats
+
+
+def test_fmt_duration():
+    assert _fmt_duration(None) == "--:--"
+    assert _fmt_duration(65.9) == "01:05"
+    assert _fmt_duration(3 * 3600 + 61) == "3:01:01"
+
+
+def test_render_counts_rate_and_eta(clock):
+    stats = _stats(100)
+    display = ProgressDisplay(stats, stream=io.StringIO())
+    display._render()
+    for verdict in [VALID] * 6 + [INVALID] * 3 + [UNKNOWN]:
+        stats.record(verdict)
+    clock.now += 5.0
+    lines = display._render()
+    assert lines[0].startswith("Progress 10/100 (10.0%) | remaining 90 | 2.00 checks/s | ETA 00:45 |")
+    assert lines[1] == "Verdicts: valid 6 | invalid 3 | unknown 1"
+
+
+def test_rate_is_measured_over_the_recent_window(clock):
+    stats = _stats(1000)
+    display = ProgressDisplay(stats, stream=io.StringIO())
+    display._render()
+    # A fast start, then a slow stretch longer than the window.
+    for _ in range(100):
+        stats.record(VALID)
+    clock.now += 10.0
+    display._render()
+    for _ in range(4):
+        stats.record(VALID)
+        clock.now += 10.0
+        lines = display._render()
+    assert "0.10 checks/s" in lines[0]
+
+
+def test_worker_stuck_in_one_state_is_shown_as_stalled(clock):
+    stats = _stats()
+    stats.workers = {
+        "worker_1": ("checking", clock.now - progress._STALL_AFTER_S - 1),
+        "worker_2": ("checking", clock.now - 3),
+        "worker_3": ("idle", clock.now - 600),
+    }
+    lines = ProgressDisplay(stats, stream=io.StringIO())._render()[2:]
+    assert "STALLED (checking)" in lines[0] and "00:46" in lines[0]
+    assert "STALLED" not in lines[1]
+    assert "STALLED" not in lines[2]
+
+
+def test_terminal_block_is_redrawn_in_place_and_logs_go_above_it():
+    stream = Terminal()
+    display = ProgressDisplay(_stats(), stream=stream)
+    display._draw()
+    assert display._drawn_lines == 2
+    first = stream.getvalue()
+    assert first.count("\n") == 2 and "\x1b[" not in first.replace(progress._CLEAR_LINE, "")
+
+    log = io.StringIO()
+    display._write_log_line("a log line", log)
+    assert log.getvalue() == "a log line\n"
+    assert display._drawn_lines == 0
+    assert stream.getvalue()[len(first):].startswith("\x1b[2F")
+
+
+def test_without_terminal_a_plain_line_is_printed_now_and_then(clock):
+    stream = io.StringIO()
+    display = ProgressDisplay(_stats(), stream=stream)
+    display._draw()
+    clock.now += 1.0
+    display._draw()
+    assert len(stream.getvalue().splitlines()) == 1
+    clock.now += progress._PLAIN_INTERVAL_S
+    display._draw()
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 2 and all(line.startswith("Progress ") for line in lines)
+
+
+def test_stop_draws_a_final_line_and_restores_console_output(monkeypatch):
+    writers = []
+    monkeypatch.setattr(progress, "set_console_writer", writers.append)
+    stream = io.StringIO()
+    with ProgressDisplay(_stats(), refresh=0.01, stream=stream) as display:
+        time.sleep(0.05)
+    assert writers == [display._write_log_line, None]
+    assert stream.getvalue().splitlines()[-1].startswith("Progress 0/100")
@@ -0,0 +1,64 @@
+import pytest
+
+from whatsapp_filter.delta import KnownNumbers
+from whatsapp_filter.ranges import NumberRange, RangeSource, parse_shard
+
+
+def _source(*specs, shard=(1, 1), known=None):
+    return RangeSource([NumberRange.parse(s) for s in specs], shard=shard, known=known)
+
+
+def test_parse_keeps_subscriber_width():
+    rng = NumberRange.parse("+92300:0000098-0000101")
+    assert len(rng) == 4
+    assert [rng.number(i) for i in range(len(rng))] == [
+        "923000000098", "923000000099", "923000000100", "923000000101",
+    ]
+
+
+@pytest.mark.parametrize("spec", ["92300", "92300:1-99", "92300:9-1", "9a:0-9"])
+def test_parse_rejects_bad_specs(spec):
+    with pytest.raises(ValueError):
+        NumberRange.parse(spec)
+
+
+@pytest.mark.parametrize("spec", ["0/3", "4/3", "2", "a/b"])
+def test_parse_shard_rejects_bad_specs(spec):
+    with pytest.raises(ValueError):
+        parse_shard(spec)
+
+
+@pytest.mark.parametrize("shards", [1, 2, 3, 4, 7, 25])
+def test_shards_partition_the_ranges(shards):
+    specs = ("1:00-09", "2:0-4", "3:000-007")
+    everything = list(_source(*specs))
+    assert len(everything) == 23
+
+    parts = [list(_source(*specs, shard=(k, shards))) for k in range(1, shards + 1)]
+    assert [n for part in parts for n in part] == everything
+    assert max(map(len, parts)) - min(map(len, parts)) <= 1
+    for k, part in enumerate(parts, start=1):
+        assert len(_source(*specs, shard=(k, shards))) == len(part)
+
+
+def test_shard_boundary_inside_a_range():
+    # 2 + 5 numbers; the second half starts in the middle of the second range.
+    assert list(_source("1:0-1", "2:0-4", shard=(2, 2))) == ["21", "22", "23", "24"]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 8, 100])
+def test_segments_cover_the_shard_in_order(size):
+    src = _source("5:000-019", shard=(2, 2))
+    segments = list(src.segments(size))
+    assert all(0 < len(s) <= size for s in segments)
+    assert all(len(s) == size for s in segments[:-1])
+    assert [n for s in segments for n in s] == [f"5{i:03d}" for i in range(10, 20)]
+
+
+def test_known_numbers_are_skipped_and_counted(tmp_path):
+    path = tmp_path / "valid.txt"
+    path.write_text("7001\n7003\n9999\n", encoding="utf-8")
+    src = _source("7:000-004", known=KnownNumbers.from_files([path]))
+    assert [n for s in src.segments(2) for n in s] == ["7000", "7002", "7004"]
+    assert src.skipped == 2
+    assert src.generated == 3
@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from whatsapp_filter.modes import _Results
+from whatsapp_filter.reorder import ReorderBuffer
+from whatsapp_filter.whatsapp import INVALID, UNKNOWN, VALID
+
+
+def _collector():
+    emitted = []
+    return emitted, lambda index, number, verdict: emitted.append((index, number, verdict))
+
+
+def test_results_come_out_in_index_order():
+    emitted, emit = _collector()
+    buf = ReorderBuffer(emit, capacity=100)
+    for index in (2, 0, 3, 1):
+        buf.put(index, f"n{index}", VALID)
+    assert [i for i, _, _ in emitted] == [0, 1, 2, 3]
+    assert buf.buffered == 0
+
+
+def test_spilled_results_are_read_back_in_order(tmp_path):
+    emitted, emit = _collector()
+    buf = ReorderBuffer(emit, capacity=8, spill_dir=str(tmp_path))
+    order = list(range(1, 200))
+    random.Random(7).shuffle(order)
+    for index in order:
+        buf.put(index, f"n{index}", VALID)
+    # Index 0 holds everything back; most of it went to disk.
+    assert emitted == []
+    assert buf.buffered == 199
+    assert list(tmp_path.glob("wa_reorder_*.sqlite"))
+
+    buf.put(0, "n0", VALID)
+    assert [i for i, _, _ in emitted] == list(range(200))
+    buf.close()
+    assert not list(tmp_path.glob("wa_reorder_*.sqlite"))
+
+
+def test_close_skips_gaps_and_keeps_order(tmp_path):
+    emitted, emit = _collector()
+    buf = ReorderBuffer(emit, capacity=4, spill_dir=str(tmp_path))
+    for index in (9, 3, 7, 5, 11, 13, 1):
+        buf.put(index, f"n{index}", INVALID)
+    buf.close()
+    assert [i for i, _, _ in emitted] == [1, 3, 5, 7, 9, 11, 13]
+
+
+def test_duplicate_index_is_rejected():
+    buf = ReorderBuffer(lambda *a: None, capacity=4)
+    buf.put(0, "n0", VALID)
+    with pytest.raises(ValueError):
+        buf.put(0, "n0", VALID)
+
+
+def test_deferred_unknown_does_not_hold_back_later_results(tmp_path):
+    results = _Results(tmp_path / "valid.txt", tmp_path / "invalid.txt", reorder_buffer=4)
+    results.begin_pass(final=False)
+    results.add("n0", INVALID, index=0)
+    results.add("n1", UNKNOWN, index=1)
+    results.add("n2", VALID, index=2)
+    assert results.invalid == ["n0"]
+    assert results.valid == ["n2"]
+
+    # The retry pass is ordered on its own and follows the first pass.
+    assert results.take_unknown() == ["n1"]
+    results.begin_pass(final=True)
+    results.add("n1", VALID, index=0)
+    results.finish()
+    assert (tmp_path / "valid.txt").read_text().split() == ["n2", "n1"]
+    assert results.unknown == []
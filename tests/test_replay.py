@@ -0,0 +1,98 @@
+import gzip
+import json
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from whatsapp_filter import replay
+from whatsapp_filter.replay import ReplayReport, ReplayResult, ReplayServer, load_corpus, replay_corpus
+from whatsapp_filter.whatsapp import INVALID, UNKNOWN, VALID
+
+HEADER = "<header data-testid='conversation-header'>chat</header>"
+
+
+def _write_record(corpus, name, number, verdict, events):
+    record = {"number": number, "verdict": verdict, "reason": "", "latency": 1.25, "events": events}
+    with gzip.open(corpus / f"{name}.json.gz", "wt", encoding="utf-8") as f:
+        json.dump(record, f)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    events = [{"t": 0.0, "sig": "0000", "html": ""}, {"t": 0.4, "sig": "0010", "html": HEADER}]
+    _write_record(tmp_path, "1", "923001", VALID, events)
+    _write_record(tmp_path, "2", "923002", INVALID, [{"t": 0.2, "sig": "1000", "html": "</script>popup"}])
+    _write_record(tmp_path, "3", "923003", VALID, [])
+    (tmp_path / "4.json.gz").write_bytes(b"not gzip")
+    with gzip.open(tmp_path / "5.json.gz", "wt", encoding="utf-8") as f:
+        json.dump({"number": "923005"}, f)
+    return tmp_path
+
+
+def test_load_corpus_skips_unreadable_records(corpus):
+    checks = list(load_corpus(corpus))
+    assert [c.number for c in checks] == ["923001", "923002", "923003"]
+    assert checks[0].verdict == VALID and checks[0].latency == 1.25
+    assert [e["t"] for e in checks[0].events] == [0.0, 0.4]
+    assert checks[1].path == corpus / "2.json.gz"
+
+
+def test_replay_server_serves_recorded_pages(corpus):
+    with ReplayServer(list(load_corpus(corpus))) as server:
+        with urlopen(f"{server.url}/") as response:
+            assert "data-testid='app'" in response.read().decode("utf-8")
+        with urlopen(f"{server.url}/send?phone=923001&text=") as response:
+            page = response.read().decode("utf-8")
+        assert "conversation-header" in page
+        with urlopen(f"{server.url}/send?phone=923002") as response:
+            # A recorded "</script>" cannot end the player script early.
+            assert "<\\/script>popup" in response.read().decode("utf-8")
+        with pytest.raises(HTTPError) as e:
+            urlopen(f"{server.url}/send?phone=999")
+        assert e.value.code == 404
+
+
+def test_report_confusion_and_accuracy():
+    report = ReplayReport(
+        [
+            ReplayResult("1", VALID, VALID, 1.0, 0.5),
+            ReplayResult("2", VALID, VALID, 1.0, 0.5),
+            ReplayResult("3", INVALID, UNKNOWN, 1.0, 15.0),
+            ReplayResult("4", INVALID, INVALID, 1.0, 0.5),
+        ]
+    )
+    assert report.confusion() == {(VALID, VALID): 2, (INVALID, UNKNOWN): 1, (INVALID, INVALID): 1}
+    assert report.accuracy == 0.75
+    assert ReplayReport().accuracy == 0.0
+
+
+class ReplayDriver:
+    def __init__(self):
+        self.quit_calls = 0
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+def test_failed_record_is_a_mismatch_and_the_replay_goes_on(corpus, monkeypatch):
+    driver = ReplayDriver()
+    monkeypatch.setattr(replay, "create_driver", lambda **kwargs: driver)
+
+    def open_chat(driver, number, on_loaded=None, **kwargs):
+        if number == "923002":
+            raise RuntimeError("page crashed")  # before the page loaded
+        on_loaded()
+        return VALID, "header"
+
+    monkeypatch.setattr(replay, "open_chat_for_number", open_chat)
+    report = replay_corpus(corpus)
+    assert [r.number for r in report.results] == ["923001", "923002", "923003"]
+    failed = report.results[1]
+    assert failed.got == replay.REPLAY_ERROR and not failed.correct
+    assert "page crashed" in failed.reason
+    assert report.confusion() == {(VALID, VALID): 2, (INVALID, replay.REPLAY_ERROR): 1}
+    assert driver.quit_calls == 1
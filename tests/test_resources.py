@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from whatsapp_filter import resources
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "killpg"), reason="process groups are POSIX-only")
+
+
+def _gone(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split()[2] == "Z"
+    except FileNotFoundError:
+        return True
+
+
+def _wait_gone(pid, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if _gone(pid):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def _driver_with_child(**popen_kw):
+    """A stand-in WebDriver: a shell that starts a long-running "browser" child."""
+    proc = subprocess.Popen(
+        ["sh", "-c", "sleep 60 & echo $!; wait"], stdout=subprocess.PIPE, text=True, **popen_kw
+    )
+    child = int(proc.stdout.readline())
+    return proc, child
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_fallback_kills_the_drivers_process_group(monkeypatch):
+    monkeypatch.setattr(resources, "psutil", None)
+    proc, child = _driver_with_child(start_new_session=True)
+    try:
+        resources.kill_process_tree(proc.pid)
+        proc.wait(timeout=5)
+        assert _wait_gone(child)
+    finally:
+        if not _gone(child):
+            os.kill(child, 9)
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_fallback_never_kills_our_own_group(monkeypatch):
+    monkeypatch.setattr(resources, "psutil", None)
+    proc, child = _driver_with_child()
+    try:
+        resources.kill_process_tree(proc.pid)
+        proc.wait(timeout=5)
+        assert not _gone(child)  # not its group leader: only the pid itself was killed
+    finally:
+        os.kill(child, 9)
@@ -0,0 +1,145 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from whatsapp_filter import server
+from whatsapp_filter.api import CheckResult
+from whatsapp_filter.server import CheckService, ResultCache
+from whatsapp_filter.stats import RunStats
+from whatsapp_filter.whatsapp import INVALID, UNKNOWN, VALID
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(server.time, "monotonic", clock)
+    return clock
+
+
+def _result(number, verdict=VALID):
+    return CheckResult(number, verdict, "fake")
+
+
+def test_cache_expires_entries_after_the_ttl(clock):
+    cache = ResultCache(ttl=60.0, max_size=10)
+    cache.put(_result("1"))
+    clock.now += 59.0
+    assert cache.get("1").verdict == VALID
+    clock.now += 2.0
+    assert cache.get("1") is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_evicts_the_least_recently_used(clock):
+    cache = ResultCache(ttl=60.0, max_size=2)
+    cache.put(_result("1"))
+    cache.put(_result("2", INVALID))
+    cache.get("1")
+    cache.put(_result("3"))
+    assert cache.get("2") is None
+    assert cache.get("1") is not None and cache.get("3") is not None
+
+
+def test_cache_keeps_only_conclusive_answers(clock):
+    cache = ResultCache(ttl=60.0, max_size=10)
+    cache.put(_result("1", UNKNOWN))
+    assert cache.get("1") is None
+    disabled = ResultCache(ttl=0, max_size=10)
+    disabled.put(_result("1"))
+    assert disabled.get("1") is None and len(disabled) == 0
+
+
+class WatchedFuture(Future):
+    def __init__(self):
+        super().__init__()
+        self.waiters = 0
+
+    def result(self, timeout=None):
+        self.waiters += 1
+        return super().result(timeout)
+
+
+class FakeChecker:
+    """Checks finish only when the test resolves them."""
+
+    workers = live_workers = 1
+
+    def __init__(self):
+        self.stats = RunStats()
+        self.submitted = []
+        self.futures = {}
+
+    def submit(self, number):
+        future = self.futures[number] = WatchedFuture()
+        self.submitted.append(number)
+        return future
+
+    def finish(self, number, verdict=VALID):
+        self.futures[number].set_result(_result(number, verdict))
+
+
+def _wait_until(condition):
+    deadline = time.monotonic() + 5.0
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def _lookup_in_background(service, numbers):
+    answers = []
+    thread = threading.Thread(target=lambda: answers.extend(service.lookup(numbers)), daemon=True)
+    thread.start()
+    return thread, answers
+
+
+def test_concurrent_lookups_of_a_number_share_one_check():
+    checker = FakeChecker()
+    service = CheckService(checker, ResultCache(ttl=60.0, max_size=10))
+    first, first_answers = _lookup_in_background(service, ["1", "2", "1"])
+    second, second_answers = _lookup_in_background(service, ["1"])
+    _wait_until(lambda: "2" in checker.futures and checker.futures["1"].waiters == 2)
+    assert sorted(checker.submitted) == ["1", "2"]
+
+    checker.finish("1")
+    checker.finish("2", INVALID)
+    first.join(5)
+    second.join(5)
+    assert [(a["number"], a["verdict"], a["cached"]) for a in first_answers] == [
+        ("1", VALID, False),
+        ("2", INVALID, False),
+        ("1", VALID, False),
+    ]
+    assert second_answers[0]["verdict"] == VALID
+    assert service.health()["pending"] == 0
+
+    # Later requests are answered from the cache.
+    assert service.lookup(["2"])[0]["cached"] is True
+    assert sorted(checker.submitted) == ["1", "2"]
+
+
+def test_unknown_answer_is_checked_again_next_time():
+    checker = FakeChecker()
+    service = CheckService(checker, ResultCache(ttl=60.0, max_size=10))
+    thread, answers = _lookup_in_background(service, ["1"])
+    _wait_until(lambda: checker.submitted)
+    checker.finish("1", UNKNOWN)
+    thread.join(5)
+    assert answers[0]["verdict"] == UNKNOWN
+
+    thread, answers = _lookup_in_background(service, ["1"])
+    _wait_until(lambda: len(checker.submitted) == 2)
+    checker.finish("1")
+    thread.join(5)
+    assert answers[0]["verdict"] == VALID
+    assert checker.submitted == ["1", "1"]
@@ -0,0 +1,55 @@
+import json
+import time
+
+import pytest
+
+from whatsapp_filter import session
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(session, "_loaded", {})
+    return tmp_path
+
+
+def test_expired_record_within_ttl(cache_dir):
+    session.record_session("chrome", "worker_1", "expired")
+    assert session.is_known_expired("chrome", "worker_1", ttl=60)
+    assert not session.is_known_expired("chrome", "worker_2", ttl=60)
+    assert not session.is_known_expired("firefox", "worker_1", ttl=60)
+
+
+def test_old_expired_record_is_ignored(cache_dir):
+    path = session.session_cache_path()
+    path.parent.mkdir(parents=True)
+    key = "chrome_whatsapp_profile_worker_1"
+    path.write_text(json.dumps({key: {"state": "expired", "checked_at": time.time() - 120}}))
+    assert not session.is_known_expired("chrome", "worker_1", ttl=60)
+    assert session.is_known_expired("chrome", "worker_1", ttl=600)
+
+
+def test_cache_file_is_parsed_once(cache_dir, monkeypatch):
+    session.record_session("chrome", "worker_1", "expired")
+    reads = []
+    real_read = session._read
+    monkeypatch.setattr(session, "_read", lambda path: reads.append(path) or real_read(path))
+    for _ in range(100):
+        session.is_known_expired("chrome", "worker_1")
+    assert reads == []
+
+    # Writes keep the in-memory copy and the file in step.
+    session.record_session("chrome", "worker_1", "valid")
+    assert not session.is_known_expired("chrome", "worker_1")
+    saved = json.loads(session.session_cache_path().read_text())
+    assert saved["chrome_whatsapp_profile_worker_1"]["state"] == "valid"
+
+
+def test_needs_reclone_after_base_logs_in(cache_dir):
+    session.record_session("chrome", "worker_1", "expired")
+    assert not session.needs_reclone("chrome", "worker_1")
+    time.sleep(0.01)
+    session.record_session("chrome", "single", "valid")
+    assert session.needs_reclone("chrome", "worker_1")
+    session.forget_session("chrome", "worker_1")
+    assert not session.needs_reclone("chrome", "worker_1")
@@ -0,0 +1,166 @@
+import time
+
+import pytest
+
+from whatsapp_filter import supervisor
+from whatsapp_filter.supervisor import DriverSupervisor, HealthSettings
+from whatsapp_filter.whatsapp import INVALID, UNKNOWN, VALID
+
+
+def _supervisor(**settings):
+    sup = DriverSupervisor("chrome", True, None, "worker_1", settings=HealthSettings(recycle_after=0, **settings))
+    sup.driver = object()  # a "running" browser; nothing here talks to it
+    return sup
+
+
+def test_adaptive_latency_starts_at_page_load(monkeypatch):
+    def open_chat(driver, number, on_loaded=None, **kwargs):
+        time.sleep(0.3)  # driver.get
+        on_loaded()
+        time.sleep(0.02)  # waiting for the verdict
+        return VALID, "header"
+
+    monkeypatch.setattr(supervisor, "open_chat_for_number", open_chat)
+    sup = _supervisor(adaptive_timeout=True)
+    fed = []
+    monkeypatch.setattr(sup.timeouts, "record", lambda timeout, latency, conclusive: fed.append(latency))
+
+    assert sup.check("923001234567") == (VALID, "header")
+    assert fed == [pytest.approx(0.02, abs=0.1)]
+
+
+class LookupDriver:
+    """A logged-in page whose in-page lookup says odd numbers exist; `unsure` ones come back unknown."""
+
+    def __init__(self, exposes_lookup=True, unsure=()):
+        self.exposes_lookup = exposes_lookup
+        self.unsure = set(unsure)
+        self.batches = []
+        self.script_timeouts = []
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def set_script_timeout(self, seconds):
+        self.script_timeouts.append(seconds)
+
+    def get(self, url):
+        pass
+
+    def execute_async_script(self, script, numbers, timeout_ms):
+        self.batches.append(list(numbers))
+        if not self.exposes_lookup:
+            return None
+        return {n: UNKNOWN if n in self.unsure else VALID if int(n) % 2 else INVALID for n in numbers}
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def started(monkeypatch):
+    def start(driver, **settings):
+        monkeypatch.setattr(supervisor, "create_driver", lambda **kwargs: driver)
+        monkeypatch.setattr(supervisor, "wait_for_login", lambda *args, **kwargs: None)
+        monkeypatch.setattr(supervisor, "record_session", lambda *args: None)
+        sup = DriverSupervisor(
+            "chrome", True, None, "worker_1", settings=HealthSettings(**settings), expect_session=False
+        )
+        sup.start()
+        return sup
+
+    return start
+
+
+NUMBERS = [str(i) for i in range(10)]
+
+
+def test_script_timeout_is_set_once_at_start(started):
+    driver = LookupDriver()
+    sup = started(driver, batch_size=4, check_timeout=10.0)
+    for i in range(len(NUMBERS)):
+        sup.lookup_ahead(NUMBERS, i)
+    assert driver.script_timeouts == [15.0]
+    assert len(driver.batches) == 3
+
+
+def test_lookup_ahead_answers_a_batch_from_one_script(started):
+    driver = LookupDriver()
+    sup = started(driver, batch_size=4)
+    verdict, _, share = sup.lookup_ahead(NUMBERS, 0)
+    assert verdict == INVALID and share >= 0
+    assert driver.batches == [["0", "1", "2", "3"]]
+    assert sup.prepaid("1") and sup.prepaid("3") and not sup.prepaid("4")
+
+    assert sup.lookup_ahead(NUMBERS, 1)[0] == VALID
+    assert sup.lookup_ahead(NUMBERS, 2)[0] == INVALID
+    assert len(driver.batches) == 1
+    sup.lookup_ahead(NUMBERS, 4)
+    assert driver.batches[-1] == ["4", "5", "6", "7"]
+
+
+def test_lookup_ahead_batch_is_cut_to_the_budget(started):
+    driver = LookupDriver()
+    sup = started(driver, batch_size=4)
+    asked = []
+
+    def budget(n):
+        asked.append(n)
+        return 1
+
+    assert sup.lookup_ahead(NUMBERS, 0, budget)[0] == INVALID
+    assert asked == [3]
+    assert driver.batches == [["0", "1"]]
+    assert sup.prepaid("1") and not sup.prepaid("2")
+
+    # Near the end of the input only what is left is asked for.
+    sup.lookup_ahead(NUMBERS, 8, budget)
+    assert asked[-1] == 1
+    assert driver.batches[-1] == ["8", "9"]
+
+
+def test_inconclusive_numbers_go_through_check(started):
+    driver = LookupDriver(unsure={"1"})
+    sup = started(driver, batch_size=4)
+    assert sup.lookup_ahead(NUMBERS, 0)[0] == INVALID
+    assert sup.lookup_ahead(NUMBERS, 1) is None  # no second lookup for a number that was just tried
+    assert len(driver.batches) == 1
+
+
+def test_page_without_lookup_turns_batching_off(started):
+    driver = LookupDriver(exposes_lookup=False)
+    sup = started(driver, batch_size=4)
+    assert sup.lookup_ahead(NUMBERS, 0) is None
+    assert not sup.batch_supported
+    assert sup.lookup_ahead(NUMBERS, 1) is None
+    assert len(driver.batches) == 1
+
+
+class LoginDriver(LookupDriver):
+    def __init__(self, state):
+        super().__init__()
+        self.state = state
+        self.quit_calls = 0
+
+    def execute_script(self, script):
+        return self.state
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+def test_logged_out_profile_is_recorded_and_skipped(monkeypatch):
+    driver = LoginDriver("qr")
+    recorded = []
+    monkeypatch.setattr(supervisor, "create_driver", lambda **kwargs: driver)
+    monkeypatch.setattr(supervisor, "record_session", lambda browser, suffix, state: recorded.append(state))
+    sup = DriverSupervisor("chrome", True, None, "worker_1", settings=HealthSettings(qr_timeout=0.1))
+    with pytest.raises(supervisor.SessionExpired):
+        sup.start()
+    assert recorded == ["expired"]
+    assert driver.quit_calls == 1 and sup.driver is None
+
+    driver.state = "logged_in"
+    sup.start()
+    assert recorded == ["expired", "valid"]
+    assert sup.driver is driver
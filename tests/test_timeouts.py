@@ -0,0 +1,75 @@
+from whatsapp_filter import timeouts
+from whatsapp_filter.timeouts import AdaptiveTimeout, print_timeout_report
+
+
+def _feed(at, latencies, conclusive=True):
+    for latency in latencies:
+        at.record(at.current(), latency, conclusive)
+
+
+def test_ceiling_until_warmed_up():
+    at = AdaptiveTimeout(ceiling=15.0, floor=5.0, margin=2.0)
+    _feed(at, [1.0] * (timeouts._WARMUP - 1))
+    assert at.learned == 15.0
+    _feed(at, [1.0])
+    assert at.learned == 5.0  # 1s + 2s margin, raised to the floor
+
+
+def test_inconclusive_checks_do_not_teach():
+    at = AdaptiveTimeout(ceiling=15.0, floor=1.0, margin=1.0)
+    _feed(at, [14.0] * 50, conclusive=False)
+    assert at.learned == 15.0
+    _feed(at, [3.0] * timeouts._WARMUP)
+    assert at.learned == 4.0
+
+
+def test_learns_p99_plus_margin():
+    at = AdaptiveTimeout(ceiling=30.0, floor=1.0, margin=2.0)
+    # 100 verdicts: 98 fast, 2 slow; the p99 is one of the slow ones.
+    for latency in [1.0] * 98 + [6.0, 9.0]:
+        at.record(at.learned, latency, True)
+    assert at.learned == 8.0
+
+
+def test_learned_timeout_stays_within_bounds():
+    at = AdaptiveTimeout(ceiling=10.0, floor=4.0, margin=2.0)
+    _feed(at, [20.0] * timeouts._WARMUP)
+    assert at.learned == 10.0
+    at = AdaptiveTimeout(ceiling=10.0, floor=4.0, margin=0.0)
+    _feed(at, [0.5] * timeouts._WARMUP)
+    assert at.learned == 4.0
+
+
+def test_every_nth_check_probes_with_the_ceiling():
+    at = AdaptiveTimeout(ceiling=15.0, floor=1.0, margin=1.0)
+    _feed(at, [2.0] * timeouts._WARMUP)
+    assert at.learned == 3.0
+    used = []
+    for _ in range(3 * timeouts._PROBE_EVERY):
+        used.append(at.current())
+        at.record(used[-1], 2.0, True)
+    probes = [i for i, t in enumerate(used) if t == 15.0]
+    assert len(probes) == 3
+    assert all(b - a == timeouts._PROBE_EVERY for a, b in zip(probes, probes[1:]))
+    assert set(used) == {3.0, 15.0}
+
+
+def test_slow_verdict_on_a_probe_outweighs_fast_ones():
+    at = AdaptiveTimeout(ceiling=15.0, floor=1.0, margin=1.0)
+    _feed(at, [2.0] * timeouts._WARMUP)
+    assert at.learned == 3.0
+    while at.current() != at.ceiling:
+        at.record(at.current(), 2.0, True)
+    # One probe saw a 9s verdict the learned 3s timeout would have cut off.
+    at.record(at.ceiling, 9.0, True)
+    assert at.learned == 10.0
+
+
+def test_timeout_report(capsys):
+    print_timeout_report([(5, 30, 0), (15, 10, 4)])
+    out = capsys.readouterr().out
+    assert "=== Check timeouts ===" in out
+    assert "40 checks, 4 (10.0%) ran into their timeout" in out
+
+    print_timeout_report([])
+    assert "No navigated checks." in capsys.readouterr().out
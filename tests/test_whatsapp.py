@@ -0,0 +1,118 @@
+import time
+
+import pytest
+
+from whatsapp_filter import whatsapp
+from whatsapp_filter.whatsapp import INVALID, TIMEOUT_REASON, UNKNOWN, VALID, open_chat_for_number
+
+MODAL, BANNER, HEADER = whatsapp.DETECTION_XPATHS
+
+
+class PageDriver:
+    """Shows the elements in `shown` (xpath -> seconds after load it appears at)."""
+
+    def __init__(self, **shown):
+        self.shown = {{"modal": MODAL, "banner": BANNER, "header": HEADER}[k]: t for k, t in shown.items()}
+        self.urls = []
+
+    def get(self, url):
+        self.urls.append(url)
+        self.loaded_at = time.monotonic()
+
+    def find_elements(self, by, xpath):
+        at = self.shown.get(xpath)
+        return ["element"] if at is not None and time.monotonic() - self.loaded_at >= at else []
+
+
+@pytest.fixture(autouse=True)
+def no_settle_delay(monkeypatch):
+    monkeypatch.setattr(whatsapp, "_DOM_SETTLE_SECONDS", 0.0)
+
+
+def _check(driver, **kwargs):
+    return open_chat_for_number(driver, "+92 300 1234567", **kwargs)
+
+
+def test_invalid_popup_and_chat_header_are_conclusive():
+    driver = PageDriver(modal=0)
+    assert _check(driver)[0] == INVALID
+    assert driver.urls[0].startswith("https://web.whatsapp.com/send?phone=923001234567&")
+    assert _check(PageDriver(header=0))[0] == VALID
+
+
+def test_no_evidence_within_timeout_is_unknown():
+    started = time.monotonic()
+    assert _check(PageDriver(), timeout=0.6) == (UNKNOWN, TIMEOUT_REASON)
+    assert time.monotonic() - started < 2.0
+
+
+def test_persistent_retry_banner_is_unknown_after_the_grace_period():
+    started = time.monotonic()
+    verdict, reason = _check(PageDriver(banner=0), timeout=30.0, retry_grace=0.6)
+    assert verdict == UNKNOWN and "Retry banner" in reason
+    assert time.monotonic() - started < 3.0  # not the full timeout
+
+
+def test_retry_banner_followed_by_a_verdict_keeps_the_verdict():
+    assert _check(PageDriver(banner=0, header=0.4), timeout=30.0, retry_grace=2.0)[0] == VALID
+
+
+def test_on_loaded_runs_after_the_page_load():
+    driver = PageDriver(header=0)
+    calls = []
+    _check(driver, on_loaded=lambda: calls.append(len(driver.urls)))
+    assert calls == [1]
+
+
+class SessionDriver:
+    """Answers the session probe with `states` in turn (the last one repeats); exceptions are raised."""
+
+    def __init__(self, *states):
+        self.states = list(states)
+        self.scripts = []
+        self.screenshots = []
+
+    def execute_script(self, script):
+        self.scripts.append(script)
+        state = self.states.pop(0) if len(self.states) > 1 else self.states[0]
+        if isinstance(state, Exception):
+            raise state
+        return state
+
+    def save_screenshot(self, path):
+        self.screenshots.append(path)
+
+
+def test_probe_is_one_script_call():
+    driver = SessionDriver("loading")
+    assert whatsapp.probe_session_state(driver) == "loading"
+    assert driver.scripts == [whatsapp._SESSION_PROBE_JS]
+
+
+def test_login_waits_through_loading_and_probe_errors():
+    driver = SessionDriver("loading", RuntimeError("page is navigating"), "qr", "logged_in")
+    whatsapp.wait_for_login(driver, timeout=5, qr_timeout=10, poll_interval=0.01)
+    assert len(driver.scripts) == 4
+    assert driver.screenshots == []
+
+
+def test_qr_screen_fails_fast_with_qr_timeout():
+    started = time.monotonic()
+    with pytest.raises(whatsapp.LoginRequired):
+        whatsapp.wait_for_login(SessionDriver("qr"), timeout=30, qr_timeout=0.2, poll_interval=0.01)
+    assert time.monotonic() - started < 2.0
+
+
+def test_qr_timer_restarts_when_the_page_leaves_the_qr_screen():
+    # Five QR polls at a time, split by loading: far less than 2s in a row.
+    states = (["qr"] * 5 + ["loading"]) * 4 + ["logged_in"]
+    whatsapp.wait_for_login(SessionDriver(*states), timeout=10, qr_timeout=2.0, poll_interval=0.01)
+
+
+@pytest.mark.parametrize("state, error", [("qr", whatsapp.LoginRequired), ("loading", whatsapp.TimeoutException)])
+def test_login_timeout_says_whether_a_qr_code_was_showing(state, error):
+    driver = SessionDriver(state)
+    with pytest.raises(error) as e:
+        whatsapp.wait_for_login(driver, timeout=0.1, poll_interval=0.01)
+    assert (e.type is whatsapp.LoginRequired) == (state == "qr")
+    assert driver.screenshots == ["whatsapp_login_timeout.png"]
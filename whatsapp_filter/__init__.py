@@ -1,3 +1,14 @@
 # whatsapp_filter/__init__.py
 
-__version__ = "0.1.0"
\ No newline at end of file
+__version__ = "0.1.0"
+
+__all__ = ["Checker", "CheckResult"]
+
+
+def __getattr__(name):
+    # The API pulls in selenium; import it on first use so that light
+    # modules (io_utils, ranges, history, ...) load without a browser stack.
+    if name in __all__:
+        from . import api
+        return getattr(api, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
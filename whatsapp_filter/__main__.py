@@ -8,6 +8,10 @@ from .cli import (
     run_setup,
     run_config_menu_only,
     run_from_config,
+    autotune_from_config,
+    replay_from_config,
+    serve_from_config,
+    show_history,
 )
 from .config import load_config_file, merge_config
 
@@ -24,6 +28,10 @@ def main():
     if not config_path.is_absolute():
         config_path = (Path.cwd() / config_path).resolve()
 
+    if args.history:
+        show_history(config_path)
+        return
+
     if args.setup:
         cfg = run_setup(config_path=config_path)
         if args.auto_run_after_setup and cfg is not None:
@@ -39,6 +47,15 @@ def main():
     config_data = load_config_file(config_path)
     cli_overrides = collect_cli_overrides(args)
     cfg = merge_config(config_data, cli_overrides)
+    if args.serve:
+        serve_from_config(cfg)
+        return
+    if args.replay:
+        replay_from_config(cfg, args.replay)
+        return
+    if args.autotune:
+        autotune_from_config(cfg, config_path)
+        return
     run_from_config(cfg)
 
 
@@ -0,0 +1,218 @@
+# whatsapp_filter/accounts.py
+from __future__ import annotations
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .whatsapp import Verdict, UNKNOWN
+from .logger import info, warn
+
+
+@dataclass
+class Account:
+    """
+    One logged-in WhatsApp account and its profile family:
+    base profile `<name>` (logged in via --mode single --account <name>)
+    and worker clones `<name>_worker_<n>`.
+
+    The unnamed default account keeps the historical profile names
+    (`single` and `worker_<n>`).
+    """
+    name: str = ""
+    checks_per_hour: float = 0     # 0 = unlimited
+    threads: int = 0               # browsers for this account, 0 = use the run's `threads`
+
+    @property
+    def label(self) -> str:
+        return self.name or "default"
+
+    @property
+    def base_suffix(self) -> str:
+        return self.name or "single"
+
+    @property
+    def worker_prefix(self) -> str:
+        return f"{self.name}_" if self.name else ""
+
+    def worker_suffix(self, slot: int) -> str:
+        return f"{self.worker_prefix}worker_{slot}"
+
+
+def parse_accounts(raw: Optional[List[Any]], default_threads: int) -> List[Account]:
+    """Build accounts from the `accounts` config list (names or mappings)."""
+    if not raw:
+        return [Account(threads=default_threads)]
+
+    accounts: List[Account] = []
+    for item in raw:
+        if isinstance(item, str):
+            item = {"name": item}
+        if not isinstance(item, dict) or not item.get("name"):
+            raise ValueError(f"Invalid account entry (needs a 'name'): {item!r}")
+        acct = Account(**item)
+        if acct.threads <= 0:
+            acct.threads = default_threads
+        accounts.append(acct)
+
+    names = [a.name for a in accounts]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate account names in config: {names}")
+    return accounts
+
+
+@dataclass
+class _AccountState:
+    account: Account
+    free_slots: List[int]
+    tokens: float = 0.0
+    last_refill: float = field(default_factory=time.monotonic)
+    consecutive_unknown: int = 0
+    benched_until: float = 0.0
+    retired_slots: int = 0
+    retired: bool = False
+
+
+class AccountPool:
+    """
+    Hands out (account, worker slot) leases and enforces per-account rate
+    budgets with a token bucket (burst of one minute's budget).
+
+    An account showing throttling signals (`throttle_after` consecutive
+    unknown verdicts) is benched for `cooldown` seconds; one whose session
+    is gone has its slots retired for the rest of the run.
+    """
+
+    def __init__(
+        self,
+        accounts: List[Account],
+        throttle_after: int = 5,
+        cooldown: float = 900.0,
+    ) -> None:
+        self.throttle_after = throttle_after
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._states: Dict[str, _AccountState] = {}
+        for acct in accounts:
+            state = _AccountState(account=acct, free_slots=list(range(acct.threads, 0, -1)))
+            state.tokens = self._capacity(acct)
+            self._states[acct.name] = state
+
+    @staticmethod
+    def _capacity(acct: Account) -> float:
+        return max(1.0, acct.checks_per_hour / 60.0)
+
+    @property
+    def total_slots(self) -> int:
+        return sum(s.account.threads for s in self._states.values())
+
+    def _refill(self, state: _AccountState, now: float) -> None:
+        rate = state.account.checks_per_hour / 3600.0
+        state.tokens = min(self._capacity(state.account), state.tokens + (now - state.last_refill) * rate)
+        state.last_refill = now
+
+    def _available(self, state: _AccountState, now: float) -> bool:
+        return not state.retired and state.benched_until <= now and bool(state.free_slots)
+
+    # ---------- leases ----------
+
+    def acquire(self) -> Optional[Tuple[Account, int]]:
+        """Lease a worker slot on the usable account with the most budget left."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [s for s in self._states.values() if self._available(s, now)]
+            if not candidates:
+                return None
+            for s in candidates:
+                self._refill(s, now)
+
+            def score(s: _AccountState) -> float:
+                if s.account.checks_per_hour <= 0:
+                    return float("inf")
+                return s.tokens / self._capacity(s.account)
+
+            best = max(candidates, key=score)
+            return best.account, best.free_slots.pop()
+
+    def release(self, account: Account, slot: int, retire: bool = False) -> None:
+        with self._lock:
+            state = self._states[account.name]
+            if not retire:
+                state.free_slots.append(slot)
+                return
+            warn(f"[ACCOUNT {account.label}] Retiring worker slot {slot} (profile logged out).")
+            state.retired_slots += 1
+            if state.retired_slots >= account.threads:
+                state.retired = True
+                warn(f"[ACCOUNT {account.label}] All profiles logged out; account removed from rotation.")
+
+    def exhausted(self) -> bool:
+        """True if no account can ever take work again in this run."""
+        with self._lock:
+            return all(s.retired for s in self._states.values())
+
+    # ---------- budgets and throttling ----------
+
+    def wait_for_budget(self, account: Account) -> bool:
+        """
+        Block until `account` may run one more check. Returns False without
+        waiting if the account has been benched or retired meanwhile.
+        """
+        if account.checks_per_hour <= 0:
+            return self.is_usable(account)
+        while True:
+            with self._lock:
+                state = self._states[account.name]
+                now = time.monotonic()
+                if state.retired or state.benched_until > now:
+                    return False
+                self._refill(state, now)
+                if state.tokens >= 1.0:
+                    state.tokens -= 1.0
+                    return True
+                wait_s = (1.0 - state.tokens) * 3600.0 / account.checks_per_hour
+            time.sleep(min(wait_s, 5.0))
+
+    def take_budget(self, account: Account, wanted: int) -> int:
+        """
+        Charge up to `wanted` more checks to `account` without waiting, for
+        lookups that go out together (batched in-page lookups). Returns how
+        many were granted: all of them on an unlimited budget, none while
+        the account is benched or retired.
+        """
+        if account.checks_per_hour <= 0:
+            return wanted if self.is_usable(account) else 0
+        with self._lock:
+            state = self._states[account.name]
+            now = time.monotonic()
+            if state.retired or state.benched_until > now:
+                return 0
+            self._refill(state, now)
+            granted = min(wanted, int(state.tokens))
+            state.tokens -= granted
+            return granted
+
+    def is_usable(self, account: Account) -> bool:
+        with self._lock:
+            state = self._states[account.name]
+            return not state.retired and state.benched_until <= time.monotonic()
+
+    def report(self, account: Account, verdict: Verdict) -> None:
+        with self._lock:
+            state = self._states[account.name]
+            if verdict != UNKNOWN:
+                state.consecutive_unknown = 0
+                return
+            state.consecutive_unknown += 1
+            if state.consecutive_unknown >= self.throttle_after and len(self._states) > 1:
+                state.consecutive_unknown = 0
+                state.benched_until = time.monotonic() + self.cooldown
+                warn(
+                    f"[ACCOUNT {account.label}] {self.throttle_after} inconclusive checks in a row, "
+                    f"looks throttled; out of rotation for {self.cooldown:.0f}s."
+                )
+
+    def log_summary(self) -> None:
+        for s in self._states.values():
+            budget = f"{s.account.checks_per_hour:.0f}/h" if s.account.checks_per_hour > 0 else "unlimited"
+            info(f"[ACCOUNT {s.account.label}] browsers={s.account.threads} budget={budget}")
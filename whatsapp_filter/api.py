@@ -0,0 +1,336 @@
+# whatsapp_filter/api.py
+from __future__ import annotations
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, replace
+from typing import Any, Generator, Iterable, Iterator, List, Optional, Tuple
+
+from .config import AppConfig
+from .accounts import Account, AccountPool, parse_accounts
+from .drivers import prepare_worker_profiles
+from .supervisor import DriverSupervisor, HealthSettings, SessionExpired, WorkerFailed
+from .stats import RunStats
+from .whatsapp import Verdict, UNKNOWN
+from .logger import info, warn, error
+
+# A number whose browser fails is handed to another worker at most this many times.
+_MAX_ATTEMPTS = 2
+
+# A worker whose browser fails this many numbers in a row is stopped.
+_MAX_WORKER_FAILURES = 3
+
+# How often check_many looks for dead workers while waiting for results.
+_POLL_INTERVAL = 1.0
+
+# (generation, number, attempt, future). Jobs from submit() carry a future
+# and the generation _SUBMITTED, which is never abandoned.
+_Job = Tuple[int, str, int, "Optional[Future[CheckResult]]"]
+_SUBMITTED = 0
+
+
+@dataclass(frozen=True)
+class CheckResult:
+    number: str
+    verdict: Verdict
+    reason: str
+    latency: float = 0.0
+    worker: str = ""
+
+
+class Checker:
+    """
+    Embeddable checker that owns a pool of supervised, logged-in browsers.
+
+        with Checker(AppConfig(input="-", mode="threaded", threads=4)) as checker:
+            for result in checker.check_many(numbers):
+                ...
+
+    Mode "threaded" runs one browser per worker profile of each configured
+    account (cloned from the base profile like the CLI does); the other
+    modes run a single browser on the base profile. Browsers are started
+    lazily on their first check and kept for the checker's lifetime.
+
+    Nothing is written to the output files; callers get CheckResult objects.
+    """
+
+    def __init__(self, config: Optional[AppConfig] = None, **overrides: Any) -> None:
+        cfg = config or AppConfig(input="-")
+        self.config = replace(cfg, **overrides) if overrides else cfg
+        self.stats = RunStats()
+        self._jobs: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._results: "queue.Queue[Tuple[int, CheckResult]]" = queue.Queue()
+        self._generation = 0
+        self._busy = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._alive = 0
+        self._alive_lock = threading.Lock()
+        self._pool: Optional[AccountPool] = None
+        self._supervisors: List[DriverSupervisor] = []
+
+    @property
+    def workers(self) -> int:
+        return len(self._supervisors)
+
+    @property
+    def live_workers(self) -> int:
+        return self._alive
+
+    # ---------- lifecycle ----------
+
+    def start(self, warm: bool = False) -> "Checker":
+        """
+        Create the workers. With `warm`, every browser is launched and logged
+        in right away (in parallel) instead of on its first check.
+        """
+        if self._threads:
+            return self
+        cfg = self.config
+        health = HealthSettings.from_config(cfg)
+
+        threaded = cfg.mode == "threaded"
+        if threaded:
+            accounts = parse_accounts(cfg.accounts, default_threads=cfg.threads)
+            for account in accounts:
+                prepare_worker_profiles(
+                    browser=cfg.browser,
+                    max_workers=account.threads,
+                    base_suffix=account.base_suffix,
+                    worker_prefix=account.worker_prefix,
+                )
+            expect_session = True
+        else:
+            accounts = [Account(name=cfg.account or "", threads=1)]
+            expect_session = cfg.headless
+
+        self._pool = AccountPool(accounts, throttle_after=cfg.throttle_after, cooldown=cfg.throttle_cooldown)
+        # Each worker holds its slot's lease for its whole life.
+        leases = []
+        lease = self._pool.acquire()
+        while lease is not None:
+            leases.append(lease)
+            lease = self._pool.acquire()
+        for account, slot in leases:
+            label = f"[{account.label} {slot}]" if threaded else f"[{account.label}]"
+            supervisor = DriverSupervisor(
+                browser=cfg.browser,
+                headless=cfg.headless,
+                driver_path=cfg.driver_path,
+                profile_suffix=account.worker_suffix(slot) if threaded else account.base_suffix,
+                settings=health,
+                label=label,
+                expect_session=expect_session,
+                stats=self.stats,
+            )
+            self._supervisors.append(supervisor)
+            thread = threading.Thread(
+                target=self._worker_loop,
+                args=(supervisor, account, slot, warm),
+                name=f"checker{label}",
+                daemon=True,
+            )
+            self._threads.append(thread)
+
+        self._alive = len(self._threads)
+        for thread in self._threads:
+            thread.start()
+        info(f"Checker started with {len(self._threads)} browser worker(s) ({cfg.mode} mode).")
+        return self
+
+    def close(self) -> None:
+        """Stop the workers and quit all browsers."""
+        self._generation += 1
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join(timeout=self.config.hang_timeout + 10)
+        for supervisor in self._supervisors:
+            supervisor.quit()
+        self._threads, self._supervisors = [], []
+        self._fail_queued("checker closed")
+
+    def __enter__(self) -> "Checker":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---------- workers ----------
+
+    def _worker_loop(self, supervisor: DriverSupervisor, account: Account, slot: int, warm: bool = False) -> None:
+        assert self._pool is not None
+        failures = 0
+        logged_out = False
+        try:
+            if warm:
+                try:
+                    supervisor.start()
+                except SessionExpired as e:
+                    error("%s %s; worker stopped.", supervisor.label, e)
+                    logged_out = True
+                    return
+                except WorkerFailed as e:
+                    warn("%s %s; will retry on the first check.", supervisor.label, e)
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    return
+                generation, number, attempt, _ = job
+                if generation not in (_SUBMITTED, self._generation):
+                    continue  # abandoned by a closed check_many
+                if not self._pool.wait_for_budget(account):
+                    # Benched account: leave the number to the others.
+                    self._jobs.put(job)
+                    time.sleep(_POLL_INTERVAL)
+                    continue
+
+                started = time.monotonic()
+                try:
+                    verdict, reason = supervisor.check(number)
+                except WorkerFailed as e:
+                    if attempt < _MAX_ATTEMPTS:
+                        self._jobs.put((generation, number, attempt + 1, job[3]))
+                    else:
+                        self._finish(job, CheckResult(number, UNKNOWN, str(e), 0.0, supervisor.label))
+                    failures += 1
+                    if isinstance(e, SessionExpired) or failures >= _MAX_WORKER_FAILURES:
+                        error("%s %s; worker stopped.", supervisor.label, e)
+                        logged_out = isinstance(e, SessionExpired)
+                        return
+                    warn("%s %s; worker continues with a fresh browser.", supervisor.label, e)
+                    continue
+                failures = 0
+                latency = time.monotonic() - started
+                self._pool.report(account, verdict)
+                self._finish(job, CheckResult(number, verdict, reason, latency, supervisor.label))
+
+                if self.config.delay > 0:
+                    time.sleep(self.config.delay)
+        finally:
+            supervisor.quit()
+            self._pool.release(account, slot, retire=logged_out)
+            with self._alive_lock:
+                self._alive -= 1
+                last = self._alive <= 0
+            if last:
+                self._fail_queued("no live browser workers")
+
+    def _finish(self, job: _Job, result: CheckResult) -> None:
+        self.stats.record(result.verdict, result.latency if result.latency else None)
+        future = job[3]
+        if future is not None:
+            future.set_result(result)
+        else:
+            self._results.put((job[0], result))
+
+    def _fail_queued(self, reason: str) -> None:
+        """Answer every queued job with UNKNOWN (no worker will take it)."""
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None:
+                self._finish(job, CheckResult(job[1], UNKNOWN, reason))
+
+    # ---------- checks ----------
+
+    def submit(self, number: str) -> "Future[CheckResult]":
+        """
+        Queue one number and return a Future for its result. Safe to call
+        from many threads at once (and alongside check_many): all callers
+        share the same workers, which take numbers in arrival order.
+        """
+        self.start()
+        future: "Future[CheckResult]" = Future()
+        if self._alive <= 0:
+            future.set_result(CheckResult(number, UNKNOWN, "no live browser workers"))
+            return future
+        self.stats.add_total(1)
+        self._jobs.put((_SUBMITTED, number, 1, future))
+        return future
+
+    def check(self, number: str) -> CheckResult:
+        return self.submit(number).result()
+
+    def check_many(
+        self,
+        numbers: Iterable[str],
+        max_in_flight: Optional[int] = None,
+    ) -> Generator[CheckResult, None, None]:
+        """
+        Yield a CheckResult per number, in completion order (not input order).
+
+        `numbers` is consumed lazily from the caller's thread: at most
+        `max_in_flight` numbers (default: twice the worker count) are queued
+        or being checked at once, and no more are taken until the caller
+        has consumed results. An iterator of millions of numbers therefore
+        runs in constant memory.
+
+        One check_many may run at a time per Checker. If the caller stops
+        iterating early, numbers already handed to workers are discarded.
+        """
+        self.start()
+        if not self._busy.acquire(blocking=False):
+            raise RuntimeError("Checker.check_many is already running; use one Checker per concurrent stream.")
+        self._generation += 1
+        generation = self._generation
+        limit = max_in_flight or 2 * max(1, self.workers)
+        source = iter(numbers)
+        exhausted = False
+        in_flight = 0
+        try:
+            while True:
+                while not exhausted and in_flight < limit:
+                    try:
+                        number = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    self.stats.add_total(1)
+                    self._jobs.put((generation, number, 1, None))
+                    in_flight += 1
+                if in_flight == 0:
+                    return
+
+                try:
+                    result_gen, result = self._results.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    if self._alive <= 0:
+                        warn("No live browser workers left; remaining numbers are unknown.")
+                        yield from self._drain_unknown(generation)
+                        in_flight = 0
+                        if not exhausted:
+                            for number in source:
+                                yield CheckResult(number, UNKNOWN, "no live browser workers")
+                            exhausted = True
+                    continue
+                if result_gen != generation:
+                    continue
+                in_flight -= 1
+                yield result
+        finally:
+            if self._generation == generation:
+                self._generation += 1
+            self._busy.release()
+
+    def _drain_unknown(self, generation: int) -> Iterator[CheckResult]:
+        while True:
+            try:
+                result_gen, result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if result_gen == generation:
+                yield result
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is None:
+                continue
+            if job[0] == generation:
+                yield CheckResult(job[1], UNKNOWN, "no live browser workers")
+            else:
+                self._finish(job, CheckResult(job[1], UNKNOWN, "no live browser workers"))
@@ -0,0 +1,129 @@
+# whatsapp_filter/autoscale.py
+from __future__ import annotations
+import threading
+from typing import Optional
+
+from .resources import browser_tree_rss_mb, host_cpu_percent, host_free_memory_mb
+from .logger import info, debug, warn
+
+# Used to estimate the cost of one more worker before any browser is running.
+DEFAULT_WORKER_MEMORY_MB = 400.0
+
+
+class Autoscaler:
+    """
+    Periodically samples host free memory, CPU and the RSS of all browser
+    process trees, and moves a target worker count between min and max.
+
+    - Under pressure (low free memory, high CPU, browser RSS above the cap)
+      the target drops by one; running workers finish their current chunk
+      and are not replaced.
+    - With headroom for one more browser the target grows by one.
+
+    The scheduler only reads `target`; it never blocks on the sampler.
+    """
+
+    def __init__(
+        self,
+        min_workers: int,
+        max_workers: int,
+        initial: int,
+        min_free_memory_mb: float = 1024,
+        max_cpu_percent: float = 90.0,
+        max_browser_memory_mb: float = 0,
+        interval: float = 5.0,
+    ) -> None:
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.min_free_memory_mb = min_free_memory_mb
+        self.max_cpu_percent = max_cpu_percent
+        self.max_browser_memory_mb = max_browser_memory_mb
+        self.interval = interval
+
+        self._target = self._clamp(initial)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Prime psutil's CPU counter so the first real sample is meaningful.
+        host_cpu_percent()
+
+    def _clamp(self, n: int) -> int:
+        return max(self.min_workers, min(self.max_workers, n))
+
+    @property
+    def target(self) -> int:
+        return self._target
+
+    def adjust(self) -> int:
+        free_mb = host_free_memory_mb()
+        cpu = host_cpu_percent()
+        rss_mb = browser_tree_rss_mb()
+
+        if free_mb is None and cpu is None and rss_mb is None:
+            return self._target
+
+        current = self._target
+        per_worker_mb = DEFAULT_WORKER_MEMORY_MB
+        if rss_mb:
+            per_worker_mb = max(per_worker_mb, rss_mb / current)
+
+        pressure = (
+            (free_mb is not None and free_mb < self.min_free_memory_mb)
+            or (cpu is not None and cpu > self.max_cpu_percent)
+            or (self.max_browser_memory_mb > 0 and rss_mb is not None
+                and rss_mb > self.max_browser_memory_mb)
+        )
+        headroom = (
+            (free_mb is None or free_mb - per_worker_mb >= self.min_free_memory_mb)
+            and (cpu is None or cpu < self.max_cpu_percent * 0.8)
+            and (self.max_browser_memory_mb <= 0 or rss_mb is None
+                 or rss_mb + per_worker_mb <= self.max_browser_memory_mb)
+        )
+
+        if pressure:
+            new_target = self._clamp(current - 1)
+        elif headroom:
+            new_target = self._clamp(current + 1)
+        else:
+            new_target = current
+
+        debug(
+            f"[AUTOSCALE] free={free_mb if free_mb is None else round(free_mb)}MB "
+            f"cpu={cpu if cpu is None else round(cpu)}% "
+            f"browsers={rss_mb if rss_mb is None else round(rss_mb)}MB "
+            f"target={current}->{new_target}"
+        )
+        if new_target < current:
+            warn(f"[AUTOSCALE] Resource pressure, draining to {new_target} workers.")
+        elif new_target > current:
+            info(f"[AUTOSCALE] Headroom available, scaling up to {new_target} workers.")
+
+        self._target = new_target
+        return new_target
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.adjust()
+            except Exception as e:
+                warn(f"[AUTOSCALE] Sampling failed: {e!r}")
+
+    def start(self) -> "Autoscaler":
+        info(
+            f"Autoscaling workers between {self.min_workers} and {self.max_workers} "
+            f"(starting at {self._target})."
+        )
+        self._thread = threading.Thread(target=self._run, name="autoscaler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+
+    def __enter__(self) -> "Autoscaler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,238 @@
+# whatsapp_filter/autotune.py
+from __future__ import annotations
+import math
+import threading
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import List, Optional
+
+from .config import AppConfig
+from .autoscale import DEFAULT_WORKER_MEMORY_MB
+from .io_utils import append_number
+from .modes import run_mode
+from .resources import host_free_memory_mb
+from .stats import RunStats
+from .logger import flush_logging, info, warn
+
+# Thread counts tried for the multi-threaded modes (capped by free memory).
+_THREAD_CANDIDATES = (2, 4, 6, 8, 12)
+
+# A setting is rejected when more than this share of its checks is unknown
+# (timeouts, retry banners: WhatsApp pushing back).
+_MAX_UNKNOWN_RATE = 0.10
+
+# More browsers or a shorter delay must buy at least this much extra
+# throughput to be preferred over a cheaper setting.
+_MIN_GAIN = 0.05
+
+# Threaded chunks are sized so each worker gets about this many chunks:
+# enough to balance the load, few enough to amortize browser start-up.
+_CHUNKS_PER_WORKER = 4
+
+
+@dataclass
+class Trial:
+    mode: str
+    threads: int
+    delay: float
+    numbers: int = 0
+    duration: float = 0.0
+    check_seconds: float = 0.0  # duration without browser launch and login
+    conclusive: int = 0
+    unknown: int = 0
+    min_free_memory_mb: Optional[float] = None
+    rejected: str = ""
+
+    @property
+    def throughput(self) -> float:
+        """Conclusive (valid + invalid) answers per second of checking."""
+        return self.conclusive / self.check_seconds if self.check_seconds > 0 else 0.0
+
+    @property
+    def unknown_rate(self) -> float:
+        return self.unknown / self.numbers if self.numbers else 0.0
+
+    def describe(self) -> str:
+        return f"mode={self.mode} threads={self.threads} delay={self.delay}"
+
+
+class _MemoryWatch:
+    """Samples host free memory in the background and keeps the minimum."""
+
+    def __init__(self, interval: float = 1.0) -> None:
+        self.interval = interval
+        self.minimum: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="autotune-mem", daemon=True)
+
+    def _run(self) -> None:
+        while True:
+            free = host_free_memory_mb()
+            if free is not None and (self.minimum is None or free < self.minimum):
+                self.minimum = free
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self) -> "_MemoryWatch":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join(timeout=self.interval * 2)
+
+
+def _max_threads_for_memory(cfg: AppConfig) -> int:
+    free = host_free_memory_mb()
+    if free is None:
+        return max(_THREAD_CANDIDATES)
+    return max(1, int((free - cfg.min_free_memory_mb) // DEFAULT_WORKER_MEMORY_MB))
+
+
+def _run_trial(
+    trial: Trial,
+    cfg: AppConfig,
+    sample: List[str],
+    valid_path: Path,
+    invalid_path: Path,
+    unknown_path: Path,
+) -> Trial:
+    trial_cfg = replace(
+        cfg,
+        mode=trial.mode,
+        threads=trial.threads,
+        delay=trial.delay,
+        chunk_size=max(1, math.ceil(len(sample) / trial.threads)),
+        unknown_retries=0,
+        target_valid=0,
+        autoscale=False,
+        accounts=None,
+        progress=False,
+    )
+    info(f"[AUTOTUNE] Trial {trial.describe()} on {len(sample)} numbers...")
+    stats = RunStats()
+    started = time.monotonic()
+    try:
+        with _MemoryWatch() as mem:
+            # Verdicts land in the real outputs, so the checks are not wasted.
+            valid, invalid, unknown, _ = run_mode(trial_cfg, sample, valid_path, invalid_path, stats)
+    except (Exception, SystemExit) as e:
+        trial.rejected = f"failed: {e!r}"
+        return trial
+    for number in unknown:
+        append_number(unknown_path, number)
+    trial.duration = time.monotonic() - started
+    # Launch and login take the same time whatever the setting and would
+    # dominate a trial this short, so only the checking phase is timed.
+    trial.check_seconds = stats.checking_seconds() or trial.duration
+    trial.numbers = len(sample)
+    trial.conclusive = len(valid) + len(invalid)
+    trial.unknown = len(unknown)
+    trial.min_free_memory_mb = mem.minimum
+
+    if trial.unknown_rate > _MAX_UNKNOWN_RATE:
+        trial.rejected = f"{trial.unknown_rate:.0%} unknown"
+    elif mem.minimum is not None and mem.minimum < cfg.min_free_memory_mb:
+        trial.rejected = f"free memory fell to {mem.minimum:.0f} MB"
+    info(
+        f"[AUTOTUNE] {trial.describe()}: {trial.throughput:.3f} answers/s, "
+        f"{trial.unknown_rate:.0%} unknown{' -> rejected: ' + trial.rejected if trial.rejected else ''}"
+    )
+    return trial
+
+
+def _best(trials: List[Trial]) -> Optional[Trial]:
+    """Cheapest accepted trial (fewest browsers, longest delay) within _MIN_GAIN of the fastest."""
+    accepted = [t for t in trials if not t.rejected and t.conclusive]
+    if not accepted:
+        return None
+    top = max(t.throughput for t in accepted)
+    good = [t for t in accepted if t.throughput * (1 + _MIN_GAIN) >= top]
+    return min(good, key=lambda t: (t.threads, -t.delay))
+
+
+def autotune(
+    cfg: AppConfig,
+    numbers: List[str],
+    valid_path: Path,
+    invalid_path: Path,
+    unknown_path: Path,
+    trial_size: int = 30,
+) -> Optional[AppConfig]:
+    """
+    Run short trial batches from `numbers` (each trial gets fresh numbers)
+    and return `cfg` with the best mode, threads, chunk_size and delay, or
+    None if no trial produced usable answers. Trial verdicts are appended
+    to the given outputs like a delta run's.
+
+    Search order: mode (at the configured thread count), then thread count
+    for the winning mode, then progressively shorter delays for as long as
+    throughput improves without more unknown verdicts.
+    """
+    remaining = list(numbers)
+    trials: List[Trial] = []
+    max_threads = max(1, _max_threads_for_memory(cfg))
+
+    def run(mode: str, threads: int, delay: float) -> Optional[Trial]:
+        size = trial_size * (threads if mode == "threaded" else 1)
+        if len(remaining) < size:
+            warn(f"[AUTOTUNE] Not enough input numbers left for a {mode} trial ({size} needed).")
+            return None
+        sample = remaining[:size]
+        del remaining[:size]
+        trial = _run_trial(
+            Trial(mode=mode, threads=threads, delay=delay),
+            cfg,
+            sample,
+            valid_path,
+            invalid_path,
+            unknown_path,
+        )
+        trials.append(trial)
+        return trial
+
+    start_threads = max(1, min(cfg.threads, max_threads))
+    for mode in ("single", "onedriver", "threaded"):
+        run(mode, 1 if mode == "single" else start_threads, cfg.delay)
+    best = _best(trials)
+    if best is None:
+        _print_trials(trials)
+        return None
+
+    if best.mode != "single":
+        for threads in _THREAD_CANDIDATES:
+            if threads != best.threads and threads <= max_threads:
+                run(best.mode, threads, best.delay)
+        best = _best(trials) or best
+
+    delay = best.delay
+    while delay > 0.25:
+        delay = round(delay / 2, 2)
+        trial = run(best.mode, best.threads, delay)
+        if trial is None or trial.rejected or trial.throughput <= best.throughput * (1 + _MIN_GAIN):
+            break
+        best = trial
+
+    _print_trials(trials, best)
+    chunk_size = cfg.chunk_size
+    if best.mode == "threaded":
+        chunk_size = max(20, min(500, math.ceil(len(numbers) / (best.threads * _CHUNKS_PER_WORKER))))
+    return replace(cfg, mode=best.mode, threads=best.threads, delay=best.delay, chunk_size=chunk_size)
+
+
+def _print_trials(trials: List[Trial], best: Optional[Trial] = None) -> None:
+    flush_logging()
+    print("\n=== Autotune trials ===\n")
+    print(
+        f"  {'mode':<10} {'thr':>3} {'delay':>5} {'nums':>5} {'secs':>7} {'chk s':>7} "
+        f"{'ans/s':>7} {'unk':>5} {'free MB':>8}"
+    )
+    for t in trials:
+        mark = "  <= best" if t is best else (f"  ({t.rejected})" if t.rejected else "")
+        free = "-" if t.min_free_memory_mb is None else f"{t.min_free_memory_mb:.0f}"
+        print(
+            f"  {t.mode:<10} {t.threads:>3} {t.delay:>5} {t.numbers:>5} {t.duration:>7.1f} "
+            f"{t.check_seconds:>7.1f} {t.throughput:>7.3f} {t.unknown_rate:>5.0%} {free:>8}{mark}"
+        )
+    print()
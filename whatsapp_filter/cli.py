@@ -1,21 +1,27 @@
 # whatsapp_filter/cli.py
 from __future__ import annotations
 import argparse
+import json
 import time
+from dataclasses import replace
 from pathlib import Path
 from textwrap import dedent
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 from .config import AppConfig, load_config_file, merge_config
-from .io_utils import read_numbers_from_file, write_numbers, append_log
-from .drivers import create_driver, prepare_worker_profiles
-from .whatsapp import wait_for_login, WHATSAPP_WEB_URL
-from .modes import (
-    filter_numbers_single,
-    filter_numbers_one_driver_threaded,
-    filter_numbers_threaded,
-)
-from .logger import info, debug, warn, error
+from .io_utils import STDIN, iter_numbers, unique_numbers, write_numbers, append_log
+from .drivers import create_driver
+from .stats import RunStats
+from .progress import ProgressDisplay
+from .history import append_run, build_run_record, is_regression, load_runs, print_history
+from .accounts import parse_accounts
+from .delta import KnownNumbers, prioritize_by_hit_rate
+from .ranges import NumberRange, RangeSource, parse_shard
+from .profiler import profile_run
+from .timeouts import print_timeout_report
+from .modes import ModeResources, run_mode
+from .autotune import autotune
+from .logger import info, debug, warn, error, configure_logging, shutdown_logging
 
 
 def build_arg_parser() -> argparse.ArgumentParser:
@@ -31,7 +37,18 @@ def build_arg_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "-i", "--input",
         type=str,
-        help="Override config 'input' file path.",
+        help="Override config 'input' file path ('-' reads from stdin; .gz/.bz2/.zst are decompressed).",
+    )
+    parser.add_argument(
+        "--input-format",
+        type=str,
+        choices=["auto", "lines", "csv", "tsv"],
+        help="Override config 'input_format'.",
+    )
+    parser.add_argument(
+        "--input-column",
+        type=str,
+        help="Override config 'input_column' (CSV/TSV column name or 0-based index).",
     )
     parser.add_argument(
         "--valid-output",
@@ -43,12 +60,82 @@ def build_arg_parser() -> argparse.ArgumentParser:
         type=str,
         help="Override config 'invalid_output'.",
     )
+    parser.add_argument(
+        "--unknown-output",
+        type=str,
+        help="Override config 'unknown_output'.",
+    )
+    parser.add_argument(
+        "--unknown-retries",
+        type=int,
+        help="Override config 'unknown_retries' (deferred re-check passes for unknown numbers).",
+    )
+    parser.add_argument(
+        "--range",
+        dest="ranges",
+        action="append",
+        metavar="PREFIX:START-END",
+        help="Generate the input from a number range instead of a file (repeatable), "
+             "e.g. 92300:0000000-9999999. Overrides config 'ranges'.",
+    )
+    parser.add_argument(
+        "--range-shard",
+        type=str,
+        metavar="K/N",
+        help="Override config 'range_shard' (check only the K-th of N equal slices of the ranges).",
+    )
+    parser.add_argument(
+        "--target-valid",
+        type=int,
+        metavar="N",
+        help="Override config 'target_valid' (stop once N valid numbers are found; "
+             "numbers never checked go to 'unchecked_output').",
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Override to delta=True (only check numbers not already in the valid/invalid "
+             "outputs or 'delta_sources'; new results are appended).",
+    )
+    parser.add_argument(
+        "--ordered",
+        action="store_true",
+        help="Override to ordered_output=True (write results in input order).",
+    )
     parser.add_argument(
         "--browser",
         type=str,
         choices=["chrome", "firefox", "edge"],
         help="Override config 'browser'.",
     )
+    parser.add_argument(
+        "--detector",
+        type=str,
+        choices=["dom", "network"],
+        help="Override config 'verdict_detector' (network: read the lookup response via DevTools, "
+             "falling back to the page probe).",
+    )
+    parser.add_argument(
+        "--web-url",
+        type=str,
+        help="Override config 'web_url' (e.g. a local mock server for testing).",
+    )
+    parser.add_argument(
+        "--proxy",
+        type=str,
+        help="Override config 'proxy' (host:port the browsers connect through).",
+    )
+    parser.add_argument(
+        "--adaptive-timeout",
+        action="store_true",
+        help="Override to adaptive_timeout=True (each worker learns its check timeout from its "
+             "recent verdict latencies, within min_check_timeout..check_timeout).",
+    )
+    parser.add_argument(
+        "--check-timeout",
+        type=float,
+        help="Override config 'check_timeout' (seconds to wait for a verdict; the ceiling when adaptive).",
+    )
     parser.add_argument(
         "--headless",
         action="store_true",
@@ -75,6 +162,32 @@ def build_arg_parser() -> argparse.ArgumentParser:
         type=int,
         help="Override config 'chunk_size'.",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="Override config 'batch_size' (numbers per in-page lookup; 0 = navigate per number).",
+    )
+    parser.add_argument(
+        "--autoscale",
+        action="store_true",
+        help="Override to autoscale=True (threaded mode: scale workers with free memory/CPU).",
+    )
+    parser.add_argument(
+        "--min-threads",
+        type=int,
+        help="Override config 'min_threads' (autoscale lower bound).",
+    )
+    parser.add_argument(
+        "--max-threads",
+        type=int,
+        help="Override config 'max_threads' (autoscale upper bound).",
+    )
+    parser.add_argument(
+        "--account",
+        type=str,
+        help="Account name whose base profile single/onedriver modes use "
+             "(run '--mode single --account NAME' once to log that account in).",
+    )
     parser.add_argument(
         "--driver-path",
         type=str,
@@ -85,6 +198,68 @@ def build_arg_parser() -> argparse.ArgumentParser:
         type=str,
         help="Override config 'log_file'.",
     )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        choices=["DEBUG", "INFO", "WARN", "ERROR"],
+        help="Override config 'log_level' (DEBUG logs every check).",
+    )
+    parser.add_argument(
+        "--log-format",
+        type=str,
+        choices=["text", "json"],
+        help="Override config 'log_format'.",
+    )
+    parser.add_argument(
+        "--log-output",
+        type=str,
+        help="Override config 'log_output' (rotating file receiving every log line).",
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="Override to progress=True (live progress display with rate and ETA).",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run as a daemon: keep browsers logged in and serve checks over local HTTP.",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        help="Override config 'serve_port' (with --serve).",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Override to profile=True (sample all controller threads and write a flame graph "
+             "input file plus a hot-function summary next to the run log).",
+    )
+    parser.add_argument(
+        "--record",
+        type=str,
+        metavar="DIR",
+        help="Override config 'record_dir' (save page-state snapshots of every check as a replay corpus).",
+    )
+    parser.add_argument(
+        "--replay",
+        type=str,
+        metavar="DIR",
+        help="Replay a recorded corpus through the current detection logic against a local server, "
+             "report accuracy and time to verdict, then exit. Needs no WhatsApp account.",
+    )
+    parser.add_argument(
+        "--autotune",
+        action="store_true",
+        help="Run short trial batches from the input to pick mode, threads, chunk size and delay "
+             "for this host, and save them to the config file.",
+    )
+    parser.add_argument(
+        "--history",
+        action="store_true",
+        help="Show run history (throughput trends, slow runs) from 'history_file' and exit.",
+    )
     parser.add_argument(
         "--show-examples",
         action="store_true",
@@ -112,16 +287,42 @@ def build_arg_parser() -> argparse.ArgumentParser:
 def collect_cli_overrides(args: argparse.Namespace) -> Dict[str, Any]:
     return {
         "input": args.input,
+        "input_format": args.input_format,
+        "input_column": args.input_column,
+        "ranges": args.ranges,
+        "range_shard": args.range_shard,
         "valid_output": args.valid_output,
         "invalid_output": args.invalid_output,
+        "unknown_output": args.unknown_output,
+        "unknown_retries": args.unknown_retries,
+        "target_valid": args.target_valid,
+        "delta": args.delta if args.delta else None,
+        "ordered_output": args.ordered if args.ordered else None,
         "browser": args.browser,
+        "verdict_detector": args.detector,
+        "web_url": args.web_url,
+        "proxy": args.proxy,
+        "adaptive_timeout": args.adaptive_timeout if args.adaptive_timeout else None,
+        "check_timeout": args.check_timeout,
         "headless": args.headless if args.headless else None,
         "delay": args.delay,
         "mode": args.mode,
         "threads": args.threads,
         "chunk_size": args.chunk_size,
+        "batch_size": args.batch_size,
+        "record_dir": args.record,
+        "autoscale": args.autoscale if args.autoscale else None,
+        "min_threads": args.min_threads,
+        "max_threads": args.max_threads,
+        "account": args.account,
+        "progress": args.progress if args.progress else None,
+        "profile": args.profile if args.profile else None,
+        "serve_port": args.port,
         "driver_path": args.driver_path,
         "log_file": args.log_file,
+        "log_level": args.log_level,
+        "log_format": args.log_format,
+        "log_output": args.log_output,
     }
 
 
@@ -143,7 +344,35 @@ def print_cli_examples(script_name: str = "whatsapp-filter") -> None:
     print("# 7.1) Run single to create logged-in profile")
     print(f"{script_name} --mode single")
     print("# 7.2) Then run threaded")
-    print(f"{script_name} --mode threaded --threads 4 --chunk-size 50")
+    print(f"{script_name} --mode threaded --threads 4 --chunk-size 50\n")
+    print("# 8) Threaded with memory/CPU-aware autoscaling between 2 and 12 browsers")
+    print(f"{script_name} --mode threaded --autoscale --min-threads 2 --max-threads 12\n")
+    print("# 9) Log in an extra account listed under 'accounts:' in config.yaml")
+    print(f"{script_name} --mode single --account acct2\n")
+    print("# 10) Show throughput history and flag slow runs")
+    print(f"{script_name} --history\n")
+    print("# 11) Daily re-run: only check numbers not already in the valid/invalid outputs")
+    print(f"{script_name} --delta\n")
+    print("# 12) Read the 'phone' column of a gzipped CSV export, or numbers piped on stdin")
+    print(f"{script_name} -i exports/leads.csv.gz --input-column phone")
+    print(f"zcat leads.txt.gz | {script_name} -i -\n")
+    print("# 13) Daemon with warm browsers; then query it over HTTP")
+    print(f"{script_name} --serve --mode threaded --threads 3")
+    print("curl 'http://127.0.0.1:8765/check?number=923001234567'")
+    print("curl -d '{\"numbers\": [\"923001234567\", \"923001234568\"]}' http://127.0.0.1:8765/check\n")
+    print("# 14) Find the fastest mode/threads/chunk size/delay for this host and save them")
+    print(f"{script_name} --autotune\n")
+    print("# 15) Sweep a number block without an input file, split across two hosts")
+    print(f"{script_name} --range 92300:0000000-9999999 --range-shard 1/2 --mode threaded --threads 4\n")
+    print("# 16) Profile the controller during a run (flame graph input + hot functions next to the run log)")
+    print(f"{script_name} --mode threaded --threads 8 --profile\n")
+    print("# 17) Record live checks, then replay them offline against the current detector")
+    print(f"{script_name} --record replay_corpus")
+    print(f"{script_name} --replay replay_corpus --headless\n")
+    print("# 18) Stop after 5000 valid numbers, trying historically productive prefixes first")
+    print(f"{script_name} --target-valid 5000 --mode threaded --threads 4\n")
+    print("# 19) Cut stuck checks short: learn each worker's timeout from its recent verdicts")
+    print(f"{script_name} --mode threaded --threads 4 --adaptive-timeout")
     print("==========================\n")
 
 
@@ -223,6 +452,7 @@ def interactive_config_menu(existing: Optional[AppConfig]) -> AppConfig:
         default_input = "data/input_numbers.txt"
         default_valid = "data/valid_numbers.txt"
         default_invalid = "data/invalid_numbers.txt"
+        default_unknown = "data/unknown_numbers.txt"
         default_browser = "chrome"
         default_headless = False
         default_delay = 2.0
@@ -236,6 +466,7 @@ def interactive_config_menu(existing: Optional[AppConfig]) -> AppConfig:
         default_input = existing.input
         default_valid = existing.valid_output
         default_invalid = existing.invalid_output
+        default_unknown = existing.unknown_output
         default_browser = existing.browser
         default_headless = existing.headless
         default_delay = existing.delay
@@ -248,6 +479,7 @@ def interactive_config_menu(existing: Optional[AppConfig]) -> AppConfig:
     input_path = _prompt_str("Input file path (phone numbers, one per line)", default_input)
     valid_output = _prompt_str("Valid output file path", default_valid)
     invalid_output = _prompt_str("Invalid output file path", default_invalid)
+    unknown_output = _prompt_str("Unknown (inconclusive) output file path", default_unknown)
 
     print("\nSelect browser:")
     browser = _prompt_choice("Choose browser:", browser_choices, default=default_browser)
@@ -278,6 +510,7 @@ def interactive_config_menu(existing: Optional[AppConfig]) -> AppConfig:
     print(f"  input         = {input_path}")
     print(f"  valid_output  = {valid_output}")
     print(f"  invalid_output= {invalid_output}")
+    print(f"  unknown_output= {unknown_output}")
     print(f"  browser       = {browser}")
     print(f"  headless      = {headless}")
     print(f"  delay         = {delay}")
@@ -291,10 +524,12 @@ def interactive_config_menu(existing: Optional[AppConfig]) -> AppConfig:
         info("Configuration not saved (user cancelled).")
         return existing if existing is not None else AppConfig(input=input_path)
 
-    cfg = AppConfig(
+    cfg = replace(
+        existing if existing is not None else AppConfig(input=input_path),
         input=input_path,
         valid_output=valid_output,
         invalid_output=invalid_output,
+        unknown_output=unknown_output,
         browser=browser,
         headless=headless,
         delay=delay,
@@ -310,14 +545,38 @@ def interactive_config_menu(existing: Optional[AppConfig]) -> AppConfig:
 
 # ---------- Setup & run ----------
 
+def _accounts_yaml(cfg: AppConfig) -> str:
+    if not cfg.accounts:
+        return "accounts: null"
+    accounts = parse_accounts(cfg.accounts, default_threads=0)
+    items = ", ".join(
+        f'{{name: "{a.name}", checks_per_hour: {a.checks_per_hour}, threads: {a.threads}}}'
+        for a in accounts
+    )
+    return f"accounts: [{items}]"
+
+
 def write_config_file(config_path: Path, cfg: AppConfig) -> None:
     config_text = dedent(
         f"""\
         # Configuration for whatsapp-filter
 
         input: "{cfg.input}"
+        input_format: "{cfg.input_format}"
+        input_column: {"null" if cfg.input_column is None else json.dumps(str(cfg.input_column))}
+        ranges: {"null" if not cfg.ranges else json.dumps(cfg.ranges)}
+        range_shard: {"null" if not cfg.range_shard else f'"{cfg.range_shard}"'}
+        range_segment: {cfg.range_segment}
         valid_output: "{cfg.valid_output}"
         invalid_output: "{cfg.invalid_output}"
+        unknown_output: "{cfg.unknown_output}"
+        unchecked_output: "{cfg.unchecked_output}"
+        target_valid: {cfg.target_valid}
+        prioritize_prefix_digits: {cfg.prioritize_prefix_digits}
+        delta: {str(cfg.delta).lower()}
+        delta_sources: {"null" if not cfg.delta_sources else json.dumps(cfg.delta_sources)}
+        ordered_output: {str(cfg.ordered_output).lower()}
+        reorder_buffer: {cfg.reorder_buffer}
 
         browser: "{cfg.browser}"
         headless: {str(cfg.headless).lower()}
@@ -327,8 +586,58 @@ def write_config_file(config_path: Path, cfg: AppConfig) -> None:
         threads: {cfg.threads}
         chunk_size: {cfg.chunk_size}
 
+        autoscale: {str(cfg.autoscale).lower()}
+        min_threads: {cfg.min_threads}
+        max_threads: {cfg.max_threads}
+        min_free_memory_mb: {cfg.min_free_memory_mb}
+        max_cpu_percent: {cfg.max_cpu_percent}
+        max_browser_memory_mb: {cfg.max_browser_memory_mb}
+        autoscale_interval: {cfg.autoscale_interval}
+
+        login_timeout: {cfg.login_timeout}
+        qr_timeout: {cfg.qr_timeout}
+        session_cache_ttl: {cfg.session_cache_ttl}
+
+        web_url: "{cfg.web_url}"
+        verdict_detector: "{cfg.verdict_detector}"
+        proxy: {"null" if not cfg.proxy else f'"{cfg.proxy}"'}
+        batch_size: {cfg.batch_size}
+        record_dir: {"null" if not cfg.record_dir else f'"{cfg.record_dir}"'}
+        check_timeout: {cfg.check_timeout}
+        adaptive_timeout: {str(cfg.adaptive_timeout).lower()}
+        min_check_timeout: {cfg.min_check_timeout}
+        timeout_margin: {cfg.timeout_margin}
+
+        {_accounts_yaml(cfg)}
+        account: {"null" if not cfg.account else f'"{cfg.account}"'}
+        throttle_after: {cfg.throttle_after}
+        throttle_cooldown: {cfg.throttle_cooldown}
+
+        serve_host: "{cfg.serve_host}"
+        serve_port: {cfg.serve_port}
+        cache_ttl: {cfg.cache_ttl}
+        cache_size: {cfg.cache_size}
+
+        hang_timeout: {cfg.hang_timeout}
+        recycle_after: {cfg.recycle_after}
+        recycle_memory_mb: {cfg.recycle_memory_mb}
+        max_restarts: {cfg.max_restarts}
+
         driver_path: {"null" if not cfg.driver_path else f'"{cfg.driver_path}"'}
         log_file: "{cfg.log_file}"
+        log_level: "{cfg.log_level}"
+        log_format: "{cfg.log_format}"
+        log_output: {"null" if not cfg.log_output else f'"{cfg.log_output}"'}
+        log_max_bytes: {cfg.log_max_bytes}
+        log_backups: {cfg.log_backups}
+        unknown_retries: {cfg.unknown_retries}
+        progress: {str(cfg.progress).lower()}
+        progress_refresh: {cfg.progress_refresh}
+        history_file: "{cfg.history_file}"
+        regression_threshold: {cfg.regression_threshold}
+        autotune_trial_size: {cfg.autotune_trial_size}
+        profile: {str(cfg.profile).lower()}
+        profile_interval: {cfg.profile_interval}
         """
     )
     config_path.parent.mkdir(parents=True, exist_ok=True)
@@ -342,6 +651,7 @@ def ensure_data_files(cfg: AppConfig) -> None:
     input_path = (cwd / cfg.input).resolve()
     valid_path = (cwd / cfg.valid_output).resolve()
     invalid_path = (cwd / cfg.invalid_output).resolve()
+    unknown_path = (cwd / cfg.unknown_output).resolve()
 
     input_path.parent.mkdir(parents=True, exist_ok=True)
     if not input_path.exists():
@@ -358,7 +668,7 @@ def ensure_data_files(cfg: AppConfig) -> None:
     else:
         info(f"Input file exists: {input_path}")
 
-    for p in (valid_path, invalid_path):
+    for p in (valid_path, invalid_path, unknown_path):
         p.parent.mkdir(parents=True, exist_ok=True)
         if not p.exists():
             p.touch()
@@ -375,6 +685,7 @@ def verify_environment(cfg: AppConfig) -> bool:
             headless=True,
             driver_path=cfg.driver_path,
             profile_suffix="env_check",
+            proxy=cfg.proxy,
         )
         driver.quit()
         info("WebDriver check OK.")
@@ -428,101 +739,286 @@ def run_config_menu_only(config_path: Path) -> None:
     info("Config menu finished. You can now run: whatsapp-filter")
 
 
+def show_history(config_path: Path) -> None:
+    cfg = AppConfig(input="")
+    if config_path.exists():
+        try:
+            cfg = AppConfig(**load_config_file(config_path))
+        except Exception as e:
+            warn(f"Could not load config ({e}), using default history file.")
+    history_path = (Path.cwd() / cfg.history_file).resolve()
+    print_history(history_path, threshold=cfg.regression_threshold)
+
+
+def _configure_logging(cfg: AppConfig) -> None:
+    configure_logging(
+        level=cfg.log_level,
+        fmt=cfg.log_format,
+        output=(Path.cwd() / cfg.log_output).resolve() if cfg.log_output else None,
+        max_bytes=cfg.log_max_bytes,
+        backups=cfg.log_backups,
+    )
+
+
+def serve_from_config(cfg: AppConfig) -> None:
+    from .server import serve
+
+    _configure_logging(cfg)
+    try:
+        serve(cfg)
+    finally:
+        shutdown_logging()
+
+
 def run_from_config(cfg: AppConfig) -> None:
-    start_ts = time.time()
     cwd = Path.cwd()
+    _configure_logging(cfg)
+    try:
+        if cfg.profile:
+            with profile_run((cwd / cfg.log_file).resolve().parent, cfg.profile_interval):
+                _run_from_config(cfg, cwd)
+        else:
+            _run_from_config(cfg, cwd)
+    finally:
+        shutdown_logging()
+
+
+def _read_input(cfg: AppConfig, input_path: Path, cwd: Path) -> List[str]:
+    """
+    Read and deduplicate the input. In delta mode, numbers that already
+    have a result are dropped as they are read, before deduplication.
+    """
+    if cfg.input != STDIN and not input_path.exists():
+        error(f"Input file not found: {input_path}")
+        raise SystemExit(1)
+
+    known: Optional[KnownNumbers] = None
+    if cfg.delta:
+        sources = cfg.delta_sources or [cfg.valid_output, cfg.invalid_output]
+        known = KnownNumbers.from_files((cwd / s).resolve() for s in sources)
+    try:
+        source = iter_numbers(
+            input_path,
+            fmt=cfg.input_format,
+            column=None if cfg.input_column is None else str(cfg.input_column),
+        )
+        numbers = unique_numbers(source if known is None else known.filter(source))
+    except (OSError, ValueError, RuntimeError) as e:
+        error(f"Could not read input {input_path}: {e}")
+        raise SystemExit(1)
+    if known is not None:
+        info(f"Delta mode: {known.skipped} input numbers already have a result, {len(numbers)} left to check")
+    else:
+        info(f"Loaded {len(numbers)} numbers from {input_path}")
+    return numbers
+
+
+def _range_source(cfg: AppConfig, cwd: Path) -> RangeSource:
+    try:
+        ranges = [NumberRange.parse(spec) for spec in cfg.ranges or []]
+        shard = parse_shard(cfg.range_shard)
+    except ValueError as e:
+        error(str(e))
+        raise SystemExit(1)
+    # Earlier verdicts are always skipped, so an interrupted sweep resumes.
+    sources = cfg.delta_sources or [cfg.valid_output, cfg.invalid_output]
+    known = KnownNumbers.from_files((cwd / s).resolve() for s in sources)
+    source = RangeSource(ranges, shard=shard, known=known)
+    info(
+        f"Range input: {len(source)} numbers in shard {shard[0]}/{shard[1]} "
+        f"({len(known)} earlier results will be skipped)"
+    )
+    return source
+
+
+def _sweep_ranges(
+    cfg: AppConfig,
+    source: RangeSource,
+    valid_path: Path,
+    invalid_path: Path,
+    stats: RunStats,
+) -> Tuple[int, int, List[str], List[str]]:
+    """
+    Run generated numbers through the configured mode one segment at a time,
+    so memory stays bounded by `range_segment`. Valid/invalid verdicts are
+    appended to the outputs as they come; returns (valid count, invalid
+    count, unknown numbers, unchecked numbers of the last segment).
+
+    With `target_valid`, the sweep ends once that many valid numbers are in;
+    the rest of the range is not enumerated. Browsers, account budgets and
+    the autoscaler carry over from one segment to the next.
+    """
+    valid_count = invalid_count = 0
+    unknown: List[str] = []
+    unchecked: List[str] = []
+    resources = ModeResources(cfg, stats)
+    try:
+        for segment in source.segments(max(1, cfg.range_segment)):
+            info(f"Range segment {segment[0]}..{segment[-1]} ({len(segment)} numbers)")
+            seg_cfg = cfg
+            if cfg.target_valid > 0:
+                seg_cfg = replace(cfg, target_valid=cfg.target_valid - valid_count)
+            valid, invalid, seg_unknown, unchecked = run_mode(
+                seg_cfg, segment, valid_path, invalid_path, stats, resources=resources
+            )
+            valid_count += len(valid)
+            invalid_count += len(invalid)
+            unknown.extend(seg_unknown)
+            if cfg.target_valid > 0 and valid_count >= cfg.target_valid:
+                info("Range sweep reached the valid target; a later run continues where this one stopped.")
+                break
+    finally:
+        resources.close()
+    info(f"Range sweep done: {source.skipped} numbers skipped as already known")
+    return valid_count, invalid_count, unknown, unchecked
+
+
+def replay_from_config(cfg: AppConfig, corpus_dir: str) -> None:
+    from .replay import print_replay_report, replay_corpus
+
+    _configure_logging(cfg)
+    try:
+        corpus = Path(corpus_dir)
+        if not corpus.is_dir():
+            error(f"Replay corpus not found: {corpus}")
+            raise SystemExit(1)
+        report = replay_corpus(
+            corpus,
+            browser=cfg.browser,
+            headless=cfg.headless,
+            driver_path=cfg.driver_path,
+            timeout=cfg.check_timeout,
+        )
+        print_replay_report(report)
+    finally:
+        shutdown_logging()
+
+
+def autotune_from_config(cfg: AppConfig, config_path: Path) -> None:
+    _configure_logging(cfg)
+    try:
+        cwd = Path.cwd()
+        input_path = Path(STDIN) if cfg.input == STDIN else (cwd / cfg.input).resolve()
+        numbers = _read_input(cfg, input_path, cwd)
+        valid_path = (cwd / cfg.valid_output).resolve()
+        invalid_path = (cwd / cfg.invalid_output).resolve()
+        unknown_path = (cwd / cfg.unknown_output).resolve()
+        tuned = autotune(
+            cfg,
+            numbers,
+            valid_path,
+            invalid_path,
+            unknown_path,
+            trial_size=cfg.autotune_trial_size,
+        )
+        info(f"Trial verdicts were appended to {valid_path} and {invalid_path}; run with --delta to skip them.")
+        if tuned is None:
+            error("Autotune found no working setting (see trials above); config left unchanged.")
+            raise SystemExit(1)
+        info(
+            f"Best for this host: mode={tuned.mode} threads={tuned.threads} "
+            f"chunk_size={tuned.chunk_size} delay={tuned.delay}"
+        )
+        # Only the tuned settings are saved; CLI overrides for this run
+        # (--input, --threads, ...) stay out of the config file.
+        saved = AppConfig(**{"input": "", **load_config_file(config_path)})
+        write_config_file(
+            config_path,
+            replace(saved, mode=tuned.mode, threads=tuned.threads, delay=tuned.delay, chunk_size=tuned.chunk_size),
+        )
+    finally:
+        shutdown_logging()
+
+
+def _run_from_config(cfg: AppConfig, cwd: Path) -> None:
+    start_ts = time.time()
     info(f"Current working directory: {cwd}")
     info(f"Using config: {cfg}")
 
-    input_path = (cwd / cfg.input).resolve()
+    input_path = Path(STDIN) if cfg.input == STDIN else (cwd / cfg.input).resolve()
     valid_path = (cwd / cfg.valid_output).resolve()
     invalid_path = (cwd / cfg.invalid_output).resolve()
+    unknown_path = (cwd / cfg.unknown_output).resolve()
+    unchecked_path = (cwd / cfg.unchecked_output).resolve()
     log_path = (cwd / cfg.log_file).resolve()
-
-    info(f"Input file: {input_path}")
+    history_path = (cwd / cfg.history_file).resolve()
+
+    input_label = str(input_path)
+    source: Optional[RangeSource] = None
+    if cfg.ranges:
+        source = _range_source(cfg, cwd)
+        input_label = "ranges " + ", ".join(cfg.ranges)
+    info(f"Input: {input_label}")
     info(f"Valid output: {valid_path}")
     info(f"Invalid output: {invalid_path}")
+    info(f"Unknown output: {unknown_path}")
     info(f"Log file: {log_path}")
 
-    if not input_path.exists():
-        error(f"Input file not found: {input_path}")
-        raise SystemExit(1)
-
-    numbers = read_numbers_from_file(input_path)
-    info(f"Loaded {len(numbers)} numbers from {input_path}")
+    if source is None:
+        numbers = _read_input(cfg, input_path, cwd)
+        if cfg.prioritize_prefix_digits > 0:
+            numbers = prioritize_by_hit_rate(numbers, valid_path, invalid_path, cfg.prioritize_prefix_digits)
     info(f"Browser: {cfg.browser}")
     info(f"Mode: {cfg.mode}")
 
     if cfg.driver_path:
         info(f"Using custom driver path: {cfg.driver_path}")
 
-    if cfg.mode == "single":
-        driver = create_driver(
-            browser=cfg.browser,
-            headless=cfg.headless,
-            driver_path=cfg.driver_path,
-            profile_suffix="single",
-        )
-        driver.get(WHATSAPP_WEB_URL)
-        try:
-            wait_for_login(driver)
-            valid, invalid = filter_numbers_single(
-                driver=driver,
-                numbers=numbers,
-                per_number_delay=cfg.delay,
-                valid_path=valid_path,
-                invalid_path=invalid_path,
-            )
-        finally:
-            driver.quit()
-
-    elif cfg.mode == "onedriver":
-        driver = create_driver(
-            browser=cfg.browser,
-            headless=cfg.headless,
-            driver_path=cfg.driver_path,
-            profile_suffix="single",
-        )
-        driver.get(WHATSAPP_WEB_URL)
-        try:
-            wait_for_login(driver)
-            valid, invalid = filter_numbers_one_driver_threaded(
-                driver=driver,
-                numbers=numbers,
-                per_number_delay=cfg.delay,
-                valid_path=valid_path,
-                invalid_path=invalid_path,
-                max_workers=cfg.threads,
+    stats = RunStats()
+    progress = ProgressDisplay(stats, refresh=cfg.progress_refresh).start() if cfg.progress else None
+    try:
+        if source is not None:
+            valid_count, invalid_count, unknown, unchecked = _sweep_ranges(
+                cfg, source, valid_path, invalid_path, stats
             )
-        finally:
-            driver.quit()
-
-    else:  # threaded
-        prepare_worker_profiles(browser=cfg.browser, max_workers=cfg.threads)
-        valid, invalid = filter_numbers_threaded(
-            numbers=numbers,
-            per_number_delay=cfg.delay,
-            valid_path=valid_path,
-            invalid_path=invalid_path,
-            browser=cfg.browser,
-            headless=cfg.headless,
-            driver_path=cfg.driver_path,
-            max_workers=cfg.threads,
-            chunk_size=cfg.chunk_size,
-        )
-
-    write_numbers(valid_path, valid)
-    write_numbers(invalid_path, invalid)
+            input_size = source.generated
+        else:
+            valid, invalid, unknown, unchecked = run_mode(cfg, numbers, valid_path, invalid_path, stats)
+            valid_count, invalid_count, input_size = len(valid), len(invalid), len(numbers)
+    finally:
+        if progress is not None:
+            progress.stop()
+
+    if not cfg.delta and source is None:
+        # Delta and range runs keep earlier results: new verdicts were already appended.
+        write_numbers(valid_path, valid)
+        write_numbers(invalid_path, invalid)
+    write_numbers(unknown_path, unknown)
+    if cfg.target_valid > 0:
+        write_numbers(unchecked_path, unchecked)
 
     duration = time.time() - start_ts
     summary = (
         f"Run finished: {time.strftime('%Y-%m-%d %H:%M:%S')} | "
         f"Duration: {duration:.1f}s | "
         f"Mode: {cfg.mode} | "
-        f"Input: {input_path} | "
-        f"Valid: {len(valid)} -> {valid_path} | "
-        f"Invalid: {len(invalid)} -> {invalid_path}"
+        f"Input: {input_label} | "
+        f"Valid: {valid_count} -> {valid_path} | "
+        f"Invalid: {invalid_count} -> {invalid_path} | "
+        f"Unknown: {len(unknown)} -> {unknown_path}"
     )
+    if cfg.target_valid > 0:
+        summary += f" | Unchecked: {len(unchecked)} -> {unchecked_path}"
     append_log(log_path, summary)
     info(summary)
-    info(f"Log appended to: {log_path}")
\ No newline at end of file
+    info(f"Log appended to: {log_path}")
+    if cfg.adaptive_timeout:
+        print_timeout_report(stats.timeout_histogram())
+
+    record = build_run_record(
+        cfg,
+        input_size=input_size,
+        duration=duration,
+        valid=valid_count,
+        invalid=invalid_count,
+        unknown=len(unknown),
+        stats=stats,
+    )
+    baseline = is_regression(record, load_runs(history_path), cfg.regression_threshold)
+    if baseline:
+        warn(
+            f"Throughput {record['checks_per_sec']:.3f} checks/s is below "
+            f"{cfg.regression_threshold:.0%} of the baseline {baseline:.3f} for this config. "
+            f"WhatsApp Web UI changes or host issues? See: whatsapp-filter --history"
+        )
+    append_run(history_path, record)
\ No newline at end of file
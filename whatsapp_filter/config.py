@@ -2,7 +2,7 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import json
 
 try:
@@ -13,9 +13,18 @@ except ImportError:
 
 @dataclass
 class AppConfig:
-    input: str
+    input: str                       # "-" reads numbers from stdin
+    input_format: str = "auto"       # auto | lines | csv | tsv (gzip/bz2/zstd detected automatically)
+    input_column: Optional[str] = None  # CSV/TSV column name or 0-based index
+    ranges: Optional[List[str]] = None  # generate input instead: "PREFIX:START-END" specs
+    range_shard: Optional[str] = None   # "K/N": check only the K-th of N equal slices of the ranges
+    range_segment: int = 10000       # generated numbers run per batch (bounds memory)
     valid_output: str = "data/valid_numbers.txt"
     invalid_output: str = "data/invalid_numbers.txt"
+    unknown_output: str = "data/unknown_numbers.txt"
+    unchecked_output: str = "data/unchecked_numbers.txt"  # numbers skipped by a target_valid stop
+    target_valid: int = 0            # stop once this many valid numbers are found, 0 = check everything
+    prioritize_prefix_digits: int = 0  # check prefixes of this length with high past hit rates first
     browser: str = "chrome"          # chrome | firefox | edge
     headless: bool = False
     delay: float = 2.0
@@ -24,6 +33,66 @@ class AppConfig:
     chunk_size: int = 50
     driver_path: Optional[str] = None
     log_file: str = "run_log.txt"
+    log_level: str = "INFO"          # DEBUG | INFO | WARN | ERROR
+    log_format: str = "text"         # text | json (one object per line)
+    log_output: Optional[str] = None # also write log lines here (rotated)
+    log_max_bytes: int = 10 * 1024 * 1024  # rotate log_output past this size
+    log_backups: int = 3             # rotated log_output files to keep
+    delta: bool = False              # skip numbers already present in previous results
+    delta_sources: Optional[List[str]] = None  # result files to skip, None = valid + invalid outputs
+    ordered_output: bool = False     # write results in input order (bounded reorder buffer)
+    reorder_buffer: int = 10000      # results held in memory before spilling to disk
+    unknown_retries: int = 1         # deferred re-check passes for inconclusive numbers
+    progress: bool = False           # live progress display (rate, ETA, worker states)
+    progress_refresh: float = 1.0    # seconds between progress redraws
+    history_file: str = "run_history.jsonl"  # structured record of every run
+    regression_threshold: float = 0.7        # flag runs below this fraction of baseline throughput
+    autotune_trial_size: int = 30    # numbers per autotune trial (per browser in threaded mode)
+    profile: bool = False            # sample the controller's stacks; results go next to log_file
+    profile_interval: float = 0.01   # seconds between profiler samples
+
+    # Autoscaling of browser workers (threaded mode)
+    autoscale: bool = False
+    min_threads: int = 1
+    max_threads: int = 8
+    min_free_memory_mb: int = 1024   # drain workers below this much free RAM
+    max_cpu_percent: float = 90.0    # drain workers above this host CPU load
+    max_browser_memory_mb: int = 0   # cap on total browser RSS, 0 = no cap
+    autoscale_interval: float = 5.0  # seconds between resource samples
+
+    # Accounts (threaded mode shards work across them; see accounts.py)
+    accounts: Optional[List[Any]] = None  # [{name, checks_per_hour, threads}, ...]
+    account: Optional[str] = None    # single/onedriver: which account's base profile to use
+    throttle_after: int = 5          # consecutive unknown verdicts that bench an account
+    throttle_cooldown: float = 900.0 # seconds a benched account stays out of rotation
+
+    # Check daemon (--serve)
+    serve_host: str = "127.0.0.1"
+    serve_port: int = 8765
+    cache_ttl: float = 3600.0        # seconds a valid/invalid answer is reused, 0 = no cache
+    cache_size: int = 100000         # max cached answers (least recently used are evicted)
+
+    # Login detection
+    login_timeout: int = 180         # max wait for the main UI (QR scan included)
+    qr_timeout: float = 20.0         # headless/worker profiles: give up once a QR code shows this long
+    session_cache_ttl: float = 86400 # skip profiles recorded as logged out for this long
+
+    # Verdict detection
+    web_url: str = "https://web.whatsapp.com"  # or a local mock server for testing
+    verdict_detector: str = "dom"    # "dom" | "network" (DevTools lookup responses, DOM fallback)
+    proxy: Optional[str] = None      # "host:port" for the browsers, e.g. an intercepting proxy
+    batch_size: int = 0              # numbers per in-page lookup script, 0 = one navigation per number
+    record_dir: Optional[str] = None # save page-state snapshots of every check here (replay corpus)
+    check_timeout: float = 15.0      # seconds a check waits for a verdict before deferring it as unknown
+    adaptive_timeout: bool = False   # per worker: p99 of recent verdict latencies + margin, capped by check_timeout
+    min_check_timeout: float = 5.0   # adaptive timeout floor
+    timeout_margin: float = 2.0      # seconds added to the learned p99
+
+    # Browser health supervision
+    hang_timeout: float = 60.0       # kill and restart a browser stuck on one check
+    recycle_after: int = 500         # restart each browser after N checks, 0 = never
+    recycle_memory_mb: int = 0       # restart a browser above this RSS, 0 = never
+    max_restarts: int = 3            # consecutive browser failures before a worker gives up
 
 
 def _load_yaml(path: Path) -> Dict[str, Any]:
@@ -55,7 +124,9 @@ def merge_config(config_data: Dict[str, Any], cli_overrides: Dict[str, Any]) ->
         if value is not None:
             merged[key] = value
 
-    if "input" not in merged or not merged["input"]:
-        raise ValueError("Input file path is required (config 'input' or --input).")
+    if merged.get("ranges"):
+        merged["input"] = merged.get("input") or ""
+    elif "input" not in merged or not merged["input"]:
+        raise ValueError("Input file path is required (config 'input' or --input), or 'ranges'.")
 
     return AppConfig(**merged)
\ No newline at end of file
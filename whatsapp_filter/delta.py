@@ -0,0 +1,181 @@
+# whatsapp_filter/delta.py
+from __future__ import annotations
+import bisect
+import heapq
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .logger import info, warn
+
+# A digit string maps to int("1" + digits): the leading 1 keeps leading
+# zeros significant, and up to 18 digits fit an unsigned 64-bit slot
+# (E.164 numbers have at most 15).
+_MAX_KEY_DIGITS = 18
+
+# Pseudo-count pulling a prefix's hit rate towards the overall rate, so a
+# prefix with 2 hits out of 2 does not outrank one with 900 out of 1000.
+_PRIOR_WEIGHT = 20
+
+# Keys sorted per run before merging; bounds the Python int list that
+# sorted() builds to about 40 MB.
+_SORT_RUN = 1 << 20
+
+
+def number_key(number: str) -> Optional[int]:
+    """Compact integer key for a phone number, or None if it has no usable digits."""
+    digits = "".join(ch for ch in number if ch.isdigit())
+    if not digits or len(digits) > _MAX_KEY_DIGITS:
+        return None
+    return int("1" + digits)
+
+
+def _run(keys: "array[int]", start: int, stop: int) -> Iterator[int]:
+    for i in range(start, stop):
+        yield keys[i]
+
+
+def _merge_sorted(keys: "array[int]") -> Iterator[int]:
+    """
+    Sort `keys` in place in runs of `_SORT_RUN` and yield them merged in
+    order, so only one run at a time exists as Python ints.
+    """
+    runs = []
+    for start in range(0, len(keys), _SORT_RUN):
+        stop = min(len(keys), start + _SORT_RUN)
+        keys[start:stop] = array("Q", sorted(keys[start:stop]))
+        runs.append(_run(keys, start, stop))
+    return heapq.merge(*runs)
+
+
+def _sorted_unique(keys: "array[int]") -> "array[int]":
+    """
+    Sorted, deduplicated copy of `keys`, merged into one preallocated
+    array: the peak is two compact arrays plus one sort run.
+    """
+    out: "array[int]" = array("Q", [0]) * len(keys)
+    size = 0
+    last = None
+    for key in _merge_sorted(keys):
+        if key != last:
+            out[size] = key
+            size += 1
+            last = key
+    del out[size:]
+    return out
+
+
+def repeated_keys(keys: "array[int]") -> "array[int]":
+    """Sorted keys that occur more than once in `keys` (which is left as is)."""
+    out: "array[int]" = array("Q")
+    last = None
+    for key in _merge_sorted(array("Q", keys)):
+        if key == last and (not out or out[-1] != key):
+            out.append(key)
+        last = key
+    return out
+
+
+def _iter_numbers(path: Path) -> Iterator[str]:
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+class KnownNumbers:
+    """
+    Sorted array of number keys (8 bytes per number) with binary-search
+    membership. Tens of millions of prior results fit in a few hundred MB,
+    where a set of Python strings would need several GB. Building it peaks
+    at about twice that (the unsorted and the sorted array) plus one sort
+    run.
+    """
+
+    def __init__(self, keys: "array[int]") -> None:
+        self._keys = keys
+        self.skipped = 0
+
+    @classmethod
+    def from_files(cls, paths: Iterable[Path]) -> "KnownNumbers":
+        keys: "array[int]" = array("Q")
+        for path in paths:
+            if not path.exists():
+                warn(f"Delta source not found, skipping: {path}")
+                continue
+            before = len(keys)
+            for number in _iter_numbers(path):
+                key = number_key(number)
+                if key is not None:
+                    keys.append(key)
+            info(f"Delta source {path}: {len(keys) - before} numbers")
+        return cls(_sorted_unique(keys))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, number: object) -> bool:
+        if not isinstance(number, str):
+            return False
+        key = number_key(number)
+        if key is None:
+            return False
+        idx = bisect.bisect_left(self._keys, key)
+        return idx < len(self._keys) and self._keys[idx] == key
+
+    def filter(self, numbers: Iterable[str]) -> Iterator[str]:
+        """Yield the numbers without a result, counting the others in `skipped`."""
+        self.skipped = 0
+        for number in numbers:
+            if number in self:
+                self.skipped += 1
+            else:
+                yield number
+
+
+def _digits(number: str) -> str:
+    return "".join(ch for ch in number if ch.isdigit())
+
+
+def prefix_hit_counts(valid_path: Path, invalid_path: Path, digits: int) -> Dict[str, Tuple[int, int]]:
+    """(valid, invalid) counts per leading-`digits` prefix in earlier results."""
+    counts: Dict[str, List[int]] = {}
+    for slot, path in ((0, valid_path), (1, invalid_path)):
+        if not path.exists():
+            continue
+        for number in _iter_numbers(path):
+            prefix = _digits(number)[:digits]
+            counts.setdefault(prefix, [0, 0])[slot] += 1
+    return {p: (c[0], c[1]) for p, c in counts.items()}
+
+
+def prioritize_by_hit_rate(numbers: List[str], valid_path: Path, invalid_path: Path, digits: int) -> List[str]:
+    """
+    Reorder `numbers` so prefixes with the best hit rate in earlier results
+    come first (smoothed towards the overall rate; unseen prefixes get the
+    overall rate). Order within a prefix is kept.
+    """
+    counts = prefix_hit_counts(valid_path, invalid_path, digits)
+    total_valid = sum(v for v, _ in counts.values())
+    total = sum(v + i for v, i in counts.values())
+    if not total:
+        info("No earlier results to prioritize prefixes by; keeping input order.")
+        return numbers
+    base = total_valid / total
+
+    def score(prefix: str) -> float:
+        valid, invalid = counts.get(prefix, (0, 0))
+        return (valid + base * _PRIOR_WEIGHT) / (valid + invalid + _PRIOR_WEIGHT)
+
+    scores: Dict[str, float] = {}
+    for number in numbers:
+        prefix = _digits(number)[:digits]
+        if prefix not in scores:
+            scores[prefix] = score(prefix)
+    best = sorted(scores, key=scores.__getitem__, reverse=True)[:3]
+    info(
+        f"Prioritizing {len(scores)} prefixes by past hit rate (overall {base:.1%}); "
+        f"first: {', '.join(f'{p} ({scores[p]:.1%})' for p in best)}"
+    )
+    return sorted(numbers, key=lambda n: -scores[_digits(n)[:digits]])
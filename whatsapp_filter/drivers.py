@@ -1,12 +1,14 @@
 # whatsapp_filter/drivers.py
 from __future__ import annotations
+import os
 import platform
 import shutil
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from selenium import webdriver
 from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.proxy import Proxy
 from webdriver_manager.chrome import ChromeDriverManager
 from webdriver_manager.firefox import GeckoDriverManager
 from webdriver_manager.microsoft import EdgeChromiumDriverManager
@@ -14,6 +16,7 @@ from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.firefox.service import Service as FirefoxService
 from selenium.webdriver.edge.service import Service as EdgeService
 
+from .session import forget_session, needs_reclone
 from .logger import info, warn, error
 
 
@@ -35,11 +38,22 @@ def print_manual_driver_instructions(browser: str) -> None:
         info("Place driver in /usr/local/bin or another PATH folder.")
 
 
+def _service_kwargs() -> Dict[str, Any]:
+    # On POSIX the WebDriver gets its own session, so it leads a process
+    # group holding the browser and all of its helpers; the hang watchdog
+    # can then kill the lot even without psutil (resources.kill_process_tree).
+    if os.name == "posix":
+        return {"popen_kw": {"start_new_session": True}}
+    return {}
+
+
 def create_driver(
     browser: str,
     headless: bool = False,
     driver_path: Optional[str] = None,
     profile_suffix: Optional[str] = None,
+    network_capture: bool = False,
+    proxy: Optional[str] = None,
 ) -> webdriver.Remote:
     base_profile_dir = Path.cwd() / "browser_profiles"
     base_profile_dir.mkdir(exist_ok=True)
@@ -59,9 +73,15 @@ def create_driver(
                 options.add_argument("--headless=new")
                 options.add_argument("--disable-gpu")
                 options.add_argument("--window-size=1920,1080")
+            if proxy:
+                options.add_argument(f"--proxy-server={proxy}")
+
+            if network_capture:
+                # DevTools network events for the "network" verdict detector.
+                options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
 
-            service = ChromeService(executable_path=driver_path) if driver_path else ChromeService(
-                ChromeDriverManager().install()
+            service = ChromeService(
+                executable_path=driver_path or ChromeDriverManager().install(), **_service_kwargs()
             )
             driver = webdriver.Chrome(service=service, options=options)
 
@@ -71,9 +91,11 @@ def create_driver(
             profile_dir.mkdir(exist_ok=True)
             if headless:
                 options.headless = True
+            if proxy:
+                options.proxy = Proxy({"proxyType": "manual", "httpProxy": proxy, "sslProxy": proxy})
 
-            service = FirefoxService(executable_path=driver_path) if driver_path else FirefoxService(
-                GeckoDriverManager().install()
+            service = FirefoxService(
+                executable_path=driver_path or GeckoDriverManager().install(), **_service_kwargs()
             )
             driver = webdriver.Firefox(service=service, options=options)
 
@@ -86,9 +108,14 @@ def create_driver(
                 options.add_argument("--headless=new")
                 options.add_argument("--disable-gpu")
                 options.add_argument("--window-size=1920,1080")
+            if proxy:
+                options.add_argument(f"--proxy-server={proxy}")
 
-            service = EdgeService(executable_path=driver_path) if driver_path else EdgeService(
-                EdgeChromiumDriverManager().install()
+            if network_capture:
+                options.set_capability("ms:loggingPrefs", {"performance": "ALL"})
+
+            service = EdgeService(
+                executable_path=driver_path or EdgeChromiumDriverManager().install(), **_service_kwargs()
             )
             driver = webdriver.Edge(service=service, options=options)
 
@@ -106,7 +133,16 @@ def create_driver(
         raise SystemExit(1)
 
 
-def prepare_worker_profiles(browser: str, max_workers: int) -> None:
+def prepare_worker_profiles(
+    browser: str,
+    max_workers: int,
+    base_suffix: str = "single",
+    worker_prefix: str = "",
+) -> None:
+    """
+    Clone the logged-in base profile (`<browser>_whatsapp_profile_<base_suffix>`)
+    into `<worker_prefix>worker_<n>` profiles for n = 1..max_workers.
+    """
     base_profile_dir = Path.cwd() / "browser_profiles"
 
     if browser == "chrome":
@@ -119,24 +155,32 @@ def prepare_worker_profiles(browser: str, max_workers: int) -> None:
         warn(f"Unsupported browser for profile cloning: {browser}")
         return
 
-    single_profile = base_profile_dir / f"{base_name}_single"
+    single_profile = base_profile_dir / f"{base_name}_{base_suffix}"
 
     if not single_profile.exists():
         warn(f"Single-mode profile not found: {single_profile}")
-        warn("Run once with mode 'single' to create and log in.")
+        if base_suffix == "single":
+            warn("Run once with mode 'single' to create and log in.")
+        else:
+            warn(f"Run once with '--mode single --account {base_suffix}' to create and log in.")
         return
 
     info(f"Preparing worker profiles from base: {single_profile}")
 
     for worker_id in range(1, max_workers + 1):
-        worker_profile = base_profile_dir / f"{base_name}_worker_{worker_id}"
+        worker_suffix = f"{worker_prefix}worker_{worker_id}"
+        worker_profile = base_profile_dir / f"{base_name}_{worker_suffix}"
 
         if worker_profile.exists():
-            info(f"Worker profile already exists, skipping clone: {worker_profile}")
-            continue
+            if not needs_reclone(browser, worker_suffix, base_suffix):
+                info(f"Worker profile already exists, skipping clone: {worker_profile}")
+                continue
+            info(f"Worker profile is logged out but base was re-linked, re-cloning: {worker_profile}")
+            shutil.rmtree(worker_profile, ignore_errors=True)
 
         try:
             info(f"Cloning profile to: {worker_profile}")
             shutil.copytree(single_profile, worker_profile)
+            forget_session(browser, worker_suffix)
         except Exception as e:
             warn(f"Failed to clone profile to {worker_profile}: {e}")
\ No newline at end of file
@@ -0,0 +1,173 @@
+# whatsapp_filter/history.py
+from __future__ import annotations
+import json
+import platform
+import time
+from dataclasses import asdict
+from pathlib import Path
+from statistics import median
+from typing import Any, Dict, List, Optional
+
+from .config import AppConfig
+from .stats import RunStats
+from .logger import flush_logging, warn
+
+# Runs with the same key are comparable for throughput: same machine and
+# every setting that changes how long a check takes.
+_KEY_FIELDS = (
+    "host",
+    "mode",
+    "browser",
+    "headless",
+    "threads",
+    "chunk_size",
+    "delay",
+    "batch_size",
+    "verdict_detector",
+    "recording",
+    "adaptive_timeout",
+)
+
+# How many earlier comparable runs form the baseline.
+_BASELINE_RUNS = 10
+
+
+def build_run_record(
+    cfg: AppConfig,
+    input_size: int,
+    duration: float,
+    valid: int,
+    invalid: int,
+    unknown: int,
+    stats: RunStats,
+) -> Dict[str, Any]:
+    return {
+        "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "host": platform.node(),
+        "mode": cfg.mode,
+        "browser": cfg.browser,
+        "headless": cfg.headless,
+        "threads": cfg.threads,
+        "chunk_size": cfg.chunk_size,
+        "delay": cfg.delay,
+        "batch_size": cfg.batch_size,
+        "verdict_detector": cfg.verdict_detector,
+        "recording": cfg.record_dir is not None,
+        "adaptive_timeout": cfg.adaptive_timeout,
+        "input": cfg.input,
+        "input_size": input_size,
+        "duration": round(duration, 3),
+        "checks": stats.checks,
+        "checks_per_sec": round(stats.checks / duration, 4) if duration > 0 else 0.0,
+        "valid": valid,
+        "invalid": invalid,
+        "unknown": unknown,
+        "latency": stats.latency_summary(),
+        "timeouts": stats.timeout_histogram(),
+        "config": asdict(cfg),
+    }
+
+
+def _key_value(record: Dict[str, Any], field: str) -> Any:
+    # Older records only have some key fields at the top level; the rest
+    # is read from their saved config.
+    if field in record:
+        return record[field]
+    config = record.get("config") or {}
+    if field == "recording":
+        return config.get("record_dir") is not None
+    return config.get(field)
+
+
+def run_key(record: Dict[str, Any]) -> str:
+    return " ".join(f"{k}={_key_value(record, k)}" for k in _KEY_FIELDS)
+
+
+def append_run(path: Path, record: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+def load_runs(path: Path) -> List[Dict[str, Any]]:
+    if not path.exists():
+        return []
+    runs: List[Dict[str, Any]] = []
+    with path.open("r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                runs.append(json.loads(line))
+            except ValueError:
+                warn(f"Skipping malformed history line {lineno} in {path}")
+    return runs
+
+
+def baseline_throughput(runs: List[Dict[str, Any]], key: str) -> Optional[float]:
+    """Median checks/sec of the last comparable runs, or None without history."""
+    rates = [r["checks_per_sec"] for r in runs if run_key(r) == key and r.get("checks_per_sec")]
+    rates = rates[-_BASELINE_RUNS:]
+    return median(rates) if rates else None
+
+
+def is_regression(
+    record: Dict[str, Any],
+    previous: List[Dict[str, Any]],
+    threshold: float,
+) -> Optional[float]:
+    """
+    Return the baseline if `record` runs below `threshold` x baseline
+    throughput for its config key, else None.
+    """
+    base = baseline_throughput(previous, run_key(record))
+    if base and record.get("checks_per_sec", 0.0) < base * threshold:
+        return base
+    return None
+
+
+def print_history(path: Path, limit: int = 20, threshold: float = 0.7) -> None:
+    flush_logging()
+    runs = load_runs(path)
+    if not runs:
+        print(f"No run history in {path}")
+        return
+
+    print(f"\n=== Run history: {path} ({len(runs)} runs) ===\n")
+
+    by_mode: Dict[str, List[float]] = {}
+    for r in runs:
+        by_mode.setdefault(r.get("mode", "?"), []).append(r.get("checks_per_sec", 0.0))
+    print("Throughput per mode (checks/sec):")
+    for mode, rates in sorted(by_mode.items()):
+        recent = rates[-_BASELINE_RUNS:]
+        print(
+            f"  {mode:<10} runs={len(rates):<4} median={median(rates):.3f} "
+            f"recent median={median(recent):.3f} last={rates[-1]:.3f}"
+        )
+
+    print(f"\nLast {min(limit, len(runs))} runs:")
+    print(
+        f"  {'finished':<19} {'mode':<9} {'thr':>3} {'chunk':>5} {'delay':>5} "
+        f"{'input':>7} {'secs':>8} {'chk/s':>7} {'valid':>6} {'inv':>6} {'unk':>5} "
+        f"{'p50':>5} {'p99':>5}"
+    )
+    start = max(0, len(runs) - limit)
+    for i in range(start, len(runs)):
+        r = runs[i]
+        lat = r.get("latency") or {}
+        base = is_regression(r, runs[:i], threshold)
+        flag = f"  << SLOW (baseline {base:.3f})" if base else ""
+        print(
+            f"  {r.get('finished_at', '?'):<19} {r.get('mode', '?'):<9} {r.get('threads', 0):>3} "
+            f"{r.get('chunk_size', 0):>5} {r.get('delay', 0):>5} {r.get('input_size', 0):>7} "
+            f"{r.get('duration', 0):>8.1f} {r.get('checks_per_sec', 0):>7.3f} "
+            f"{r.get('valid', 0):>6} {r.get('invalid', 0):>6} {r.get('unknown', 0):>5} "
+            f"{_fmt_latency(lat.get('p50')):>5} {_fmt_latency(lat.get('p99')):>5}{flag}"
+        )
+    print()
+
+
+def _fmt_latency(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.1f}"
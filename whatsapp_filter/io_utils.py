@@ -1,22 +1,182 @@
 # whatsapp_filter/io_utils.py
 from __future__ import annotations
+import bisect
+import bz2
+import csv
+import gzip
+import io
+import sys
+from array import array
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Set, Tuple
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
-def read_numbers_from_file(path: Path) -> List[str]:
-    with path.open("r", encoding="utf-8") as f:
-        lines = [line.strip() for line in f]
+from .delta import number_key, repeated_keys
+from .logger import info
 
-    seen = set()
-    cleaned: List[str] = []
-    for line in lines:
-        if not line:
-            continue
-        if line not in seen:
-            seen.add(line)
-            cleaned.append(line)
-    return cleaned
+STDIN = "-"
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_BZ2_MAGIC = b"BZh"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_COMPRESSED_SUFFIXES = (".gz", ".bz2", ".zst", ".zstd")
+
+# Header names tried, in order, when a CSV/TSV input has no input_column.
+_PHONE_HEADERS = ("phone", "phone_number", "number", "mobile", "msisdn", "whatsapp", "tel")
+
+@contextmanager
+def _open_binary(path: Path) -> Iterator[BinaryIO]:
+    """
+    Open `path` (or stdin for "-") and transparently decompress
+    gzip/bz2/zstd. The file is closed on exit; the decompressors wrap it
+    without owning it.
+    """
+    stdin = str(path) == STDIN
+    raw = sys.stdin.buffer if stdin else path.open("rb")
+    try:
+        buffered = raw if hasattr(raw, "peek") else io.BufferedReader(raw)  # type: ignore[arg-type]
+        magic = buffered.peek(4)[:4]  # type: ignore[union-attr]
+        if magic.startswith(_GZIP_MAGIC):
+            yield gzip.GzipFile(fileobj=buffered)  # type: ignore[misc]
+        elif magic.startswith(_BZ2_MAGIC):
+            yield bz2.BZ2File(buffered)  # type: ignore[misc]
+        elif magic.startswith(_ZSTD_MAGIC):
+            if zstandard is None:
+                raise RuntimeError(f"{path} is zstd-compressed; install the 'zstandard' package to read it.")
+            yield zstandard.ZstdDecompressor().stream_reader(buffered)
+        else:
+            yield buffered  # type: ignore[misc]
+    finally:
+        if not stdin:
+            raw.close()
+
+
+def detect_input_format(path: Path, fmt: str = "auto", column: Optional[str] = None) -> str:
+    """Resolve "auto" to lines | csv | tsv from the file name (ignoring .gz/.bz2/.zst)."""
+    if fmt != "auto":
+        return fmt
+    name = path.name.lower()
+    for suffix in _COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+            break
+    if name.endswith(".tsv") or name.endswith(".tab"):
+        return "tsv"
+    if name.endswith(".csv") or column is not None:
+        return "csv"
+    return "lines"
+
+
+def _iter_line_numbers(text: Iterator[str]) -> Iterator[str]:
+    for line in text:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def _column_index(header: List[str], column: Optional[str]) -> Tuple[int, bool]:
+    """Return (index, whether the first row is a header)."""
+    names = [h.strip().lower() for h in header]
+    if column is not None:
+        if column.strip().lower() in names:
+            return names.index(column.strip().lower()), True
+        if column.isdigit():
+            idx = int(column)
+            return idx, not any(ch.isdigit() for ch in (header[idx] if idx < len(header) else ""))
+        raise ValueError(f"Input column {column!r} not found in header: {header}")
+    for candidate in _PHONE_HEADERS:
+        if candidate in names:
+            return names.index(candidate), True
+    return 0, not any(ch.isdigit() for ch in (header[0] if header else ""))
+
+
+def _iter_csv_numbers(text: Iterator[str], delimiter: str, column: Optional[str]) -> Iterator[str]:
+    reader = csv.reader(text, delimiter=delimiter)
+    first = next(reader, None)
+    if first is None:
+        return
+    idx, has_header = _column_index(first, column)
+    rows = reader if has_header else _chain_row(first, reader)
+    for row in rows:
+        if idx < len(row):
+            value = row[idx].strip()
+            if value and not value.startswith("#"):
+                yield value
+
+
+def _chain_row(first: List[str], rest: Iterator[List[str]]) -> Iterator[List[str]]:
+    yield first
+    yield from rest
+
+
+def iter_numbers(path: Path, fmt: str = "auto", column: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream raw numbers from a plain, gzip, bz2 or zstd file (or stdin for
+    "-"), either one per line or from a CSV/TSV column. No deduplication.
+    """
+    fmt = detect_input_format(path, fmt, column)
+    with _open_binary(path) as binary, io.TextIOWrapper(binary, encoding="utf-8-sig", newline="") as text:
+        if fmt == "lines":
+            yield from _iter_line_numbers(text)
+        elif fmt in ("csv", "tsv"):
+            yield from _iter_csv_numbers(text, "\t" if fmt == "tsv" else ",", column)
+        else:
+            raise ValueError(f"Unknown input format: {fmt} (use auto, lines, csv or tsv)")
+
+
+def unique_numbers(numbers: Iterable[str]) -> List[str]:
+    """
+    Deduplicate numbers, first occurrence wins and order is kept. Numbers
+    with the same digits are the same number ("+92 300..." == "92300...").
+
+    Instead of a set of strings, every number's delta.number_key goes into
+    an array (8 bytes each); the keys seen more than once are found by
+    sorting a copy, and only those are looked up while the list is
+    compacted in place.
+    """
+    kept: List[str] = []
+    keys: "array[int]" = array("Q")
+    odd: Set[str] = set()  # no usable key (no digits, too long): compared as strings
+    for number in numbers:
+        key = number_key(number)
+        if key is None:
+            if number in odd:
+                continue
+            odd.add(number)
+            key = 0
+        kept.append(number)
+        keys.append(key)
+
+    repeated = repeated_keys(keys)
+    if not repeated:
+        return kept
+    seen = bytearray(len(repeated))
+    size = 0
+    for number, key in zip(kept, keys):
+        if key:
+            idx = bisect.bisect_left(repeated, key)
+            if idx < len(repeated) and repeated[idx] == key:
+                if seen[idx]:
+                    continue
+                seen[idx] = 1
+        kept[size] = number
+        size += 1
+    del kept[size:]
+    return kept
+
+
+def read_numbers_from_file(
+    path: Path,
+    fmt: str = "auto",
+    column: Optional[str] = None,
+) -> List[str]:
+    """Read and deduplicate numbers (see unique_numbers)."""
+    return unique_numbers(iter_numbers(path, fmt, column))
 
 
 def write_numbers(path: Path, numbers: List[str]) -> None:
@@ -24,7 +184,7 @@ def write_numbers(path: Path, numbers: List[str]) -> None:
     with path.open("w", encoding="utf-8") as f:
         for n in numbers:
             f.write(n + "\n")
-    print(f"[INFO] Wrote {len(numbers)} numbers to: {path.resolve()}")
+    info("Wrote %d numbers to: %s", len(numbers), path.resolve())
 
 
 def append_log(log_path: Path, text: str) -> None:
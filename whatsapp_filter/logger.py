@@ -1,35 +1,237 @@
 # whatsapp_filter/logger.py
 from __future__ import annotations
+import atexit
+import json
+import os
+import queue
 import sys
+import threading
 import time
-from typing import Literal
+from pathlib import Path
+from typing import Any, Callable, Dict, Literal, Optional, TextIO, Tuple, Union
 
 LogLevel = Literal["DEBUG", "INFO", "WARN", "ERROR"]
+LogFormat = Literal["text", "json"]
 
+_LEVELS: Dict[str, int] = {"DEBUG": 10, "INFO": 20, "WARN": 30, "ERROR": 40}
 
-def log(level: LogLevel, msg: str) -> None:
+# Optional replacement for print(), e.g. the live progress display, which
+# needs to clear its status block before a log line is written.
+ConsoleWriter = Callable[[str, TextIO], None]
+_console_writer: Optional[ConsoleWriter] = None
+
+_Record = Tuple[str, float, str, Tuple[Any, ...], str]
+# Queue item: a record, a flush marker set once everything before it is
+# written, or None to stop the writer.
+_Item = Union[_Record, threading.Event, None]
+
+_min_level = _LEVELS["INFO"]
+_format: LogFormat = "text"
+_file: Optional["_RotatingFile"] = None
+_queue: "Optional[queue.SimpleQueue[_Item]]" = None
+_thread: Optional[threading.Thread] = None
+_config_lock = threading.Lock()
+
+
+class _RotatingFile:
+    """Append-only log file rotated to .1 .. .N once it exceeds max_bytes."""
+
+    def __init__(self, path: Path, max_bytes: int, backups: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = path.open("a", encoding="utf-8")
+        self._size = self._f.tell()
+
+    def write(self, line: str) -> None:
+        data = line + "\n"
+        size = len(data.encode("utf-8"))
+        if self.max_bytes > 0 and self._size + size > self.max_bytes and self._size > 0:
+            self._rotate()
+        self._f.write(data)
+        self._size += size
+
+    def _rotate(self) -> None:
+        self._f.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self._f = self.path.open("a", encoding="utf-8")
+        self._size = 0
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def set_console_writer(writer: Optional[ConsoleWriter]) -> None:
+    global _console_writer
+    _console_writer = writer
+
+
+def is_enabled(level: LogLevel) -> bool:
+    return _LEVELS[level] >= _min_level
+
+
+def _format_record(record: _Record) -> str:
+    level, ts, msg, args, thread = record
+    if args:
+        try:
+            msg = msg % args
+        except (TypeError, ValueError):
+            msg = f"{msg} {args!r}"
+    if _format == "json":
+        return json.dumps({
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts)) + f".{int(ts % 1 * 1000):03d}",
+            "level": level,
+            "thread": thread,
+            "msg": msg,
+        })
+    return f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))}] [{level}] {msg}"
+
+
+def _emit(record: _Record) -> None:
+    line = _format_record(record)
+    stream = sys.stdout if record[0] in ("DEBUG", "INFO") else sys.stderr
+    writer = _console_writer
+    if writer is not None:
+        writer(line, stream)
+    else:
+        print(line, file=stream)
+    if _file is not None:
+        _file.write(line)
+
+
+def _writer_loop(q: "queue.SimpleQueue[_Item]") -> None:
+    while True:
+        record = q.get()
+        if record is None:
+            break
+        if isinstance(record, threading.Event):
+            sys.stdout.flush()
+            sys.stderr.flush()
+            record.set()
+            continue
+        try:
+            _emit(record)
+            # Batch flushes: only flush once the queue has drained.
+            if q.empty():
+                sys.stdout.flush()
+                if _file is not None:
+                    _file.flush()
+        except Exception:
+            pass
+
+
+def log(level: LogLevel, msg: str, *args: Any) -> None:
     """
-    Simple stdout/stderr logger with timestamp and level.
+    Leveled logger with timestamp. Messages below the configured level are
+    dropped before any formatting; pass %-style `args` to defer formatting
+    of hot-path messages, e.g. debug("checked %s in %.2fs", number, secs).
     Example:
       [2026-01-12 02:45:26] [INFO] Message
+
+    Until `configure_logging(async_mode=True)` is called, lines are written
+    synchronously (interactive menus rely on that ordering). Afterwards
+    they are queued and written by a background thread.
     """
-    ts = time.strftime("%Y-%m-%d %H:%M:%S")
-    line = f"[{ts}] [{level}] {msg}"
-    stream = sys.stdout if level in ("DEBUG", "INFO") else sys.stderr
-    print(line, file=stream)
+    if _LEVELS[level] < _min_level:
+        return
+    record = (level, time.time(), msg, args, threading.current_thread().name)
+    # Under the lock, so shutdown_logging cannot stop the writer between
+    # reading the queue and putting the record on it.
+    with _config_lock:
+        q = _queue
+        if q is not None:
+            q.put(record)
+            return
+    _emit(record)
+
+
+def debug(msg: str, *args: Any) -> None:
+    log("DEBUG", msg, *args)
+
+
+def info(msg: str, *args: Any) -> None:
+    log("INFO", msg, *args)
+
 
+def warn(msg: str, *args: Any) -> None:
+    log("WARN", msg, *args)
 
-def debug(msg: str) -> None:
-    log("DEBUG", msg)
 
+def error(msg: str, *args: Any) -> None:
+    log("ERROR", msg, *args)
 
-def info(msg: str) -> None:
-    log("INFO", msg)
+
+def configure_logging(
+    level: str = "INFO",
+    fmt: str = "text",
+    output: Optional[Path] = None,
+    max_bytes: int = 10 * 1024 * 1024,
+    backups: int = 3,
+    async_mode: bool = True,
+) -> None:
+    """
+    Set the minimum level, line format (text | json), an optional rotating
+    log file, and whether lines are written by a background thread.
+    """
+    global _min_level, _format, _file, _queue, _thread
+    level = level.upper()
+    if level == "WARNING":
+        level = "WARN"
+    if level not in _LEVELS:
+        raise ValueError(f"Unknown log level: {level} (use DEBUG, INFO, WARN or ERROR)")
+    if fmt not in ("text", "json"):
+        raise ValueError(f"Unknown log format: {fmt} (use text or json)")
+
+    shutdown_logging()
+    with _config_lock:
+        _min_level = _LEVELS[level]
+        _format = fmt  # type: ignore[assignment]
+        _file = _RotatingFile(output, max_bytes, backups) if output is not None else None
+        if async_mode:
+            _queue = queue.SimpleQueue()
+            _thread = threading.Thread(target=_writer_loop, args=(_queue,), name="logger", daemon=True)
+            _thread.start()
+
+
+def flush_logging(timeout: float = 10.0) -> None:
+    """
+    Wait until every line logged so far is written. Call before print()ing
+    a report, so queued log lines don't land in the middle of it.
+    """
+    q, t = _queue, _thread
+    if q is None or t is None or not t.is_alive():
+        sys.stdout.flush()
+        return
+    done = threading.Event()
+    q.put(done)
+    done.wait(timeout)
 
 
-def warn(msg: str) -> None:
-    log("WARN", msg)
+def shutdown_logging() -> None:
+    """Drain queued lines and stop the writer thread (safe to call twice)."""
+    global _file, _queue, _thread
+    with _config_lock:
+        q, t = _queue, _thread
+        _queue, _thread = None, None
+        if q is not None and t is not None:
+            q.put(None)
+            t.join(timeout=10)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        f, _file = _file, None
+        if f is not None:
+            f.close()
 
 
-def error(msg: str) -> None:
-    log("ERROR", msg)
\ No newline at end of file
+atexit.register(shutdown_logging)
@@ -2,165 +2,469 @@
 from __future__ import annotations
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import List, Tuple, Optional
-
-from selenium.webdriver.remote.webdriver import WebDriver
+from typing import Callable, Deque, Dict, Iterator, List, Tuple, Optional
 
+from .config import AppConfig
+from .drivers import prepare_worker_profiles
 from .io_utils import append_number
-from .whatsapp import open_chat_for_number, wait_for_login, WHATSAPP_WEB_URL
-from .drivers import create_driver
-from .logger import info, debug
+from .supervisor import DriverSupervisor, HealthSettings, WorkerFailed
+from .session import is_known_expired
+from .accounts import Account, AccountPool, parse_accounts
+from .whatsapp import Verdict, VALID, INVALID, UNKNOWN
+from .autoscale import Autoscaler
+from .stats import RunStats
+from .reorder import ReorderBuffer
+from .logger import info, debug, warn, error
 
 _driver_lock = threading.Lock()
 
+# How often the threaded scheduler re-reads the autoscaler target while
+# all slots are busy.
+_SCHEDULER_TICK = 1.0
+
+# A chunk whose browser fails is handed back to the queue (remaining numbers
+# only) so another worker can pick it up, at most this many times in total.
+_MAX_CHUNK_ATTEMPTS = 3
+
+# Tasks submitted to an executor but not yet finished, per worker thread.
+# New numbers/chunks are pulled from the input only as tasks complete, so
+# memory does not grow with the input size.
+_SUBMIT_WINDOW_PER_WORKER = 2
+
+# Verdict given to numbers never checked because the run stopped early.
+_UNCHECKED = "unchecked"
+# Reorder slot of a number deferred to a retry pass: releases the numbers
+# behind it and emits nothing.
+_DEFERRED = "deferred"
+
+ModeResult = Tuple[List[str], List[str], List[str], List[str]]  # valid, invalid, unknown, unchecked
+
+
+class SupervisorPool:
+    """
+    Supervised browsers kept per profile for as long as the pool lives, so
+    each is launched and logged in once instead of once per chunk, retry
+    pass or range segment. A profile is only used by one chunk at a time
+    (the account pool leases its slot exclusively), so sharing is safe.
+    """
+
+    def __init__(
+        self,
+        browser: str,
+        headless: bool,
+        driver_path: Optional[str],
+        health: Optional[HealthSettings] = None,
+        stats: Optional[RunStats] = None,
+    ) -> None:
+        self.browser = browser
+        self.headless = headless
+        self.driver_path = driver_path
+        self.health = health
+        self.stats = stats
+        self._supervisors: Dict[str, DriverSupervisor] = {}
+        self._lock = threading.Lock()
+
+    def get(self, profile_suffix: str, label: str = "", expect_session: bool = True) -> DriverSupervisor:
+        """The profile's supervisor, created (not started) on first use."""
+        with self._lock:
+            supervisor = self._supervisors.get(profile_suffix)
+            if supervisor is None:
+                supervisor = DriverSupervisor(
+                    browser=self.browser,
+                    headless=self.headless,
+                    driver_path=self.driver_path,
+                    profile_suffix=profile_suffix,
+                    settings=self.health,
+                    label=label,
+                    expect_session=expect_session,
+                    stats=self.stats,
+                )
+                self._supervisors[profile_suffix] = supervisor
+            return supervisor
+
+    def park(self, profile_suffix: str) -> None:
+        """Quit an idle profile's browser; it is relaunched on its next use."""
+        with self._lock:
+            supervisor = self._supervisors.get(profile_suffix)
+        if supervisor is not None and supervisor.driver is not None:
+            debug("%s Parking idle browser.", supervisor.label)
+            supervisor.quit()
+
+    def close(self) -> None:
+        with self._lock:
+            supervisors, self._supervisors = list(self._supervisors.values()), {}
+        for supervisor in supervisors:
+            supervisor.quit()
+
+
+class _Results:
+    """
+    Thread-safe verdict collector shared by all workers of a run.
+
+    Valid/invalid numbers are appended to their output files as they come in.
+    Unknown numbers are only held in memory: they are re-checked by the
+    deferred retry pass and written once, at the end of the run.
+
+    With `reorder_buffer`, verdicts are released in input order instead:
+    `add` then needs the number's `index` within the current pass. An
+    unknown that goes to a retry pass does not hold back the numbers
+    after it; each pass is ordered on its own, so numbers settled on a
+    retry follow the first pass's output, in input order among themselves.
+
+    With `target_valid`, `stopped` is set once that many valid numbers are
+    in; the modes then schedule nothing new and hand the numbers they never
+    got to to `skip`. Those are unchecked on the first pass; on a retry
+    pass they were checked once already and stay unknown.
+    """
+
+    def __init__(
+        self,
+        valid_path: Path,
+        invalid_path: Path,
+        stats: Optional[RunStats] = None,
+        reorder_buffer: Optional[int] = None,
+        target_valid: int = 0,
+    ) -> None:
+        self.valid_path = valid_path
+        self.invalid_path = invalid_path
+        self.stats = stats
+        self.valid: List[str] = []
+        self.invalid: List[str] = []
+        self.unknown: List[str] = []
+        self.unchecked: List[str] = []
+        self._lock = threading.Lock()
+        self.target_valid = target_valid
+        self.stopped = threading.Event()
+        self._valid_seen = 0
+
+        self._reorder_size = reorder_buffer
+        self._reorder = ReorderBuffer(self._emit, reorder_buffer) if reorder_buffer else None
+        self._final_pass = True
+        self._retry_pass = False
+        self._final_unknown: List[str] = []
+
+    def _emit(self, index: int, number: str, verdict: str) -> None:
+        if verdict == VALID:
+            self.valid.append(number)
+            append_number(self.valid_path, number)
+        elif verdict == INVALID:
+            self.invalid.append(number)
+            append_number(self.invalid_path, number)
+        elif verdict == _UNCHECKED:
+            self.unchecked.append(number)
+        elif verdict == _DEFERRED:
+            return
+        else:
+            self._final_unknown.append(number)
+
+    def add(
+        self,
+        number: str,
+        verdict: Verdict,
+        latency: Optional[float] = None,
+        index: Optional[int] = None,
+    ) -> None:
+        if self.stats is not None and latency is not None:
+            self.stats.record(verdict, latency)
+        with self._lock:
+            if verdict == VALID and self.target_valid > 0:
+                self._valid_seen += 1
+                if self._valid_seen >= self.target_valid and not self.stopped.is_set():
+                    info("Target of %d valid numbers reached; scheduling no more checks.", self.target_valid)
+                    self.stopped.set()
+            if self._reorder is None:
+                if verdict == UNKNOWN:
+                    self.unknown.append(number)
+                else:
+                    self._emit(-1, number, verdict)
+                return
+            if index is None:
+                raise ValueError("Ordered output needs the input index of every result")
+            if verdict == UNKNOWN and not self._final_pass:
+                self.unknown.append(number)
+                self._reorder.put(index, number, _DEFERRED)
+            else:
+                self._reorder.put(index, number, verdict)
+
+    def skip(self, numbers: List[str], offset: Optional[int] = None) -> None:
+        """Record numbers left unchecked by an early stop; `offset` is the pass index of the first."""
+        if not numbers:
+            return
+        verdict = UNKNOWN if self._retry_pass else _UNCHECKED
+        with self._lock:
+            if self._reorder is None:
+                (self.unknown if self._retry_pass else self.unchecked).extend(numbers)
+                return
+            if offset is None:
+                raise ValueError("Ordered output needs the input index of every result")
+            for i, number in enumerate(numbers):
+                self._reorder.put(offset + i, number, verdict)
+
+    def begin_pass(self, final: bool, retry: bool = False) -> None:
+        """Start a pass; unknown verdicts of a final pass are not retried."""
+        self._final_pass = final
+        self._retry_pass = retry
+
+    def take_unknown(self) -> List[str]:
+        """Hand out the numbers to retry; the next pass indexes into this list."""
+        with self._lock:
+            unknown, self.unknown = self.unknown, []
+            if self._reorder is not None:
+                self._reorder.close()
+                self._reorder = ReorderBuffer(self._emit, self._reorder_size)
+        return unknown
+
+    def finish(self) -> None:
+        """Release everything still buffered (ordered output only)."""
+        if self._reorder is None:
+            return
+        with self._lock:
+            self._reorder.close()
+            # Deferred numbers whose retry pass never ran (early stop) stay unknown.
+            self.unknown, self._final_unknown = self._final_unknown + self.unknown, []
+
+    def as_tuple(self) -> ModeResult:
+        return self.valid, self.invalid, self.unknown, self.unchecked
+
+
+def _run_with_deferred_retries(
+    run_pass: Callable[[List[str]], None],
+    numbers: List[str],
+    results: _Results,
+    unknown_retries: int,
+) -> ModeResult:
+    """
+    Run one pass over `numbers`, then up to `unknown_retries` further passes
+    over whatever came back UNKNOWN. Retries happen at the end of the run so
+    transient errors get time to clear instead of stalling the main pass.
+    """
+    if results.stats is not None:
+        results.stats.add_total(len(numbers))
+    results.begin_pass(final=unknown_retries <= 0)
+    run_pass(numbers)
+
+    for attempt in range(1, unknown_retries + 1):
+        if results.stopped.is_set():
+            break
+        deferred = results.take_unknown()
+        if not deferred:
+            break
+        info("Deferred retry pass %d/%d: %d unknown numbers", attempt, unknown_retries, len(deferred))
+        if results.stats is not None:
+            results.stats.add_total(len(deferred))
+        results.begin_pass(final=attempt == unknown_retries, retry=True)
+        run_pass(deferred)
+
+    results.finish()
+    if results.unchecked:
+        info("Stopped early: %d numbers were not checked.", len(results.unchecked))
+    if results.unknown:
+        warn("%d numbers are still unknown after %d retry pass(es).", len(results.unknown), unknown_retries)
+    return results.as_tuple()
+
+
+def _check_number(
+    supervisor: DriverSupervisor,
+    numbers: List[str],
+    pos: int,
+    budget: Optional[Callable[[int], int]] = None,
+) -> Tuple[Verdict, str, float, bool]:
+    """
+    Check numbers[pos]: from a batched in-page lookup when the supervisor
+    has one (see DriverSupervisor.lookup_ahead, which `budget` is passed
+    to), else by navigation. Returns (verdict, reason, latency, batched).
+    """
+    hit = supervisor.lookup_ahead(numbers, pos, budget)
+    if hit is not None:
+        return (*hit, True)
+    started = time.monotonic()
+    verdict, reason = supervisor.check(numbers[pos])
+    return verdict, reason, time.monotonic() - started, False
+
+
+def _pause(per_number_delay: float, supervisor: DriverSupervisor, batched: bool) -> None:
+    # A batched lookup costs the page one round trip for `batch_size`
+    # numbers, so spread one delay across them.
+    if per_number_delay > 0:
+        time.sleep(per_number_delay / supervisor.batch_size if batched else per_number_delay)
+
 
 def filter_numbers_single(
-    driver: WebDriver,
+    supervisor: DriverSupervisor,
     numbers: List[str],
     per_number_delay: float,
     valid_path: Path,
     invalid_path: Path,
-) -> Tuple[List[str], List[str]]:
-    valid: List[str] = []
-    invalid: List[str] = []
-    total = len(numbers)
-
-    for idx, num in enumerate(numbers, start=1):
-        info(f"Checking {idx}/{total}: {num}")
-        is_registered, reason = open_chat_for_number(driver, num)
-        debug(f"{num} -> {reason}")
-
-        if is_registered:
-            valid.append(num)
-            append_number(valid_path, num)
-        else:
-            invalid.append(num)
-            append_number(invalid_path, num)
-
-        if per_number_delay > 0:
-            time.sleep(per_number_delay)
-
-    return valid, invalid
+    unknown_retries: int = 1,
+    stats: Optional[RunStats] = None,
+    reorder_buffer: Optional[int] = None,
+    target_valid: int = 0,
+) -> ModeResult:
+    results = _Results(valid_path, invalid_path, stats, reorder_buffer, target_valid)
+
+    def run_pass(batch: List[str]) -> None:
+        total = len(batch)
+        for idx, num in enumerate(batch, start=1):
+            if results.stopped.is_set():
+                results.skip(batch[idx - 1:], idx - 1)
+                return
+            info("Checking %d/%d: %s", idx, total, num)
+            verdict, reason, latency, batched = _check_number(supervisor, batch, idx - 1)
+            debug("%s -> %s", num, reason)
+            results.add(num, verdict, latency, idx - 1)
+            _pause(per_number_delay, supervisor, batched)
+
+    return _run_with_deferred_retries(run_pass, numbers, results, unknown_retries)
 
 
 def _process_number_with_shared_driver(
-    driver: WebDriver,
+    supervisor: DriverSupervisor,
     phone_number: str,
     per_number_delay: float,
-    valid_path: Path,
-    invalid_path: Path,
-) -> Tuple[bool, str]:
+    results: _Results,
+    index: Optional[int] = None,
+    batch: Optional[List[str]] = None,
+) -> Tuple[Verdict, str]:
     with _driver_lock:
-        is_registered, reason = open_chat_for_number(driver, phone_number)
-
-    if is_registered:
-        append_number(valid_path, phone_number)
-    else:
-        append_number(invalid_path, phone_number)
+        if batch is not None and index is not None:
+            verdict, reason, latency, batched = _check_number(supervisor, batch, index)
+        else:
+            verdict, reason, latency, batched = _check_number(supervisor, [phone_number], 0)
 
-    if per_number_delay > 0:
-        time.sleep(per_number_delay)
+    results.add(phone_number, verdict, latency, index)
+    _pause(per_number_delay, supervisor, batched)
 
-    return is_registered, reason
+    return verdict, reason
 
 
 def filter_numbers_one_driver_threaded(
-    driver: WebDriver,
+    supervisor: DriverSupervisor,
     numbers: List[str],
     per_number_delay: float,
     valid_path: Path,
     invalid_path: Path,
     max_workers: int = 4,
-) -> Tuple[List[str], List[str]]:
-    all_valid: List[str] = []
-    all_invalid: List[str] = []
+    unknown_retries: int = 1,
+    stats: Optional[RunStats] = None,
+    reorder_buffer: Optional[int] = None,
+    target_valid: int = 0,
+) -> ModeResult:
+    results = _Results(valid_path, invalid_path, stats, reorder_buffer, target_valid)
 
     if not numbers:
-        return all_valid, all_invalid
-
-    total = len(numbers)
-    info(f"One-driver threaded mode | Total numbers: {total} | Threads: {max_workers}")
-
-    def worker_task(idx_num):
-        idx, num = idx_num
-        debug(f"[THREAD] Scheduled {idx + 1}/{total}: {num}")
-        is_reg, reason = _process_number_with_shared_driver(
-            driver=driver,
-            phone_number=num,
-            per_number_delay=per_number_delay,
-            valid_path=valid_path,
-            invalid_path=invalid_path,
-        )
-        return idx, num, is_reg, reason
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {
-            executor.submit(worker_task, (idx, num)): (idx, num)
-            for idx, num in enumerate(numbers)
-        }
-
-        for future in as_completed(futures):
-            idx, num, is_reg, reason = future.result()
-            debug(f"[THREAD] Done {idx + 1}/{total}: {num} -> {reason}")
-            if is_reg:
-                all_valid.append(num)
-            else:
-                all_invalid.append(num)
-
-    return all_valid, all_invalid
-
-
-def _chunk_list(lst: List[str], n: int):
+        return results.as_tuple()
+
+    info("One-driver threaded mode | Total numbers: %d | Threads: %d", len(numbers), max_workers)
+
+    def run_pass(batch: List[str]) -> None:
+        total = len(batch)
+
+        def worker_task(idx_num):
+            idx, num = idx_num
+            debug("[THREAD] Scheduled %d/%d: %s", idx + 1, total, num)
+            verdict, reason = _process_number_with_shared_driver(
+                supervisor=supervisor,
+                phone_number=num,
+                per_number_delay=per_number_delay,
+                results=results,
+                index=idx,
+                batch=batch,
+            )
+            return idx, num, reason
+
+        window = max_workers * _SUBMIT_WINDOW_PER_WORKER
+        source = iter(enumerate(batch))
+        exhausted = False
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running: Dict[Future, Tuple[int, str]] = {}
+            while True:
+                if results.stopped.is_set() and not exhausted:
+                    # Drop queued tasks that have not started; let running ones finish.
+                    for future, (idx, num) in list(running.items()):
+                        if future.cancel():
+                            del running[future]
+                            results.skip([num], idx)
+                    rest = list(source)
+                    if rest:
+                        results.skip([num for _, num in rest], rest[0][0])
+                    exhausted = True
+                while not exhausted and len(running) < window:
+                    item = next(source, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    running[executor.submit(worker_task, item)] = item
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    idx, num, reason = future.result()
+                    debug("[THREAD] Done %d/%d: %s -> %s", idx + 1, total, num, reason)
+
+    return _run_with_deferred_retries(run_pass, numbers, results, unknown_retries)
+
+
+def _chunk_list(lst: List[str], n: int) -> Iterator[Tuple[List[str], int]]:
+    """Lazily yield (chunk, offset of its first number in `lst`)."""
     for i in range(0, len(lst), n):
-        yield lst[i:i + n]
+        yield lst[i:i + n], i
 
 
 def _process_numbers_chunk(
     numbers_chunk: List[str],
-    browser: str,
-    headless: bool,
-    driver_path: Optional[str],
+    supervisors: SupervisorPool,
     per_number_delay: float,
-    valid_path: Path,
-    invalid_path: Path,
+    results: _Results,
+    account: Account,
     worker_id: int,
-) -> Tuple[List[str], List[str]]:
-    valid: List[str] = []
-    invalid: List[str] = []
-
-    profile_suffix = f"worker_{worker_id}"
-    driver = create_driver(
-        browser=browser,
-        headless=headless,
-        driver_path=driver_path,
-        profile_suffix=profile_suffix,
-    )
-
-    driver.get(WHATSAPP_WEB_URL)
+    pool: AccountPool,
+    offset: int = 0,
+) -> List[str]:
+    """
+    Check one chunk on the supervised browser of `account`'s slot, which
+    stays up for the next chunk. Returns the tail of the chunk left
+    unchecked if the worker gave up or the account was taken out of
+    rotation (empty when the chunk completed). `offset` is the pass index
+    of the chunk's first number.
+    """
+    total = len(numbers_chunk)
+    done = 0
+    tag = f"[THREAD {worker_id}]" if not account.name else f"[{account.name} {worker_id}]"
+    supervisor = supervisors.get(account.worker_suffix(worker_id), label=tag)
 
     try:
-        wait_for_login(driver)
-        total = len(numbers_chunk)
+        if supervisor.driver is None:
+            supervisor.start()
         for idx, num in enumerate(numbers_chunk, start=1):
-            debug(f"[THREAD {worker_id}] Checking {idx}/{total}: {num}")
-            is_registered, reason = open_chat_for_number(driver, num)
-            debug(f"[THREAD {worker_id}] {num} -> {reason}")
-
-            if is_registered:
-                valid.append(num)
-                append_number(valid_path, num)
-            else:
-                invalid.append(num)
-                append_number(invalid_path, num)
-
-            if per_number_delay > 0:
-                time.sleep(per_number_delay)
-    finally:
-        driver.quit()
+            if results.stopped.is_set():
+                debug("%s Run target reached; handing back %d numbers.", tag, total - done)
+                return numbers_chunk[done:]
+            # Numbers settled by an earlier batched lookup were charged with it.
+            if not supervisor.prepaid(num) and not pool.wait_for_budget(account):
+                info("%s Account out of rotation; handing back %d numbers.", tag, total - done)
+                return numbers_chunk[done:]
+            debug("%s Checking %d/%d: %s", tag, idx, total, num)
+            verdict, reason, latency, batched = _check_number(
+                supervisor, numbers_chunk, idx - 1, lambda n: pool.take_budget(account, n)
+            )
+            debug("%s %s -> %s", tag, num, reason)
+            results.add(num, verdict, latency, offset + idx - 1)
+            pool.report(account, verdict)
+            done = idx
+            _pause(per_number_delay, supervisor, batched)
+    except Exception as e:
+        cause = str(e) if isinstance(e, WorkerFailed) else f"unexpected error {e!r}"
+        error("%s %s; %d numbers left unchecked.", tag, cause, total - done)
+        supervisor.quit()
+        return numbers_chunk[done:]
 
-    return valid, invalid
+    return []
 
 
 def filter_numbers_threaded(
@@ -173,41 +477,275 @@ def filter_numbers_threaded(
     driver_path: Optional[str],
     max_workers: int = 2,
     chunk_size: int = 50,
-) -> Tuple[List[str], List[str]]:
-    all_valid: List[str] = []
-    all_invalid: List[str] = []
+    autoscaler: Optional[Autoscaler] = None,
+    health: Optional[HealthSettings] = None,
+    unknown_retries: int = 1,
+    account_pool: Optional[AccountPool] = None,
+    stats: Optional[RunStats] = None,
+    reorder_buffer: Optional[int] = None,
+    target_valid: int = 0,
+    supervisors: Optional[SupervisorPool] = None,
+) -> ModeResult:
+    """
+    Run chunks on worker browsers. Each running chunk leases one
+    (account, slot) pair from the account pool; the slot picks the cloned
+    profile of that account (worker_<slot>, or <account>_worker_<slot>).
+    Without a pool, a single default account with `max_workers` slots is used.
+
+    With an autoscaler, the number of concurrently running chunks follows
+    `autoscaler.target`; when it drops, running chunks finish and are simply
+    not replaced.
+
+    If a worker gives up on its browser, the unchecked rest of its chunk is
+    requeued for another worker; numbers that exhaust their attempts are
+    reported as unknown. A failing chunk never aborts the run. Slots whose
+    profile turns out to be logged out are retired for the rest of the run,
+    and throttled accounts hand their work back to the others.
+
+    Once `target_valid` valid numbers are in, running chunks stop after
+    their current number and nothing new is scheduled.
+
+    Browsers come from `supervisors` and stay up between chunks; pass a
+    pool to keep them for later runs too, otherwise one is made for this
+    run and closed at its end. A slot's browser is parked (quit) when its
+    slot will not be leased again soon: retired, throttled account, or
+    the autoscaler lowered the worker target.
+    """
+    results = _Results(valid_path, invalid_path, stats, reorder_buffer, target_valid)
+    health_ttl = (health or HealthSettings()).session_ttl
+    pool = account_pool or AccountPool([Account(threads=max_workers)])
 
     if not numbers:
-        return all_valid, all_invalid
-
-    chunks = list(_chunk_list(numbers, chunk_size))
-    info(
-        f"Total numbers: {len(numbers)} | "
-        f"Chunks: {len(chunks)} | Threads: {max_workers} | Chunk size: {chunk_size}"
-    )
-
-    workers = min(max_workers, len(chunks))
-
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        futures = []
-        for worker_id, chunk in enumerate(chunks, start=1):
-            futures.append(
-                executor.submit(
-                    _process_numbers_chunk,
-                    chunk,
-                    browser,
-                    headless,
-                    driver_path,
-                    per_number_delay,
-                    valid_path,
-                    invalid_path,
-                    worker_id,
-                )
+        return results.as_tuple()
+
+    own_supervisors = supervisors is None
+    browsers = supervisors or SupervisorPool(browser, headless, driver_path, health, stats)
+
+    def run_pass(batch: List[str]) -> None:
+        # Chunks are cut from `batch` only when a slot is free to run them, so
+        # at most one chunk per worker exists at a time. `pending` holds the
+        # next chunk plus any handed back for another attempt, as
+        # (numbers, attempt, pass index of the first number).
+        fresh = _chunk_list(batch, chunk_size)
+        pending: Deque[Tuple[List[str], int, int]] = deque()
+        num_chunks = -(-len(batch) // chunk_size)
+        workers = min(pool.total_slots, num_chunks)
+        info(
+            f"Total numbers: {len(batch)} | "
+            f"Chunks: {num_chunks} | Threads: {workers} | Chunk size: {chunk_size}"
+        )
+
+        def refill() -> None:
+            if not pending:
+                item = next(fresh, None)
+                if item is not None:
+                    pending.append((item[0], 1, item[1]))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            running: Dict[Future, Tuple[Account, int, int, int]] = {}
+
+            refill()
+            while pending or running:
+                if pending and results.stopped.is_set():
+                    for chunk, _, offset in list(pending) + [(c, 1, o) for c, o in fresh]:
+                        results.skip(chunk, offset)
+                    pending.clear()
+                if pending and not running and pool.exhausted():
+                    error("All worker profiles are logged out; marking the remaining numbers unknown.")
+                    leftovers = [(chunk, offset) for chunk, _, offset in pending]
+                    for chunk, offset in leftovers + list(fresh):
+                        for i, num in enumerate(chunk):
+                            results.add(num, UNKNOWN, index=offset + i)
+                    pending.clear()
+                    break
+
+                limit = min(workers, autoscaler.target) if autoscaler else workers
+                while pending and len(running) < limit:
+                    lease = pool.acquire()
+                    if lease is None:
+                        break
+                    account, worker_id = lease
+                    chunk, attempt, offset = pending.popleft()
+                    refill()
+                    future = executor.submit(
+                        _process_numbers_chunk,
+                        chunk,
+                        browsers,
+                        per_number_delay,
+                        results,
+                        account,
+                        worker_id,
+                        pool,
+                        offset,
+                    )
+                    running[future] = (account, worker_id, attempt, offset + len(chunk))
+
+                if not running:
+                    # Every account is benched or busy; wait for one to come back.
+                    time.sleep(_SCHEDULER_TICK)
+                    continue
+
+                done, _ = wait(running, timeout=_SCHEDULER_TICK, return_when=FIRST_COMPLETED)
+                for future in done:
+                    account, worker_id, attempt, end = running.pop(future)
+                    logged_out = is_known_expired(browser, account.worker_suffix(worker_id), health_ttl)
+                    pool.release(account, worker_id, retire=logged_out)
+                    limit = min(workers, autoscaler.target) if autoscaler else workers
+                    if logged_out or not pool.is_usable(account) or len(running) >= limit:
+                        browsers.park(account.worker_suffix(worker_id))
+                    rest = future.result()
+                    if not rest:
+                        continue
+                    rest_offset = end - len(rest)
+                    if results.stopped.is_set():
+                        results.skip(rest, rest_offset)
+                    elif not pool.is_usable(account) and not logged_out:
+                        # Throttled account: not the chunk's fault, don't count the attempt.
+                        pending.appendleft((rest, attempt, rest_offset))
+                    elif attempt < _MAX_CHUNK_ATTEMPTS:
+                        warn("Requeueing %d numbers from worker %d.", len(rest), worker_id)
+                        pending.append((rest, attempt + 1, rest_offset))
+                    else:
+                        error(
+                            f"{len(rest)} numbers could not be checked after "
+                            f"{_MAX_CHUNK_ATTEMPTS} attempts; marking them unknown."
+                        )
+                        for i, num in enumerate(rest):
+                            results.add(num, UNKNOWN, index=rest_offset + i)
+                refill()
+
+    try:
+        return _run_with_deferred_retries(run_pass, numbers, results, unknown_retries)
+    finally:
+        if own_supervisors:
+            browsers.close()
+
+
+class ModeResources:
+    """
+    What a run keeps between run_mode calls: the browsers (one supervisor
+    per profile), the account pool with its budgets and benching, and the
+    autoscaler. A range sweep holds one for all of its segments, so
+    browsers are launched and logged in once per sweep.
+    """
+
+    def __init__(self, cfg: AppConfig, stats: RunStats) -> None:
+        self.supervisors = SupervisorPool(
+            cfg.browser, cfg.headless, cfg.driver_path, HealthSettings.from_config(cfg), stats
+        )
+        self.autoscaler: Optional[Autoscaler] = None
+        self.account_pool: Optional[AccountPool] = None
+        self.max_workers = cfg.threads
+        if cfg.mode != "threaded":
+            return
+
+        if cfg.autoscale:
+            self.max_workers = max(cfg.max_threads, cfg.min_threads)
+            self.autoscaler = Autoscaler(
+                min_workers=cfg.min_threads,
+                max_workers=self.max_workers,
+                initial=cfg.threads,
+                min_free_memory_mb=cfg.min_free_memory_mb,
+                max_cpu_percent=cfg.max_cpu_percent,
+                max_browser_memory_mb=cfg.max_browser_memory_mb,
+                interval=cfg.autoscale_interval,
+            ).start()
+
+        accounts = parse_accounts(cfg.accounts, default_threads=self.max_workers)
+        self.account_pool = AccountPool(
+            accounts,
+            throttle_after=cfg.throttle_after,
+            cooldown=cfg.throttle_cooldown,
+        )
+        self.account_pool.log_summary()
+        for account in accounts:
+            prepare_worker_profiles(
+                browser=cfg.browser,
+                max_workers=account.threads,
+                base_suffix=account.base_suffix,
+                worker_prefix=account.worker_prefix,
             )
 
-        for future in as_completed(futures):
-            v, inv = future.result()
-            all_valid.extend(v)
-            all_invalid.extend(inv)
+    def close(self) -> None:
+        if self.autoscaler is not None:
+            self.autoscaler.stop()
+        self.supervisors.close()
+
+
+def run_mode(
+    cfg: AppConfig,
+    numbers: List[str],
+    valid_path: Path,
+    invalid_path: Path,
+    stats: RunStats,
+    resources: Optional[ModeResources] = None,
+) -> ModeResult:
+    """
+    Run `numbers` through the configured mode; returns (valid, invalid,
+    unknown, unchecked). Numbers are unchecked only when `target_valid`
+    stopped the run early.
+
+    Without `resources`, browsers and the account pool are set up for
+    this call and torn down at its end.
+    """
+    own_resources = resources is None
+    res = resources or ModeResources(cfg, stats)
+    reorder_buffer = cfg.reorder_buffer if cfg.ordered_output else None
+    base_suffix = Account(name=cfg.account or "").base_suffix
 
-    return all_valid, all_invalid
\ No newline at end of file
+    try:
+        if cfg.mode in ("single", "onedriver"):
+            supervisor = res.supervisors.get(base_suffix, expect_session=cfg.headless)
+            if supervisor.driver is None:
+                supervisor.start()
+
+        if cfg.mode == "single":
+            return filter_numbers_single(
+                supervisor=supervisor,
+                numbers=numbers,
+                per_number_delay=cfg.delay,
+                valid_path=valid_path,
+                invalid_path=invalid_path,
+                unknown_retries=cfg.unknown_retries,
+                stats=stats,
+                reorder_buffer=reorder_buffer,
+                target_valid=cfg.target_valid,
+            )
+
+        if cfg.mode == "onedriver":
+            return filter_numbers_one_driver_threaded(
+                supervisor=supervisor,
+                numbers=numbers,
+                per_number_delay=cfg.delay,
+                valid_path=valid_path,
+                invalid_path=invalid_path,
+                max_workers=cfg.threads,
+                unknown_retries=cfg.unknown_retries,
+                stats=stats,
+                reorder_buffer=reorder_buffer,
+                target_valid=cfg.target_valid,
+            )
+
+        # threaded
+        return filter_numbers_threaded(
+            numbers=numbers,
+            per_number_delay=cfg.delay,
+            valid_path=valid_path,
+            invalid_path=invalid_path,
+            browser=cfg.browser,
+            headless=cfg.headless,
+            driver_path=cfg.driver_path,
+            max_workers=res.max_workers,
+            chunk_size=cfg.chunk_size,
+            autoscaler=res.autoscaler,
+            health=res.supervisors.health,
+            unknown_retries=cfg.unknown_retries,
+            account_pool=res.account_pool,
+            stats=stats,
+            reorder_buffer=reorder_buffer,
+            target_valid=cfg.target_valid,
+            supervisors=res.supervisors,
+        )
+    finally:
+        if own_resources:
+            res.close()
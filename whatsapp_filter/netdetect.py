@@ -0,0 +1,155 @@
+# whatsapp_filter/netdetect.py
+from __future__ import annotations
+import json
+import re
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from .whatsapp import Verdict, VALID, INVALID
+from .logger import debug, warn
+
+# Keys that carry the looked-up number in a lookup response object.
+_ID_KEYS = ("jid", "wid", "id", "phone", "number", "user")
+
+# Keys that say whether the number exists on WhatsApp.
+_EXISTS_KEYS = ("exists", "numberExists", "isRegistered", "registered", "valid")
+
+# Lookup responses are small; skip bodies that are obviously something else.
+_MAX_BODY_BYTES = 256 * 1024
+
+# Only responses whose URL path looks like this are worth a
+# Network.getResponseBody round trip; scripts, images, the app shell and
+# the /send?phone=... page itself are not lookups.
+_LOOKUP_URL = re.compile(r"lookup|exist|query|contact|usync|phone|number|wid|jid", re.IGNORECASE)
+
+
+def _digits(value: Any) -> str:
+    return "".join(ch for ch in str(value) if ch.isdigit())
+
+
+def _user_digits(value: Any) -> str:
+    """Digits of the user part of an id: "15551234:3@s.whatsapp.net" -> "15551234"."""
+    return _digits(str(value).split("@", 1)[0].split(":", 1)[0])
+
+
+def _walk(obj: Any) -> Iterator[Dict[str, Any]]:
+    if isinstance(obj, dict):
+        yield obj
+        for value in obj.values():
+            yield from _walk(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from _walk(value)
+
+
+def classify_lookup_payload(payload: str, number: str) -> Optional[Verdict]:
+    """
+    Classify a plaintext lookup response for `number`, or return None if the
+    payload is not one. Recognized: JSON objects (at any depth) whose id
+    field (jid/wid/id/phone/number/user; for a jid, the user part without
+    @server or :device) equals the number and that carry either a boolean
+    existence flag (exists, numberExists, ...) or an HTTP-like `status`
+    (200 = registered, 404 = not registered).
+    """
+    wanted = _digits(number)
+    if not wanted or not payload or payload[0] not in "{[":
+        return None
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return None
+
+    for obj in _walk(data):
+        ids = [_user_digits(obj[k]) for k in _ID_KEYS if k in obj and not isinstance(obj[k], (dict, list))]
+        if wanted not in ids:
+            continue
+        for key in _EXISTS_KEYS:
+            if isinstance(obj.get(key), bool):
+                return VALID if obj[key] else INVALID
+        status = obj.get("status")
+        if status in (200, "200"):
+            return VALID
+        if status in (404, "404"):
+            return INVALID
+    return None
+
+
+class NetworkDetector:
+    """
+    Watches the browser's DevTools network events (Chrome/Edge performance
+    log) and classifies a number from the app's own lookup response as soon
+    as it arrives: HTTP response bodies and text WebSocket frames are run
+    through classify_lookup_payload. Bodies are fetched only for responses
+    whose URL path looks like a lookup endpoint (_LOOKUP_URL).
+
+    WhatsApp's production WebSocket frames are binary and end-to-end
+    encrypted, so against the live service this usually finds nothing and
+    the caller falls back to the DOM probe; plaintext lookup responses (a
+    mock server via `web_url`, or an intercepting proxy) are classified
+    without waiting for the UI to render.
+    """
+
+    def __init__(self, driver: WebDriver) -> None:
+        self.driver = driver
+        self.available = True
+        self._lookups: Set[str] = set()  # request ids of lookup-like responses
+
+    def _entries(self) -> Iterator[Dict[str, Any]]:
+        try:
+            raw = self.driver.get_log("performance")
+        except Exception as e:
+            warn("Network detection unavailable (%r); using the page probe only.", e)
+            self.available = False
+            return
+        for entry in raw:
+            try:
+                yield json.loads(entry["message"])["message"]
+            except (KeyError, TypeError, ValueError):
+                continue
+
+    def reset(self) -> None:
+        """Discard events from before the next lookup."""
+        self._lookups.clear()
+        if self.available:
+            for _ in self._entries():
+                pass
+
+    def _response_body(self, request_id: str) -> Optional[str]:
+        try:
+            body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            return None
+        if body.get("base64Encoded"):
+            return None
+        return body.get("body")
+
+    def poll(self, number: str) -> Optional[Tuple[Verdict, str]]:
+        """Check the events received since the last poll; None if inconclusive."""
+        if not self.available:
+            return None
+        for msg in self._entries():
+            method = msg.get("method")
+            params = msg.get("params") or {}
+            payload: Optional[str] = None
+            source = ""
+            if method == "Network.webSocketFrameReceived":
+                frame = params.get("response") or {}
+                if frame.get("opcode") == 1:
+                    payload, source = frame.get("payloadData"), "websocket frame"
+            elif method == "Network.responseReceived":
+                url = (params.get("response") or {}).get("url", "")
+                if _LOOKUP_URL.search(url.split("?", 1)[0]):
+                    self._lookups.add(params.get("requestId", ""))
+            elif method == "Network.loadingFinished":
+                request_id = params.get("requestId", "")
+                if request_id in self._lookups and params.get("encodedDataLength", 0) <= _MAX_BODY_BYTES:
+                    self._lookups.discard(request_id)
+                    payload, source = self._response_body(request_id), "HTTP response"
+            if not payload:
+                continue
+            verdict = classify_lookup_payload(payload, number)
+            if verdict is not None:
+                debug("Network lookup response for %s: %s (%s)", number, verdict, source)
+                return verdict, f"Lookup {source} says {verdict}."
+        return None
@@ -0,0 +1,137 @@
+# whatsapp_filter/profiler.py
+from __future__ import annotations
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from types import FrameType
+from typing import Iterator, List, Optional, Tuple
+
+from .logger import info, warn
+
+# Hot functions listed in the summary.
+_TOP_N = 30
+
+# "ThreadPoolExecutor-0_3" and "ThreadPoolExecutor-0_7" are the same kind
+# of thread; merge them so the flame graph has one root per role.
+_THREAD_SUFFIX = re.compile(r"[-_ ]?\d+(_\d+)?$")
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}".replace(" ", "_").replace(";", ":")
+
+
+def _stack(frame: Optional[FrameType]) -> Tuple[str, ...]:
+    labels: List[str] = []
+    while frame is not None:
+        labels.append(_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for every thread of this process.
+
+    A daemon thread wakes every `interval` seconds, grabs all thread stacks
+    with sys._current_frames() and counts them, so the cost is a stack walk
+    per thread per sample, independent of how much code runs in between.
+    Blocked threads (waiting on WebDriver, locks, sleeps) are sampled too,
+    which is what a controller bottleneck looks like.
+    """
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = max(0.001, interval)
+        self.samples: "Counter[Tuple[str, ...]]" = Counter()
+        self.ticks = 0
+        self.started = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                thread = _THREAD_SUFFIX.sub("", names.get(ident, "thread")) or "thread"
+                self.samples[(f"thread:{thread}",) + _stack(frame)] += 1
+            self.ticks += 1
+
+    def start(self) -> "SamplingProfiler":
+        self.started = time.monotonic()
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.monotonic() - self.started
+
+    def write_collapsed(self, path: Path) -> None:
+        """Collapsed stacks ("frame;frame;frame count"), the input of flamegraph.pl / speedscope."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+
+def format_summary(samples: "Counter[Tuple[str, ...]]", duration: float, interval: float, top: int = _TOP_N) -> str:
+    """Top functions by self samples (leaf frame) and by inclusive samples (anywhere on the stack)."""
+    total = sum(samples.values())
+    own: "Counter[str]" = Counter()
+    inclusive: "Counter[str]" = Counter()
+    for stack, count in samples.items():
+        frames = stack[1:]  # drop the thread root
+        if not frames:
+            continue
+        own[frames[-1]] += count
+        for label in set(frames):
+            inclusive[label] += count
+
+    lines = [
+        f"Profile: {duration:.1f}s, {total} samples every {interval * 1000:.0f}ms across all threads",
+        "",
+        f"Top {top} by self samples (where threads are running or blocked):",
+    ]
+    for label, count in own.most_common(top):
+        lines.append(f"  {count / total:6.1%}  {count:>8}  {label}" if total else f"  {label}")
+    lines += ["", f"Top {top} by inclusive samples (function or its callees on the stack):"]
+    for label, count in inclusive.most_common(top):
+        lines.append(f"  {count / total:6.1%}  {count:>8}  {label}" if total else f"  {label}")
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def profile_run(out_dir: Path, interval: float = 0.01) -> Iterator[SamplingProfiler]:
+    """
+    Profile the block. Writes profile_<timestamp>.collapsed and
+    profile_<timestamp>.txt (top-N summary) to `out_dir` when it ends.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    profiler = SamplingProfiler(interval).start()
+    info(f"Profiling every {profiler.interval * 1000:.0f}ms; results go to {out_dir}")
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        collapsed_path = out_dir / f"profile_{stamp}.collapsed"
+        summary_path = out_dir / f"profile_{stamp}.txt"
+        try:
+            profiler.write_collapsed(collapsed_path)
+            summary_path.write_text(
+                format_summary(profiler.samples, profiler.duration, profiler.interval), encoding="utf-8"
+            )
+        except OSError as e:
+            warn(f"Could not write profile: {e}")
+        else:
+            info(f"Profile: {summary_path} | flame graph input: {collapsed_path}")
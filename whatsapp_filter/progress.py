@@ -0,0 +1,154 @@
+# whatsapp_filter/progress.py
+from __future__ import annotations
+import sys
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional, TextIO, Tuple
+
+from .stats import RunStats
+from .whatsapp import VALID, INVALID, UNKNOWN
+from .logger import set_console_writer
+
+# Rolling window for the checks/sec figure and the ETA.
+_RATE_WINDOW_S = 30.0
+
+# A worker sitting in one state longer than this is shown as stalled.
+_STALL_AFTER_S = 45.0
+
+# Without a terminal, a plain status line is printed this often instead.
+_PLAIN_INTERVAL_S = 10.0
+
+_CLEAR_LINE = "\x1b[2K"
+
+
+def _fmt_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+class ProgressDisplay:
+    """
+    Live status block (done/remaining, rolling checks/sec, ETA, verdicts and
+    per-worker state) redrawn by a background thread at a fixed rate.
+
+    Workers only update counters in RunStats; all formatting and terminal
+    I/O happens here, off the check path. While active, log lines are
+    written above the block (the block is cleared and redrawn on the next
+    tick). Without a TTY it falls back to a periodic one-line summary.
+    """
+
+    def __init__(
+        self,
+        stats: RunStats,
+        refresh: float = 1.0,
+        stream: Optional[TextIO] = None,
+    ) -> None:
+        self.stats = stats
+        self.refresh = refresh
+        self.stream = stream or sys.stderr
+        self.interactive = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self._samples: Deque[Tuple[float, int]] = deque()
+        self._drawn_lines = 0
+        self._last_plain = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- rendering ----------
+
+    def _rate(self, now: float, checks: int) -> float:
+        self._samples.append((now, checks))
+        while len(self._samples) > 2 and now - self._samples[0][0] > _RATE_WINDOW_S:
+            self._samples.popleft()
+        t0, c0 = self._samples[0]
+        return (checks - c0) / (now - t0) if now > t0 else 0.0
+
+    def _render(self) -> List[str]:
+        stats = self.stats
+        now = time.monotonic()
+        checks, total = stats.checks, stats.total
+        rate = self._rate(now, checks)
+        remaining = max(0, total - checks)
+        eta = remaining / rate if rate > 0 else None
+        pct = 100.0 * checks / total if total else 0.0
+        v = stats.verdicts
+
+        lines = [
+            f"Progress {checks}/{total} ({pct:.1f}%) | remaining {remaining} | "
+            f"{rate:.2f} checks/s | ETA {_fmt_duration(eta)} | "
+            f"elapsed {_fmt_duration(stats.elapsed())}",
+            f"Verdicts: valid {v.get(VALID, 0)} | invalid {v.get(INVALID, 0)} | "
+            f"unknown {v.get(UNKNOWN, 0)}",
+        ]
+        for worker, (state, since) in sorted(dict(stats.workers).items()):
+            age = now - since
+            if state != "idle" and age > _STALL_AFTER_S:
+                state = f"STALLED ({state})"
+            lines.append(f"  {worker:<20} {state:<22} {_fmt_duration(age)}")
+        return lines
+
+    def _clear_block(self) -> None:
+        if self._drawn_lines:
+            self.stream.write(f"\x1b[{self._drawn_lines}F")
+            for _ in range(self._drawn_lines):
+                self.stream.write(_CLEAR_LINE + "\n")
+            self.stream.write(f"\x1b[{self._drawn_lines}F")
+            self._drawn_lines = 0
+
+    def _draw(self) -> None:
+        lines = self._render()
+        with self._lock:
+            if self.interactive:
+                self._clear_block()
+                for line in lines:
+                    self.stream.write(_CLEAR_LINE + line + "\n")
+                self._drawn_lines = len(lines)
+            else:
+                now = time.monotonic()
+                if now - self._last_plain < _PLAIN_INTERVAL_S:
+                    return
+                self._last_plain = now
+                self.stream.write(lines[0] + "\n")
+            self.stream.flush()
+
+    def _write_log_line(self, line: str, stream: TextIO) -> None:
+        with self._lock:
+            if self.interactive:
+                self._clear_block()
+                self.stream.flush()
+            print(line, file=stream)
+            stream.flush()
+
+    # ---------- lifecycle ----------
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.refresh):
+            try:
+                self._draw()
+            except Exception:
+                pass
+
+    def start(self) -> "ProgressDisplay":
+        set_console_writer(self._write_log_line)
+        self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.refresh * 2)
+        set_console_writer(None)
+        self._last_plain = 0.0
+        self._draw()
+
+    def __enter__(self) -> "ProgressDisplay":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
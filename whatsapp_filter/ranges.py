@@ -0,0 +1,112 @@
+# whatsapp_filter/ranges.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from .delta import KnownNumbers
+
+
+@dataclass(frozen=True)
+class NumberRange:
+    """
+    A block of numbers: `prefix` followed by every `width`-digit
+    (zero-padded) subscriber part from `start` to `end` inclusive.
+    """
+    prefix: str
+    start: int
+    end: int
+    width: int
+
+    @classmethod
+    def parse(cls, spec: str) -> "NumberRange":
+        """
+        Parse "PREFIX:START-END", e.g. "92300:0000000-9999999". START and END
+        have the same number of digits, which fixes the subscriber width.
+        """
+        prefix, sep, span = spec.strip().partition(":")
+        first, dash, last = span.partition("-")
+        prefix, first, last = prefix.strip().lstrip("+"), first.strip(), last.strip()
+        if not sep or not dash or not (prefix + first + last).isdigit() or len(first) != len(last):
+            raise ValueError(
+                f"Invalid range {spec!r}: expected PREFIX:START-END with equally long "
+                f"digit strings, e.g. 92300:0000000-9999999"
+            )
+        if int(first) > int(last):
+            raise ValueError(f"Invalid range {spec!r}: START is greater than END")
+        return cls(prefix=prefix, start=int(first), end=int(last), width=len(first))
+
+    def __len__(self) -> int:
+        return self.end - self.start + 1
+
+    def number(self, i: int) -> str:
+        return f"{self.prefix}{self.start + i:0{self.width}d}"
+
+
+def parse_shard(spec: Optional[str]) -> Tuple[int, int]:
+    """Parse "K/N" (1-based shard K of N) into (K, N); None means the whole range."""
+    if not spec:
+        return 1, 1
+    k, sep, n = spec.partition("/")
+    try:
+        shard, shards = int(k), int(n)
+    except ValueError:
+        shard, shards = 0, 0
+    if not sep or not 1 <= shard <= shards:
+        raise ValueError(f"Invalid range shard {spec!r}: expected K/N with 1 <= K <= N, e.g. 2/4")
+    return shard, shards
+
+
+class RangeSource:
+    """
+    Lazily generated input from number ranges, in spec order.
+
+    The ranges are treated as one index space and shard K of N gets the
+    K-th contiguous 1/N of it, so hosts or processes can split a sweep
+    without coordinating. Numbers in `known` (earlier results) are skipped
+    as they are generated. Nothing is materialized beyond the current
+    segment.
+    """
+
+    def __init__(
+        self,
+        ranges: Sequence[NumberRange],
+        shard: Tuple[int, int] = (1, 1),
+        known: Optional[KnownNumbers] = None,
+    ) -> None:
+        self.ranges = list(ranges)
+        self.known = known
+        total = sum(len(r) for r in self.ranges)
+        k, n = shard
+        self.first = total * (k - 1) // n
+        self.stop = total * k // n
+        self.skipped = 0
+        self.generated = 0
+
+    def __len__(self) -> int:
+        """Numbers in this shard, before skipping known ones."""
+        return self.stop - self.first
+
+    def __iter__(self) -> Iterator[str]:
+        base = 0
+        for rng in self.ranges:
+            lo = max(self.first - base, 0)
+            hi = min(self.stop - base, len(rng))
+            base += len(rng)
+            for i in range(lo, hi):
+                number = rng.number(i)
+                if self.known is not None and number in self.known:
+                    self.skipped += 1
+                    continue
+                self.generated += 1
+                yield number
+
+    def segments(self, size: int) -> Iterator[List[str]]:
+        """Yield the numbers to check in lists of at most `size`."""
+        segment: List[str] = []
+        for number in self:
+            segment.append(number)
+            if len(segment) >= size:
+                yield segment
+                segment = []
+        if segment:
+            yield segment
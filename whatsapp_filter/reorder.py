@@ -0,0 +1,129 @@
+# whatsapp_filter/reorder.py
+from __future__ import annotations
+import os
+import sqlite3
+import tempfile
+from typing import Callable, Dict, Optional, Tuple
+
+from .logger import debug, warn
+
+Emit = Callable[[int, str, str], None]  # (input index, number, verdict)
+
+
+class ReorderBuffer:
+    """
+    Turns results arriving in completion order back into input order.
+
+    Results are keyed by input index and emitted as soon as every earlier
+    index has been emitted. At most `capacity` results wait in memory; past
+    that, the half furthest from the head is spilled to a temporary SQLite
+    file and read back in runs once the head reaches it. A stalled number
+    therefore costs disk, not memory.
+
+    Not thread-safe: callers serialize put() and close().
+    """
+
+    def __init__(self, emit: Emit, capacity: int = 10000, spill_dir: Optional[str] = None) -> None:
+        self._emit = emit
+        self.capacity = max(2, capacity)
+        self.spill_dir = spill_dir
+        self._next = 0
+        self._pending: Dict[int, Tuple[str, str]] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_path: Optional[str] = None
+        self._spilled = 0
+        self._spill_min: Optional[int] = None
+
+    @property
+    def next_index(self) -> int:
+        return self._next
+
+    @property
+    def buffered(self) -> int:
+        return len(self._pending) + self._spilled
+
+    def put(self, index: int, number: str, verdict: str) -> None:
+        if index < self._next or index in self._pending:
+            raise ValueError(f"Result for input index {index} ({number}) was already received")
+        if index != self._next:
+            self._pending[index] = (number, verdict)
+            if len(self._pending) > self.capacity:
+                self._spill()
+            return
+        self._emit(index, number, verdict)
+        self._next += 1
+        self._drain()
+
+    def _drain(self) -> None:
+        while True:
+            item = self._pending.pop(self._next, None)
+            if item is None and self._spill_min == self._next:
+                self._unspill()
+                item = self._pending.pop(self._next, None)
+            if item is None:
+                return
+            self._emit(self._next, *item)
+            self._next += 1
+
+    # ---------- spilling ----------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            fd, self._db_path = tempfile.mkstemp(prefix="wa_reorder_", suffix=".sqlite", dir=self.spill_dir)
+            os.close(fd)
+            # Callers serialize access, but not necessarily from one thread.
+            self._db = sqlite3.connect(self._db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=OFF")
+            self._db.execute("PRAGMA synchronous=OFF")
+            self._db.execute("CREATE TABLE spill (idx INTEGER PRIMARY KEY, number TEXT, verdict TEXT)")
+            debug("Reorder buffer full; spilling to %s", self._db_path)
+        return self._db
+
+    def _spill(self) -> None:
+        keys = sorted(self._pending)
+        far = keys[len(keys) // 2:]
+        db = self._connect()
+        db.executemany(
+            "INSERT INTO spill (idx, number, verdict) VALUES (?, ?, ?)",
+            ((k, *self._pending.pop(k)) for k in far),
+        )
+        self._spilled += len(far)
+        if self._spill_min is None or far[0] < self._spill_min:
+            self._spill_min = far[0]
+
+    def _unspill(self) -> None:
+        assert self._db is not None
+        rows = self._db.execute(
+            "SELECT idx, number, verdict FROM spill WHERE idx >= ? ORDER BY idx LIMIT ?",
+            (self._next, self.capacity // 2),
+        ).fetchall()
+        if not rows:
+            self._spill_min = None
+            return
+        self._db.execute("DELETE FROM spill WHERE idx <= ?", (rows[-1][0],))
+        for idx, number, verdict in rows:
+            self._pending[idx] = (number, verdict)
+        self._spilled -= len(rows)
+        self._spill_min = self._db.execute("SELECT MIN(idx) FROM spill").fetchone()[0] if self._spilled else None
+
+    # ---------- shutdown ----------
+
+    def close(self) -> None:
+        """Emit whatever is still buffered, in index order, skipping gaps."""
+        while self._pending or self._spilled:
+            heads = [min(self._pending)] if self._pending else []
+            if self._spill_min is not None:
+                heads.append(self._spill_min)
+            head = min(heads)
+            warn(f"Reorder buffer: no result for input index {self._next}..{head - 1}; skipping ahead.")
+            self._next = head
+            self._drain()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+        if self._db_path is not None:
+            try:
+                os.remove(self._db_path)
+            except OSError:
+                pass
+            self._db_path = None
@@ -0,0 +1,298 @@
+# whatsapp_filter/replay.py
+from __future__ import annotations
+import gzip
+import json
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from .drivers import create_driver
+from .whatsapp import DETECTION_XPATHS, Verdict, open_chat_for_number
+from .logger import flush_logging, info, debug, warn
+
+# Page state = which detection selectors match, plus whether the app shell
+# is up. A snapshot of <body> (scripts stripped) is taken only when the
+# state changes, so a check costs a few snapshots, not one per poll.
+_SNAPSHOT_JS = """
+var x = function (p) {
+    return document.evaluate(p, document, null, XPathResult.BOOLEAN_TYPE, null).booleanValue ? '1' : '0';
+};
+var sig = x(arguments[0]) + x(arguments[1]) + x(arguments[2]) +
+    (document.querySelector("div[data-testid='app']") ? '1' : '0');
+if (sig === arguments[3] || !document.body) { return [sig, null]; }
+var body = document.body.cloneNode(true);
+body.querySelectorAll('script, noscript').forEach(function (e) { e.remove(); });
+return [sig, body.innerHTML];
+"""
+
+# "Verdict" of a record whose replay raised; never equals a recorded verdict.
+REPLAY_ERROR = "error"
+
+# Served at "/" so a replay browser counts as logged in.
+_APP_PAGE = "<!doctype html><html><head><meta charset='utf-8'></head><body><div data-testid='app'></div></body></html>"
+
+# Served at "/send?phone=...": replays the recorded <body> snapshots on
+# their recorded schedule, counted from page load like the recording.
+_SEND_PAGE = """<!doctype html><html><head><meta charset="utf-8"><script>
+var events = %s;
+window.addEventListener('load', function () {
+    events.forEach(function (e) {
+        setTimeout(function () { document.body.innerHTML = e.html; }, Math.round(e.t * 1000));
+    });
+});
+</script></head><body></body></html>"""
+
+
+@dataclass
+class RecordedCheck:
+    number: str
+    verdict: Verdict
+    latency: float
+    events: List[Dict[str, Any]]
+    path: Optional[Path] = None
+
+
+class CheckRecorder:
+    """
+    Captures page-state transitions of live checks into a replay corpus:
+    one gzipped JSON file per check with the verdict, the time to verdict
+    and a <body> snapshot at every state change, timed from page load.
+
+    Snapshots contain whatever the page showed (chat list included), so a
+    corpus holds the recorded account's data and must be kept private.
+    """
+
+    def __init__(self, corpus_dir: Path) -> None:
+        self.corpus_dir = corpus_dir
+        self.corpus_dir.mkdir(parents=True, exist_ok=True)
+        self._number: Optional[str] = None
+        self._started = 0.0
+        self._sig: Optional[str] = None
+        self._events: List[Dict[str, Any]] = []
+
+    def begin(self, number: str) -> None:
+        self._number = number
+        self._started = time.monotonic()
+        self._sig = None
+        self._events = []
+
+    def observe(self, driver: WebDriver) -> None:
+        if self._number is None:
+            return
+        try:
+            sig, html = driver.execute_script(_SNAPSHOT_JS, *DETECTION_XPATHS, self._sig)
+        except Exception as e:
+            debug("Recorder snapshot failed: %r", e)
+            return
+        if html is not None:
+            self._sig = sig
+            self._events.append({"t": round(time.monotonic() - self._started, 3), "sig": sig, "html": html})
+
+    def finish(self, driver: WebDriver, verdict: Verdict, reason: str) -> None:
+        if self._number is None:
+            return
+        latency = time.monotonic() - self._started
+        self.observe(driver)
+        record = {
+            "number": self._number,
+            "verdict": verdict,
+            "reason": reason,
+            "latency": round(latency, 3),
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "events": self._events,
+        }
+        stamp = time.strftime("%Y%m%d_%H%M%S") + f"{time.time() % 1:.3f}"[1:]
+        path = self.corpus_dir / f"{stamp}_{self._number}.json.gz"
+        try:
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                json.dump(record, f)
+        except OSError as e:
+            warn(f"Could not write replay record {path}: {e}")
+        self._number = None
+        self._events = []
+
+
+def load_corpus(corpus_dir: Path) -> Iterator[RecordedCheck]:
+    for path in sorted(corpus_dir.glob("*.json.gz")):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            yield RecordedCheck(data["number"], data["verdict"], float(data["latency"]), data["events"], path)
+        except (OSError, ValueError, KeyError) as e:
+            warn(f"Skipping unreadable replay record {path}: {e}")
+
+
+class ReplayServer:
+    """Local HTTP server that plays recorded checks back to a browser."""
+
+    def __init__(self, checks: List[RecordedCheck], host: str = "127.0.0.1", port: int = 0) -> None:
+        self._pages: Dict[str, bytes] = {}
+        for check in checks:
+            events = json.dumps([{"t": e["t"], "html": e["html"]} for e in check.events])
+            self._pages[check.number] = (_SEND_PAGE % events.replace("</", "<\\/")).encode("utf-8")
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="replay-server", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _make_handler(self) -> type:
+        pages = self._pages
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                parsed = urlparse(self.path)
+                if parsed.path == "/send":
+                    phone = parse_qs(parsed.query).get("phone", [""])[0]
+                    body = pages.get(phone)
+                    status = 200 if body is not None else 404
+                    body = body if body is not None else b"not recorded"
+                else:
+                    status, body = 200, _APP_PAGE.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt: str, *args: Any) -> None:
+                debug("replay server: " + fmt, *args)
+
+        return Handler
+
+    def __enter__(self) -> "ReplayServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@dataclass
+class ReplayResult:
+    number: str
+    expected: Verdict
+    got: Verdict
+    recorded_latency: float
+    latency: float
+    reason: str = ""
+
+    @property
+    def correct(self) -> bool:
+        return self.expected == self.got
+
+
+@dataclass
+class ReplayReport:
+    results: List[ReplayResult] = field(default_factory=list)
+
+    @property
+    def accuracy(self) -> float:
+        return sum(r.correct for r in self.results) / len(self.results) if self.results else 0.0
+
+    def confusion(self) -> Dict[Tuple[str, str], int]:
+        counts: Dict[Tuple[str, str], int] = {}
+        for r in self.results:
+            counts[(r.expected, r.got)] = counts.get((r.expected, r.got), 0) + 1
+        return counts
+
+
+def replay_corpus(
+    corpus_dir: Path,
+    browser: str = "chrome",
+    headless: bool = True,
+    driver_path: Optional[str] = None,
+    timeout: float = 15.0,
+) -> ReplayReport:
+    """
+    Play every recorded check in `corpus_dir` back through the current
+    detection logic (open_chat_for_number) in a real browser pointed at a
+    local ReplayServer; no WhatsApp account or network access is needed.
+    A record whose replay raises is reported as a REPLAY_ERROR mismatch
+    and the rest of the corpus still runs.
+    """
+    checks = list(load_corpus(corpus_dir))
+    report = ReplayReport()
+    if not checks:
+        warn(f"No replay records in {corpus_dir}")
+        return report
+    info(f"Replaying {len(checks)} recorded checks from {corpus_dir}")
+
+    with ReplayServer(checks) as server:
+        driver = create_driver(browser=browser, headless=headless, driver_path=driver_path, profile_suffix="replay")
+        try:
+            driver.get(server.url)
+            for idx, check in enumerate(checks, start=1):
+                # Timed from page load, like the recording (CheckRecorder.begin).
+                loaded = [time.monotonic()]
+                try:
+                    verdict, reason = open_chat_for_number(
+                        driver,
+                        check.number,
+                        timeout=timeout,
+                        base_url=server.url,
+                        on_loaded=lambda: loaded.append(time.monotonic()),
+                    )
+                except Exception as e:
+                    warn("Replay of %s failed: %r", check.path or check.number, e)
+                    verdict, reason = REPLAY_ERROR, f"replay failed: {e!r}"
+                result = ReplayResult(
+                    check.number, check.verdict, verdict, check.latency, time.monotonic() - loaded[-1], reason
+                )
+                report.results.append(result)
+                debug(
+                    "Replay %d/%d %s: expected %s, got %s in %.2fs (recorded %.2fs)",
+                    idx, len(checks), check.number, check.verdict, verdict, result.latency, check.latency,
+                )
+        finally:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+    return report
+
+
+def _quantile(values: List[float], q: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q * 100) - 1]
+
+
+def print_replay_report(report: ReplayReport) -> None:
+    flush_logging()
+    results = report.results
+    print("\n=== Replay report ===\n")
+    if not results:
+        print("  No checks replayed.\n")
+        return
+    print(f"  Checks: {len(results)} | Accuracy: {report.accuracy:.1%}")
+    print("\n  Expected -> got:")
+    for (expected, got), count in sorted(report.confusion().items()):
+        mark = "" if expected == got else "   <- mismatch"
+        print(f"    {expected:<8} -> {got:<8} {count:>6}{mark}")
+
+    replayed = [r.latency for r in results]
+    recorded = [r.recorded_latency for r in results]
+    print("\n  Time to verdict (s)   p50     p95     max")
+    for label, values in (("replayed", replayed), ("recorded", recorded)):
+        print(f"    {label:<18} {_quantile(values, 0.5):>6.2f}  {_quantile(values, 0.95):>6.2f}  {max(values):>6.2f}")
+
+    mismatches = [r for r in results if not r.correct]
+    if mismatches:
+        print("\n  Mismatches:")
+        for r in mismatches[:20]:
+            print(f"    {r.number}: expected {r.expected}, got {r.got} ({r.reason})")
+        if len(mismatches) > 20:
+            print(f"    ... and {len(mismatches) - 20} more")
+    print()
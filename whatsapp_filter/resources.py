@@ -0,0 +1,107 @@
+# whatsapp_filter/resources.py
+from __future__ import annotations
+import os
+import signal
+from typing import Optional
+
+try:
+    import psutil  # type: ignore
+except ImportError:
+    psutil = None
+
+_MB = 1024 * 1024
+
+
+def host_free_memory_mb() -> Optional[float]:
+    """
+    Available host memory in MB, or None if it cannot be determined.
+    Uses psutil when installed, otherwise /proc/meminfo (Linux only).
+    """
+    if psutil is not None:
+        return psutil.virtual_memory().available / _MB
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def host_cpu_percent() -> Optional[float]:
+    """
+    Host CPU utilisation in percent, or None if it cannot be determined.
+    Without psutil, falls back to the 1-minute load average per core.
+    """
+    if psutil is not None:
+        return psutil.cpu_percent(interval=None)
+    try:
+        load1 = os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+    return min(100.0, load1 / (os.cpu_count() or 1) * 100.0)
+
+
+def process_tree_rss_mb(pid: int, include_root: bool = True) -> Optional[float]:
+    """Total RSS in MB of a process and all of its descendants (requires psutil)."""
+    if psutil is None:
+        return None
+    try:
+        root = psutil.Process(pid)
+        procs = root.children(recursive=True)
+    except psutil.Error:
+        return None
+    if include_root:
+        procs.append(root)
+
+    total = 0
+    for proc in procs:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / _MB
+
+
+def browser_tree_rss_mb() -> Optional[float]:
+    """RSS in MB of every process spawned by this one (WebDrivers and browsers)."""
+    return process_tree_rss_mb(os.getpid(), include_root=False)
+
+
+def driver_rss_mb(driver) -> Optional[float]:
+    """RSS in MB of a single WebDriver service and the browser it launched."""
+    process = getattr(getattr(driver, "service", None), "process", None)
+    pid = getattr(process, "pid", None)
+    if pid is None:
+        return None
+    return process_tree_rss_mb(pid)
+
+
+def kill_process_tree(pid: int) -> None:
+    """
+    Kill a process and its descendants. Without psutil, a process that
+    leads its own process group (drivers.create_driver starts WebDrivers
+    that way on POSIX) is killed with its whole group; anything else only
+    by its pid.
+    """
+    if psutil is None:
+        sig = getattr(signal, "SIGKILL", signal.SIGTERM)
+        try:
+            if hasattr(os, "killpg") and os.getpgid(pid) == pid != os.getpgrp():
+                os.killpg(pid, sig)
+            else:
+                os.kill(pid, sig)
+        except OSError:
+            pass
+        return
+    try:
+        root = psutil.Process(pid)
+        procs = root.children(recursive=True) + [root]
+    except psutil.Error:
+        return
+    for proc in procs:
+        try:
+            proc.kill()
+        except psutil.Error:
+            continue
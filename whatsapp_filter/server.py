@@ -0,0 +1,186 @@
+# whatsapp_filter/server.py
+from __future__ import annotations
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from .api import Checker, CheckResult
+from .config import AppConfig
+from .whatsapp import VALID, INVALID
+from .logger import info, debug, warn
+
+# Upper bound on numbers per POST /check request.
+_MAX_BATCH = 10000
+
+
+class ResultCache:
+    """
+    LRU cache of recent conclusive answers (valid/invalid) with a TTL.
+    Unknown verdicts are never cached so they are re-checked next time.
+    """
+
+    def __init__(self, ttl: float, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: "OrderedDict[str, Tuple[float, CheckResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, number: str) -> Optional[CheckResult]:
+        if self.ttl <= 0 or self.max_size <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(number)
+            if item is None or item[0] < now:
+                if item is not None:
+                    del self._items[number]
+                self.misses += 1
+                return None
+            self._items.move_to_end(number)
+            self.hits += 1
+            return item[1]
+
+    def put(self, result: CheckResult) -> None:
+        if self.ttl <= 0 or self.max_size <= 0 or result.verdict not in (VALID, INVALID):
+            return
+        with self._lock:
+            self._items[result.number] = (time.monotonic() + self.ttl, result)
+            self._items.move_to_end(result.number)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class CheckService:
+    """
+    Answers lookups from the cache, or from the shared Checker workers.
+    Concurrent requests for the same number share one check.
+    """
+
+    def __init__(self, checker: Checker, cache: ResultCache) -> None:
+        self.checker = checker
+        self.cache = cache
+        self._pending: Dict[str, "Future[CheckResult]"] = {}
+        # Re-entrant: a future that is already resolved runs its callback inline.
+        self._lock = threading.RLock()
+
+    def _future_for(self, number: str) -> "Future[CheckResult]":
+        with self._lock:
+            future = self._pending.get(number)
+            if future is None:
+                future = self.checker.submit(number)
+                self._pending[number] = future
+                future.add_done_callback(lambda f, n=number: self._done(n, f))
+            return future
+
+    def _done(self, number: str, future: "Future[CheckResult]") -> None:
+        with self._lock:
+            self._pending.pop(number, None)
+        self.cache.put(future.result())
+
+    def lookup(self, numbers: List[str]) -> List[Dict[str, Any]]:
+        """Results in request order; numbers are checked concurrently."""
+        answers: Dict[str, Dict[str, Any]] = {}
+        futures: Dict[str, "Future[CheckResult]"] = {}
+        for number in numbers:
+            if number in answers or number in futures:
+                continue
+            cached = self.cache.get(number)
+            if cached is not None:
+                answers[number] = dict(asdict(cached), cached=True)
+            else:
+                futures[number] = self._future_for(number)
+        for number, future in futures.items():
+            answers[number] = dict(asdict(future.result()), cached=False)
+        return [answers[n] for n in numbers]
+
+    def health(self) -> Dict[str, Any]:
+        stats = self.checker.stats
+        return {
+            "workers": self.checker.workers,
+            "live_workers": self.checker.live_workers,
+            "pending": len(self._pending),
+            "checks": stats.checks,
+            "verdicts": dict(stats.verdicts),
+            "latency": stats.latency_summary(),
+            "cache": {"size": len(self.cache), "hits": self.cache.hits, "misses": self.cache.misses},
+        }
+
+
+def _make_handler(service: CheckService):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "whatsapp-filter"
+
+        def _send(self, status: int, payload: Any) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            if url.path == "/health":
+                self._send(200, service.health())
+            elif url.path == "/check":
+                number = (parse_qs(url.query).get("number") or [""])[0].strip()
+                if not number:
+                    self._send(400, {"error": "missing ?number="})
+                    return
+                self._send(200, service.lookup([number])[0])
+            else:
+                self._send(404, {"error": f"unknown path {url.path}"})
+
+        def do_POST(self) -> None:
+            if urlparse(self.path).path != "/check":
+                self._send(404, {"error": f"unknown path {self.path}"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                data = json.loads(self.rfile.read(length) or b"{}")
+                numbers = data["numbers"] if "numbers" in data else [data["number"]]
+                numbers = [str(n).strip() for n in numbers if str(n).strip()]
+            except (ValueError, KeyError, TypeError):
+                self._send(400, {"error": 'expected JSON {"numbers": [...]} or {"number": "..."}'})
+                return
+            if len(numbers) > _MAX_BATCH:
+                self._send(413, {"error": f"at most {_MAX_BATCH} numbers per request"})
+                return
+            self._send(200, {"results": service.lookup(numbers)})
+
+        def log_message(self, format: str, *args: Any) -> None:
+            debug("[HTTP] %s " + format, self.address_string(), *args)
+
+    return Handler
+
+
+def serve(cfg: AppConfig) -> None:
+    """Run the check daemon until interrupted (Ctrl+C)."""
+    checker = Checker(cfg).start(warm=True)
+    service = CheckService(checker, ResultCache(cfg.cache_ttl, cfg.cache_size))
+    httpd = ThreadingHTTPServer((cfg.serve_host, cfg.serve_port), _make_handler(service))
+    httpd.daemon_threads = True
+    info(
+        f"Serving on http://{cfg.serve_host}:{cfg.serve_port} "
+        f"(GET /check?number=..., POST /check, GET /health) with {checker.workers} browser(s)."
+    )
+    if cfg.serve_host not in ("127.0.0.1", "localhost", "::1"):
+        warn("The check API has no authentication; only expose it on trusted networks.")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        info("Shutting down...")
+    finally:
+        httpd.server_close()
+        checker.close()
@@ -0,0 +1,99 @@
+# whatsapp_filter/session.py
+from __future__ import annotations
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Literal, Optional
+
+from .logger import warn
+
+SessionRecordState = Literal["valid", "expired"]
+
+_cache_lock = threading.Lock()
+
+# Parsed cache file per path, read once per process; every write goes
+# through this module and keeps it current.
+_loaded: Dict[Path, Dict[str, Dict[str, Any]]] = {}
+
+
+def session_cache_path() -> Path:
+    return Path.cwd() / "browser_profiles" / "session_cache.json"
+
+
+def _profile_key(browser: str, profile_suffix: str) -> str:
+    # Same naming as the profile directories created by drivers.create_driver.
+    return f"{browser}_whatsapp_profile_{profile_suffix}"
+
+
+def _read(path: Path) -> Dict[str, Dict[str, Any]]:
+    if not path.exists():
+        return {}
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        warn(f"Ignoring unreadable session cache {path}: {e}")
+        return {}
+
+
+def _load() -> Dict[str, Dict[str, Any]]:
+    path = session_cache_path()
+    cache = _loaded.get(path)
+    if cache is None:
+        cache = _loaded[path] = _read(path)
+    return cache
+
+
+def _save(cache: Dict[str, Dict[str, Any]]) -> None:
+    path = session_cache_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    tmp.replace(path)
+
+
+def get_session_record(browser: str, profile_suffix: str) -> Optional[Dict[str, Any]]:
+    with _cache_lock:
+        return _load().get(_profile_key(browser, profile_suffix))
+
+
+def record_session(browser: str, profile_suffix: str, state: SessionRecordState) -> None:
+    """Remember the outcome of the last login check for a profile."""
+    with _cache_lock:
+        cache = _load()
+        cache[_profile_key(browser, profile_suffix)] = {"state": state, "checked_at": time.time()}
+        _save(cache)
+
+
+def forget_session(browser: str, profile_suffix: str) -> None:
+    with _cache_lock:
+        cache = _load()
+        if cache.pop(_profile_key(browser, profile_suffix), None) is not None:
+            _save(cache)
+
+
+def is_known_expired(browser: str, profile_suffix: str, ttl: float = 86400) -> bool:
+    """
+    True if the profile failed its last login check less than `ttl` seconds
+    ago. Older records are ignored so the profile gets probed again.
+    """
+    record = get_session_record(browser, profile_suffix)
+    if not record or record.get("state") != "expired":
+        return False
+    return time.time() - float(record.get("checked_at", 0)) < ttl
+
+
+def needs_reclone(browser: str, worker_suffix: str, base_suffix: str = "single") -> bool:
+    """
+    True if a cloned worker profile is recorded as expired but its base
+    profile has logged in successfully since then.
+    """
+    worker = get_session_record(browser, worker_suffix)
+    base = get_session_record(browser, base_suffix)
+    if not worker or worker.get("state") != "expired":
+        return False
+    if not base or base.get("state") != "valid":
+        return False
+    return float(base["checked_at"]) > float(worker["checked_at"])
@@ -0,0 +1,110 @@
+# whatsapp_filter/stats.py
+from __future__ import annotations
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .whatsapp import Verdict, VALID, INVALID, UNKNOWN
+
+# Latencies are kept in a fixed histogram (50 ms buckets up to 2 minutes),
+# so memory stays constant no matter how many numbers a run checks.
+_BUCKET_S = 0.05
+_MAX_LATENCY_S = 120.0
+_NUM_BUCKETS = int(_MAX_LATENCY_S / _BUCKET_S) + 1
+
+# Check timeouts in use are counted in whole seconds.
+_MAX_TIMEOUT_S = 120
+
+
+WorkerState = Tuple[str, float]  # (state, monotonic time it was entered)
+
+
+class RunStats:
+    """
+    Thread-safe per-run counters: checks, verdicts and check latency, plus
+    the current state of each worker for the live progress display.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.verdicts: Dict[str, int] = {VALID: 0, INVALID: 0, UNKNOWN: 0}
+        self._latency_buckets: List[int] = [0] * _NUM_BUCKETS
+        self._latency_count = 0
+        # timeout second -> [checks run with it, checks it cut off]
+        self._timeout_buckets: Dict[int, List[int]] = {}
+        self.total = 0
+        self.workers: Dict[str, WorkerState] = {}
+        # worker -> [its first check started, its last check finished]
+        self._active: Dict[str, List[float]] = {}
+
+    def add_total(self, n: int) -> None:
+        """Register `n` more numbers to check (main pass or a retry pass)."""
+        with self._lock:
+            self.total += n
+
+    def set_worker_state(self, worker: str, state: str) -> None:
+        # Plain dict updates: cheap enough to call around every check.
+        now = time.monotonic()
+        self.workers[worker] = (state, now)
+        if state == "checking":
+            self._active.setdefault(worker, [now, now])
+        elif state == "idle" and worker in self._active:
+            self._active[worker][1] = now
+
+    def clear_worker(self, worker: str) -> None:
+        self.workers.pop(worker, None)
+
+    def record(self, verdict: Verdict, latency: Optional[float] = None) -> None:
+        with self._lock:
+            self.checks += 1
+            self.verdicts[verdict] = self.verdicts.get(verdict, 0) + 1
+            if latency is not None:
+                idx = min(_NUM_BUCKETS - 1, max(0, int(latency / _BUCKET_S)))
+                self._latency_buckets[idx] += 1
+                self._latency_count += 1
+
+    def record_timeout(self, timeout: float, timed_out: bool) -> None:
+        """Count a navigated check by the timeout it ran with."""
+        with self._lock:
+            bucket = self._timeout_buckets.setdefault(min(_MAX_TIMEOUT_S, max(0, int(timeout))), [0, 0])
+            bucket[0] += 1
+            bucket[1] += int(timed_out)
+
+    def timeout_histogram(self) -> List[Tuple[int, int, int]]:
+        """(timeout second, checks, cut off by the timeout), by timeout."""
+        with self._lock:
+            return [(sec, checks, cut) for sec, (checks, cut) in sorted(self._timeout_buckets.items())]
+
+    def checking_seconds(self) -> Optional[float]:
+        """
+        Mean time per worker from its first check starting to its last one
+        finishing: the run's duration without browser launch and login.
+        """
+        spans = [last - first for first, last in list(self._active.values()) if last > first]
+        return sum(spans) / len(spans) if spans else None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start
+
+    def checks_per_sec(self) -> float:
+        elapsed = self.elapsed()
+        return self.checks / elapsed if elapsed > 0 else 0.0
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        """Approximate latency percentile in seconds (upper bucket edge)."""
+        with self._lock:
+            if not self._latency_count:
+                return None
+            rank = pct / 100.0 * self._latency_count
+            seen = 0
+            for idx, count in enumerate(self._latency_buckets):
+                seen += count
+                if count and seen >= rank:
+                    return (idx + 1) * _BUCKET_S
+        return _MAX_LATENCY_S
+
+    def latency_summary(self) -> Dict[str, Optional[float]]:
+        return {f"p{p}": self.latency_percentile(p) for p in (50, 90, 99)}
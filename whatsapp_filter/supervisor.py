@@ -0,0 +1,402 @@
+# whatsapp_filter/supervisor.py
+from __future__ import annotations
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, Optional, Sequence, Set, Tuple
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from .drivers import create_driver
+from .stats import RunStats
+from .session import is_known_expired, record_session
+from .resources import driver_rss_mb, kill_process_tree
+from .whatsapp import (
+    open_chat_for_number,
+    lookup_numbers_in_page,
+    wait_for_login,
+    LoginRequired,
+    Verdict,
+    VALID,
+    INVALID,
+    UNKNOWN,
+    TIMEOUT_REASON,
+    WHATSAPP_WEB_URL,
+)
+from .netdetect import NetworkDetector
+from .replay import CheckRecorder
+from .timeouts import AdaptiveTimeout
+from .logger import info, debug, warn, error
+
+if TYPE_CHECKING:
+    from .config import AppConfig
+
+
+class WorkerFailed(RuntimeError):
+    """Raised when a supervised browser cannot be (re)started or keeps failing."""
+
+
+class SessionExpired(WorkerFailed):
+    """Raised when the profile is not logged in; restarting will not help."""
+
+
+@dataclass
+class HealthSettings:
+    login_timeout: int = 180
+    qr_timeout: float = 20.0        # fail fast when a QR code keeps showing
+    session_ttl: float = 86400      # trust a cached "expired" session record this long
+    hang_timeout: float = 60.0      # watchdog per check, 0 = disabled
+    recycle_after: int = 500        # restart browser after N checks, 0 = never
+    recycle_memory_mb: int = 0      # restart browser above this RSS, 0 = never
+    max_restarts: int = 3           # consecutive failures before giving up
+    web_url: str = WHATSAPP_WEB_URL  # point at a local mock server for testing
+    verdict_detector: str = "dom"   # "dom" | "network" (DevTools lookup responses, DOM fallback)
+    proxy: Optional[str] = None     # "host:port" the browser connects through
+    batch_size: int = 0             # numbers per in-page lookup, 0/1 = navigate per number
+    record_dir: Optional[str] = None  # capture page-state snapshots of every check for replay
+    check_timeout: float = 15.0     # seconds to wait for a verdict (the ceiling when adaptive)
+    adaptive_timeout: bool = False  # learn each worker's timeout from its verdict latencies
+    min_check_timeout: float = 5.0  # adaptive timeout floor
+    timeout_margin: float = 2.0     # seconds added to the learned p99 latency
+
+    @classmethod
+    def from_config(cls, cfg: "AppConfig") -> "HealthSettings":
+        return cls(
+            login_timeout=cfg.login_timeout,
+            qr_timeout=cfg.qr_timeout,
+            session_ttl=cfg.session_cache_ttl,
+            hang_timeout=cfg.hang_timeout,
+            recycle_after=cfg.recycle_after,
+            recycle_memory_mb=cfg.recycle_memory_mb,
+            max_restarts=cfg.max_restarts,
+            web_url=cfg.web_url.rstrip("/"),
+            verdict_detector=cfg.verdict_detector,
+            proxy=cfg.proxy,
+            batch_size=cfg.batch_size,
+            record_dir=cfg.record_dir,
+            check_timeout=cfg.check_timeout,
+            adaptive_timeout=cfg.adaptive_timeout,
+            min_check_timeout=cfg.min_check_timeout,
+            timeout_margin=cfg.timeout_margin,
+        )
+
+
+class DriverSupervisor:
+    """
+    Owns one browser profile and keeps a healthy, logged-in driver on it.
+
+    - Watchdog: a check running longer than `hang_timeout` gets its browser
+      killed, which unblocks the stuck WebDriver call.
+    - Liveness: after any error the driver is probed; a dead driver is
+      restarted from its profile and the in-flight number is checked again.
+    - Recycling: the browser is restarted after `recycle_after` checks or
+      once its process tree exceeds `recycle_memory_mb` (0 disables either).
+
+    - Timeouts: with `adaptive_timeout`, each check waits for a verdict
+      only as long as this worker's recent verdicts suggest (see
+      AdaptiveTimeout) instead of the full `check_timeout`.
+
+    - Sessions: login outcomes are cached per profile, so a profile known to
+      be logged out fails immediately instead of booting a browser first.
+
+    More than `max_restarts` consecutive failures raise WorkerFailed.
+    """
+
+    def __init__(
+        self,
+        browser: str,
+        headless: bool,
+        driver_path: Optional[str],
+        profile_suffix: str,
+        settings: Optional[HealthSettings] = None,
+        label: str = "",
+        expect_session: bool = True,
+        stats: Optional[RunStats] = None,
+    ) -> None:
+        settings = settings or HealthSettings()
+        self.browser = browser
+        self.headless = headless
+        self.driver_path = driver_path
+        self.profile_suffix = profile_suffix
+        self.login_timeout = settings.login_timeout
+        self.qr_timeout = settings.qr_timeout
+        self.session_ttl = settings.session_ttl
+        self.hang_timeout = settings.hang_timeout
+        self.recycle_after = settings.recycle_after
+        self.recycle_memory_mb = settings.recycle_memory_mb
+        self.max_restarts = settings.max_restarts
+        self.web_url = settings.web_url
+        self.proxy = settings.proxy
+        # Live WhatsApp traffic is encrypted, so polling the DevTools log only
+        # pays off against a mock backend or behind an intercepting proxy.
+        plaintext = settings.web_url != WHATSAPP_WEB_URL or bool(settings.proxy)
+        self.network_detection = settings.verdict_detector == "network" and browser != "firefox" and plaintext
+        self.batch_size = settings.batch_size
+        self.batch_supported = settings.batch_size > 1
+        self.recorder = CheckRecorder(Path(settings.record_dir)) if settings.record_dir else None
+        self.check_timeout = settings.check_timeout
+        self.timeouts = (
+            AdaptiveTimeout(settings.check_timeout, settings.min_check_timeout, settings.timeout_margin)
+            if settings.adaptive_timeout
+            else None
+        )
+        self.label = label or f"[{profile_suffix}]"
+        if settings.verdict_detector == "network" and browser == "firefox":
+            warn("%s Firefox exposes no DevTools network log; verdicts use the page probe.", self.label)
+        elif settings.verdict_detector == "network" and not plaintext:
+            warn(
+                "%s Network detection needs a mock web_url or a proxy; verdicts use the page probe.", self.label
+            )
+        # True when nobody is going to scan a QR code for this profile
+        # (cloned workers, headless runs): expired sessions then fail fast.
+        self.expect_session = expect_session
+        self.stats = stats
+
+        self.driver: Optional[WebDriver] = None
+        self.detector: Optional[NetworkDetector] = None
+        self._batched: Dict[str, Tuple[Verdict, str, float]] = {}
+        self._batch_tried: Set[str] = set()
+        self.checks_since_start = 0
+        self.restarts = 0
+        self._hung = threading.Event()
+
+    # ---------- lifecycle ----------
+
+    def _set_state(self, state: str) -> None:
+        if self.stats is not None:
+            self.stats.set_worker_state(self.label, state)
+
+    def start(self) -> None:
+        if self.expect_session and is_known_expired(self.browser, self.profile_suffix, self.session_ttl):
+            raise SessionExpired(f"{self.label} session is known to be expired; not launching")
+
+        self._set_state("launching")
+        try:
+            driver = create_driver(
+                browser=self.browser,
+                headless=self.headless,
+                driver_path=self.driver_path,
+                profile_suffix=self.profile_suffix,
+                network_capture=self.network_detection,
+                proxy=self.proxy,
+            )
+        except SystemExit as e:
+            raise WorkerFailed(f"{self.label} could not launch {self.browser}") from e
+
+        try:
+            if self.hang_timeout > 0:
+                driver.set_page_load_timeout(self.hang_timeout)
+            if self.batch_supported:
+                # Outlasts the in-page lookup's own timeout, so a slow batch
+                # comes back with UNKNOWNs instead of a ScriptTimeoutException.
+                driver.set_script_timeout(self.check_timeout + 5)
+            driver.get(self.web_url)
+            self._set_state("logging in")
+            wait_for_login(
+                driver,
+                timeout=self.login_timeout,
+                qr_timeout=self.qr_timeout if self.expect_session else None,
+            )
+        except LoginRequired as e:
+            self._quit_driver(driver)
+            record_session(self.browser, self.profile_suffix, "expired")
+            raise SessionExpired(f"{self.label} profile is not logged in") from e
+        except Exception as e:
+            # Page-load stalls and a login page that never finished loading
+            # are worth a restart; they say nothing about the session.
+            self._quit_driver(driver)
+            raise WorkerFailed(f"{self.label} browser failed during startup: {e!r}") from e
+
+        record_session(self.browser, self.profile_suffix, "valid")
+        self._set_state("ready")
+        self.driver = driver
+        self.detector = NetworkDetector(driver) if self.network_detection else None
+        self.checks_since_start = 0
+
+    def restart(self, reason: str) -> None:
+        warn("%s Restarting browser: %s", self.label, reason)
+        self.quit()
+        self.start()
+        self.restarts += 1
+
+    def quit(self) -> None:
+        if self.driver is not None:
+            self._quit_driver(self.driver)
+            self.driver = None
+            self.detector = None
+        self._batched, self._batch_tried = {}, set()
+        if self.stats is not None:
+            self.stats.clear_worker(self.label)
+
+    @staticmethod
+    def _quit_driver(driver: WebDriver) -> None:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def __enter__(self) -> "DriverSupervisor":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.quit()
+
+    # ---------- health ----------
+
+    def is_alive(self) -> bool:
+        if self.driver is None:
+            return False
+        try:
+            self.driver.execute_script("return document.readyState")
+            return True
+        except Exception:
+            return False
+
+    def _kill_hung_driver(self) -> None:
+        self._hung.set()
+        driver = self.driver
+        process = getattr(getattr(driver, "service", None), "process", None)
+        if process is not None:
+            error("%s Check exceeded %.0fs, killing browser.", self.label, self.hang_timeout)
+            kill_process_tree(process.pid)
+
+    def _recycle_reason(self) -> Optional[str]:
+        if self.recycle_after > 0 and self.checks_since_start >= self.recycle_after:
+            return f"recycling after {self.checks_since_start} checks"
+        if self.recycle_memory_mb > 0:
+            rss = driver_rss_mb(self.driver)
+            if rss is not None and rss > self.recycle_memory_mb:
+                return f"recycling at {rss:.0f}MB (limit {self.recycle_memory_mb}MB)"
+        return None
+
+    # ---------- checks ----------
+
+    @contextmanager
+    def _watchdog(self) -> Iterator[None]:
+        """Kill the browser if the enclosed WebDriver call outlives `hang_timeout`."""
+        self._hung.clear()
+        watchdog = None
+        if self.hang_timeout > 0:
+            watchdog = threading.Timer(self.hang_timeout, self._kill_hung_driver)
+            watchdog.daemon = True
+            watchdog.start()
+        try:
+            yield
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+
+    def prepaid(self, number: str) -> bool:
+        """True if `number` already has a verdict from a batched lookup (and its budget was charged)."""
+        return number in self._batched
+
+    def lookup_ahead(
+        self,
+        numbers: Sequence[str],
+        start: int,
+        budget: Optional[Callable[[int], int]] = None,
+    ) -> Optional[Tuple[Verdict, str, float]]:
+        """
+        Batched fast path: (verdict, reason, latency share) for numbers[start]
+        from one in-page lookup of up to `batch_size` numbers starting there,
+        or None when it has to go through check() (batching off, unsupported
+        by the page, no running browser, or the lookup was inconclusive).
+
+        The caller has paid for numbers[start]; `budget(n)` is asked for up
+        to n more lookups before the script runs and returns how many it
+        granted, so the batch never exceeds the account's rate budget.
+        """
+        number = numbers[start]
+        hit = self._batched.pop(number, None)
+        if hit is not None or not self.batch_supported or self.driver is None or number in self._batch_tried:
+            return hit
+
+        batch = [n for n in numbers[start:start + self.batch_size] if n not in self._batched]
+        if budget is not None and len(batch) > 1:
+            batch = batch[:1 + budget(len(batch) - 1)]
+        self._batch_tried = set(batch)
+        self._set_state("checking")
+        started = time.monotonic()
+        try:
+            with self._watchdog():
+                verdicts = lookup_numbers_in_page(self.driver, batch, timeout=self.check_timeout)
+        except Exception as e:
+            warn("%s In-page lookup of %d numbers failed (%r); navigating instead.", self.label, len(batch), e)
+            if self._hung.is_set() or not self.is_alive():
+                self.quit()
+            return None
+        self._set_state("idle")
+
+        if verdicts is None:
+            info("%s Page exposes no existence lookup; checking numbers by navigation.", self.label)
+            self.batch_supported = False
+            return None
+        share = (time.monotonic() - started) / len(batch)
+        conclusive = {n: (v, r, share) for n, (v, r) in verdicts.items() if v != UNKNOWN}
+        self._batched.update(conclusive)
+        self.checks_since_start += 1
+        debug("%s In-page lookup: %d/%d conclusive", self.label, len(conclusive), len(batch))
+        return self._batched.pop(number, None)
+
+    def check(self, phone_number: str) -> Tuple[Verdict, str]:
+        failures = 0
+        while True:
+            try:
+                if self.driver is None:
+                    self.restart("driver not running")
+                else:
+                    reason = self._recycle_reason()
+                    if reason:
+                        self.restart(reason)
+            except SessionExpired:
+                raise
+            except WorkerFailed:
+                failures += 1
+                if failures > self.max_restarts:
+                    raise
+                time.sleep(min(30, 2 ** failures))
+                continue
+
+            self._set_state("checking")
+            timeout = self.timeouts.current() if self.timeouts is not None else self.check_timeout
+            # The timeout runs from page load, so latency does too: driver.get
+            # is not part of waiting for a verdict.
+            loaded = [time.monotonic()]
+            try:
+                with self._watchdog():
+                    result = open_chat_for_number(
+                        self.driver,
+                        phone_number,
+                        timeout=timeout,
+                        base_url=self.web_url,
+                        detector=self.detector,
+                        recorder=self.recorder,
+                        on_loaded=lambda: loaded.append(time.monotonic()),
+                    )
+            except Exception as e:
+                cause = "hung" if self._hung.is_set() else f"error {e!r}"
+                failures += 1
+                warn("%s Check for %s failed (%s); requeueing.", self.label, phone_number, cause)
+                if failures > self.max_restarts:
+                    raise WorkerFailed(
+                        f"{self.label} {failures} consecutive failures on {phone_number}"
+                    ) from e
+                if self._hung.is_set() or not self.is_alive():
+                    self.quit()
+                continue
+
+            self.checks_since_start += 1
+            self._set_state("idle")
+            self._record_timeout(timeout, time.monotonic() - loaded[-1], result)
+            return result
+
+    def _record_timeout(self, timeout: float, latency: float, result: Tuple[Verdict, str]) -> None:
+        verdict, reason = result
+        timed_out = verdict == UNKNOWN and reason == TIMEOUT_REASON
+        if self.timeouts is not None:
+            self.timeouts.record(timeout, latency, verdict in (VALID, INVALID))
+        if self.stats is not None:
+            self.stats.record_timeout(timeout, timed_out)
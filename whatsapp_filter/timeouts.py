@@ -0,0 +1,85 @@
+# whatsapp_filter/timeouts.py
+from __future__ import annotations
+from collections import deque
+from typing import Deque, List, Tuple
+
+from .logger import flush_logging
+
+# Verdict latencies kept per worker; old ones age out as the page warms up
+# or WhatsApp Web slows down.
+_WINDOW = 200
+
+# Conclusive checks needed before the learned timeout replaces the ceiling.
+_WARMUP = 20
+
+# Latency quantile the timeout is derived from.
+_QUANTILE = 0.99
+
+# Every N-th check still runs with the ceiling. Verdicts slower than the
+# learned timeout are only ever seen on these probes, so each counts N
+# times: a timeout that is too tight cannot hide its own misses.
+_PROBE_EVERY = 20
+
+
+class AdaptiveTimeout:
+    """
+    Per-worker check timeout learned from recent verdict latencies: the
+    p99 of the last checks that ended in valid/invalid plus `margin`
+    seconds, kept within [`floor`, `ceiling`].
+
+    The ceiling is used until `_WARMUP` verdicts are in, and for every
+    `_PROBE_EVERY`-th check after that. Not thread-safe: each
+    DriverSupervisor owns one.
+    """
+
+    def __init__(self, ceiling: float = 15.0, floor: float = 5.0, margin: float = 2.0) -> None:
+        self.ceiling = ceiling
+        self.floor = min(floor, ceiling)
+        self.margin = margin
+        self._latencies: Deque[Tuple[float, int]] = deque(maxlen=_WINDOW)  # (latency, weight)
+        self._checks = 0
+        self.learned = ceiling
+
+    def current(self) -> float:
+        """Timeout for the next check."""
+        if (self._checks + 1) % _PROBE_EVERY == 0:
+            return self.ceiling
+        return self.learned
+
+    def record(self, timeout: float, latency: float, conclusive: bool) -> None:
+        """Feed one finished check: the timeout it ran with, its duration and whether it got a verdict."""
+        self._checks += 1
+        if not conclusive:
+            return
+        probe = timeout > self.learned
+        self._latencies.append((latency, _PROBE_EVERY if probe and latency > self.learned else 1))
+        self.learned = self._compute()
+
+    def _compute(self) -> float:
+        if len(self._latencies) < _WARMUP:
+            return self.ceiling
+        ordered = sorted(self._latencies)
+        rank = _QUANTILE * sum(weight for _, weight in ordered)
+        seen = 0
+        for latency, weight in ordered:
+            seen += weight
+            if seen >= rank:
+                break
+        return max(self.floor, min(self.ceiling, latency + self.margin))
+
+
+def print_timeout_report(histogram: List[Tuple[int, int, int]]) -> None:
+    """Print RunStats.timeout_histogram(): how long checks were allowed to take."""
+    flush_logging()
+    print("\n=== Check timeouts ===\n")
+    total = sum(checks for _, checks, _ in histogram)
+    if not total:
+        print("  No navigated checks.\n")
+        return
+    cut_total = sum(cut for _, _, cut in histogram)
+    width = max(checks for _, checks, _ in histogram)
+    print("  Timeout     Checks   Cut off")
+    for sec, checks, cut in histogram:
+        bar = "#" * max(1, round(30 * checks / width))
+        print(f"  {sec:>4}-{sec + 1:<3}s {checks:>8}  {cut:>8}  {bar}")
+    print(f"\n  {total} checks, {cut_total} ({cut_total / total:.1%}) ran into their timeout\n")
@@ -1,7 +1,7 @@
 # whatsapp_filter/whatsapp.py
 from __future__ import annotations
 import time
-from typing import Tuple
+from typing import TYPE_CHECKING, Callable, Dict, List, Literal, Optional, Tuple
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -11,34 +11,105 @@ from selenium.webdriver.remote.webdriver import WebDriver
 
 from .logger import info, debug, warn, error
 
+if TYPE_CHECKING:
+    from .netdetect import NetworkDetector
+    from .replay import CheckRecorder
+
 WHATSAPP_WEB_URL = "https://web.whatsapp.com"
 
+# After loading a /send URL the previous chat can linger briefly, so the
+# page probe waits this long; network verdicts are polled faster meanwhile.
+_DOM_SETTLE_SECONDS = 3.0
+_NETWORK_POLL_SECONDS = 0.1
+
+Verdict = Literal["valid", "invalid", "unknown"]
+VALID: Verdict = "valid"
+INVALID: Verdict = "invalid"
+UNKNOWN: Verdict = "unknown"
+
+
+SessionState = Literal["logged_in", "qr", "loading"]
+
+# One round trip: main-UI and QR selectors plus the stored session id that
+# WhatsApp Web keeps in localStorage once a device is linked.
+_SESSION_PROBE_JS = """
+var q = function (sel) { return document.querySelector(sel) !== null; };
+var stored = false;
+try {
+    var ls = window.localStorage;
+    stored = !!(ls && (ls.getItem('last-wid-md') || ls.getItem('last-wid')));
+} catch (e) {}
+if (q("canvas[aria-label='Scan me!']") || q("div[data-testid='qrcode']")) {
+    return 'qr';
+}
+if (q("div[data-testid='app']") || q("div[aria-label='Chats']") ||
+        q("div[aria-label='Chat list']") || q("header[data-testid='conversation-header']")) {
+    return 'logged_in';
+}
+return stored ? 'loading' : 'qr';
+"""
+
+
+def probe_session_state(driver: WebDriver) -> SessionState:
+    """
+    Classify the current page in a single script call:
+    - "logged_in": main UI is rendered.
+    - "qr": QR code shown, or the app has no stored session and is still booting.
+    - "loading": a stored session exists and the app is still booting.
+    """
+    return driver.execute_script(_SESSION_PROBE_JS)
+
 
-def wait_for_login(driver: WebDriver, timeout: int = 180) -> None:
+class LoginRequired(TimeoutException):
+    """The login page kept showing a QR code: the profile is not logged in."""
+
+
+def wait_for_login(
+    driver: WebDriver,
+    timeout: int = 180,
+    qr_timeout: Optional[float] = None,
+    poll_interval: float = 0.25,
+) -> None:
+    """
+    Wait until the main UI is visible.
+
+    With `qr_timeout` set (profiles nobody is going to scan, e.g. headless
+    workers), a login page that keeps showing the QR code for that long fails
+    fast instead of waiting out the full `timeout`.
+
+    Raises LoginRequired when it gives up on a QR screen, and a plain
+    TimeoutException when the main UI just never showed up (slow network,
+    page stuck loading).
+    """
     info("Waiting for WhatsApp Web login (scan the QR code if needed)...")
-    end_time = time.time() + timeout
+    start = time.time()
+    end_time = start + timeout
     last_state = None
+    qr_since: Optional[float] = None
 
     while time.time() < end_time:
         try:
-            qr_elements = driver.find_elements(By.CSS_SELECTOR, "canvas[aria-label='Scan me!']")
-            qr_containers = driver.find_elements(By.CSS_SELECTOR, "div[data-testid='qrcode']")
-            app_root = driver.find_elements(By.CSS_SELECTOR, "div[data-testid='app']")
-            chat_list = driver.find_elements(By.CSS_SELECTOR, "div[aria-label='Chats'], div[aria-label='Chat list']")
-            conversation_header = driver.find_elements(By.CSS_SELECTOR, "header[data-testid='conversation-header']")
-
-            if qr_elements or qr_containers:
-                if last_state != "qr":
-                    debug("QR code detected, waiting for scan...")
-                    last_state = "qr"
-
-            if app_root or chat_list or conversation_header:
-                info("Logged into WhatsApp Web (main UI detected).")
-                return
+            state = probe_session_state(driver)
         except Exception:
-            pass
+            state = None
+
+        if state == "logged_in":
+            info(f"Logged into WhatsApp Web (main UI detected after {time.time() - start:.1f}s).")
+            return
+
+        if state == "qr":
+            if qr_since is None:
+                qr_since = time.time()
+            if last_state != "qr":
+                debug("QR code detected, waiting for scan...")
+            if qr_timeout is not None and time.time() - qr_since >= qr_timeout:
+                error(f"Login page still requires a QR scan after {qr_timeout:.0f}s; session expired.")
+                raise LoginRequired("WhatsApp Web session expired (QR code shown)")
+        else:
+            qr_since = None
 
-        time.sleep(1)
+        last_state = state
+        time.sleep(poll_interval)
 
     error("Timed out waiting for WhatsApp Web login.")
     try:
@@ -46,80 +117,213 @@ def wait_for_login(driver: WebDriver, timeout: int = 180) -> None:
         info("Saved screenshot: whatsapp_login_timeout.png")
     except Exception as e:
         warn(f"Could not save screenshot: {e}")
+    if last_state == "qr":
+        raise LoginRequired("WhatsApp Web login not detected in time (QR code shown)")
     raise TimeoutException("WhatsApp Web login not detected in time")
 
 
+# Existence lookup for a whole batch in one async script call. The lookup
+# function is resolved from, in order: a `window.waFilterLookup(number)`
+# hook (mock servers, tests), an injected WPP (wa-js) bundle, or WhatsApp
+# Web's own query-exists module. Each lookup may return a boolean, an
+# object with an `exists` flag, or the app's contact record (null = not on
+# WhatsApp). Calls done(null) when no lookup function is available.
+_BATCH_LOOKUP_JS = """
+var numbers = arguments[0], perNumberMs = arguments[1], done = arguments[arguments.length - 1];
+function resolveLookup() {
+    if (typeof window.waFilterLookup === 'function') {
+        return window.waFilterLookup;
+    }
+    if (window.WPP && WPP.contact && typeof WPP.contact.queryExists === 'function') {
+        return function (n) { return WPP.contact.queryExists(n + '@c.us'); };
+    }
+    try {
+        var job = window.require('WAWebQueryExistsJob');
+        var widFactory = window.require('WAWebWidFactory');
+        if (job && typeof job.queryWidExists === 'function') {
+            return function (n) { return job.queryWidExists(widFactory.createWid(n + '@c.us')); };
+        }
+    } catch (e) {}
+    return null;
+}
+function classify(r) {
+    if (r === null || r === undefined || r === false) { return 'invalid'; }
+    if (r === true) { return 'valid'; }
+    if (typeof r === 'object' && 'exists' in r) { return r.exists ? 'valid' : 'invalid'; }
+    return 'valid';
+}
+var lookup = resolveLookup();
+if (!lookup) { done(null); return; }
+Promise.all(numbers.map(function (n) {
+    return new Promise(function (resolve) {
+        var timer = setTimeout(function () { resolve([n, 'unknown']); }, perNumberMs);
+        Promise.resolve().then(function () { return lookup(n); }).then(function (r) {
+            clearTimeout(timer);
+            resolve([n, classify(r)]);
+        }, function () {
+            clearTimeout(timer);
+            resolve([n, 'unknown']);
+        });
+    });
+})).then(function (pairs) {
+    var out = {};
+    pairs.forEach(function (p) { out[p[0]] = p[1]; });
+    done(out);
+});
+"""
+
+
+def lookup_numbers_in_page(
+    driver: WebDriver,
+    phone_numbers: List[str],
+    timeout: float = 15.0,
+) -> Optional[Dict[str, Tuple[Verdict, str]]]:
+    """
+    Ask the loaded app whether each number exists, all in one WebDriver
+    round trip (lookups run concurrently in the page). Returns a
+    {number: (verdict, reason)} map, or None when the page exposes no
+    lookup function and numbers have to be checked by navigation.
+    Numbers whose lookup failed or took longer than `timeout` are UNKNOWN.
+    The driver's script timeout has to be longer than `timeout`; set it
+    once per driver (DriverSupervisor.start) rather than per call.
+    """
+    sanitized = {n.strip().replace("+", "").replace(" ", ""): n for n in phone_numbers}
+    raw = driver.execute_async_script(_BATCH_LOOKUP_JS, list(sanitized), int(timeout * 1000))
+    if raw is None:
+        return None
+    verdicts: Dict[str, Tuple[Verdict, str]] = {}
+    for digits, number in sanitized.items():
+        verdict = raw.get(digits, UNKNOWN)
+        if verdict == VALID:
+            verdicts[number] = VALID, "In-page lookup: number exists."
+        elif verdict == INVALID:
+            verdicts[number] = INVALID, "In-page lookup: number not on WhatsApp."
+        else:
+            verdicts[number] = UNKNOWN, "In-page lookup failed or timed out."
+    return verdicts
+
+
+# Original invalid-number modal
+_INVALID_MODAL_XPATH = (
+    "//div[@data-animate-modal-popup='true' and "
+    "contains(@aria-label, 'Phone number shared via url is invalid')]"
+    " | "
+    "//div[@data-animate-modal-body='true']"
+    "[.//div[contains(normalize-space(.), 'Phone number shared via url is invalid.')]]"
+)
+
+# Additional: retry / error banner
+_RETRY_BANNER_XPATH = (
+    "//span[contains(., 'Click to retry') or "
+    "contains(., 'Retry') or "
+    "contains(., 'Trying to reach phone')]"
+)
+
+# Conversation header selector (for a real chat open)
+_CONVERSATION_HEADER_XPATH = "//header[@data-testid='conversation-header']"
+
+DETECTION_XPATHS = (_INVALID_MODAL_XPATH, _RETRY_BANNER_XPATH, _CONVERSATION_HEADER_XPATH)
+
+# Reason given when a check ran out its timeout with no evidence either way.
+TIMEOUT_REASON = "No invalid popup or chat header within timeout: deferring as unknown."
+
+
 def open_chat_for_number(
     driver: WebDriver,
     phone_number: str,
-    timeout: int = 15
-) -> Tuple[bool, str]:
+    timeout: float = 15.0,
+    retry_grace: float = 3.0,
+    base_url: str = WHATSAPP_WEB_URL,
+    detector: Optional["NetworkDetector"] = None,
+    recorder: Optional["CheckRecorder"] = None,
+    on_loaded: Optional[Callable[[], None]] = None,
+) -> Tuple[Verdict, str]:
     """
-    Return (is_registered, reason).
+    Return (verdict, reason), where verdict is VALID, INVALID or UNKNOWN.
 
     Logic:
     - Load /send?phone=...
     - If we see the classic 'phone number shared via url is invalid' popup -> invalid.
     - Else, if we see the main chat header within timeout -> valid.
-    - Else, if we see retry/error banners, we treat as invalid (conservative).
-    - Else, default to valid if no invalid-modal appears (original behavior),
-      but log that we didn't see strong evidence.
+    - If a retry/error banner shows up and nothing conclusive follows within
+      `retry_grace` seconds -> unknown (transient; don't burn the full timeout).
+    - Else, on timeout without evidence either way -> unknown.
+
+    With a `detector`, the app's own lookup response is checked first on
+    every poll, so a verdict can land before the UI renders; the page
+    probe above starts after the usual settle delay and stays the fallback.
+    A `recorder` snapshots the page at every state change for replay.
+    `on_loaded` is called once the page has loaded, where the recorder's
+    time to verdict starts.
     """
     sanitized = phone_number.strip().replace("+", "").replace(" ", "")
-    url = f"{WHATSAPP_WEB_URL}/send?phone={sanitized}&text=&type=phone_number&app_absent=0"
-    debug(f"Opening URL for {phone_number}: {url}")
+    url = f"{base_url}/send?phone={sanitized}&text=&type=phone_number&app_absent=0"
+    debug("Opening URL for %s: %s", phone_number, url)
+    if detector is not None:
+        detector.reset()
     driver.get(url)
-    time.sleep(3)
-
-    # Original invalid-number modal
-    invalid_modal_xpath = (
-        "//div[@data-animate-modal-popup='true' and "
-        "contains(@aria-label, 'Phone number shared via url is invalid')]"
-        " | "
-        "//div[@data-animate-modal-body='true']"
-        "[.//div[contains(normalize-space(.), 'Phone number shared via url is invalid.')]]"
-    )
-
-    # Additional: retry / error banner
-    retry_banner_xpath = (
-        "//span[contains(., 'Click to retry') or "
-        "contains(., 'Retry') or "
-        "contains(., 'Trying to reach phone')]"
-    )
-
-    # Conversation header selector (for a real chat open)
-    conversation_header_xpath = "//header[@data-testid='conversation-header']"
+    if on_loaded is not None:
+        on_loaded()
+    if recorder is not None:
+        recorder.begin(sanitized)
+    result = _await_verdict(driver, phone_number, sanitized, timeout, retry_grace, detector, recorder)
+    if recorder is not None:
+        recorder.finish(driver, *result)
+    return result
+
 
+def _await_verdict(
+    driver: WebDriver,
+    phone_number: str,
+    sanitized: str,
+    timeout: float,
+    retry_grace: float,
+    detector: Optional["NetworkDetector"],
+    recorder: Optional["CheckRecorder"],
+) -> Tuple[Verdict, str]:
+    dom_after = time.time() + _DOM_SETTLE_SECONDS
     end_time = time.time() + timeout
     saw_retry_banner = False
+    retry_deadline = end_time
+    fast_poll = recorder is not None or (detector is not None and detector.available)
 
     while time.time() < end_time:
+        if recorder is not None:
+            recorder.observe(driver)
+        if detector is not None:
+            detected = detector.poll(sanitized)
+            if detected is not None:
+                return detected
+        if time.time() < dom_after:
+            time.sleep(_NETWORK_POLL_SECONDS if fast_poll else 0.5)
+            continue
         try:
-            invalid_modal = driver.find_elements(By.XPATH, invalid_modal_xpath)
+            invalid_modal = driver.find_elements(By.XPATH, _INVALID_MODAL_XPATH)
             if invalid_modal:
-                debug(f"Invalid-number modal detected for: {phone_number}")
-                return False, "Invalid popup detected: phone number shared via url is invalid."
+                debug("Invalid-number modal detected for: %s", phone_number)
+                return INVALID, "Invalid popup detected: phone number shared via url is invalid."
 
-            retry_banner = driver.find_elements(By.XPATH, retry_banner_xpath)
+            retry_banner = driver.find_elements(By.XPATH, _RETRY_BANNER_XPATH)
             if retry_banner and not saw_retry_banner:
                 saw_retry_banner = True
-                warn(f"Retry/error banner seen for {phone_number}; may be transient.")
+                retry_deadline = min(end_time, time.time() + retry_grace)
+                warn("Retry/error banner seen for %s; may be transient.", phone_number)
 
-            conv_header = driver.find_elements(By.XPATH, conversation_header_xpath)
+            conv_header = driver.find_elements(By.XPATH, _CONVERSATION_HEADER_XPATH)
             if conv_header:
-                debug(f"Conversation header detected for {phone_number}, treating as valid.")
-                return True, "Conversation header detected: treating as valid."
+                debug("Conversation header detected for %s, treating as valid.", phone_number)
+                return VALID, "Conversation header detected: treating as valid."
 
         except Exception as e:
-            warn(f"Error while checking popups for {phone_number}: {e!r}")
+            warn("Error while checking popups for %s: %r", phone_number, e)
             time.sleep(1)
             continue
 
-        time.sleep(0.5)
+        if saw_retry_banner and time.time() >= retry_deadline:
+            debug("Retry banner persisted for %s, deferring as unknown.", phone_number)
+            return UNKNOWN, "Retry banner without a verdict: deferring as unknown."
 
-    if saw_retry_banner:
-        debug(f"No invalid popup but retry banner seen for {phone_number}, treating as invalid.")
-        return False, "Timeout with retry banner present: treating as invalid."
+        time.sleep(0.5)
 
-    debug(f"No invalid popup detected within timeout for {phone_number}, treating as valid.")
-    return True, "No invalid popup detected within timeout: treating as valid."
\ No newline at end of file
+    debug("No verdict within timeout for %s, deferring as unknown.", phone_number)
+    return UNKNOWN, TIMEOUT_REASON